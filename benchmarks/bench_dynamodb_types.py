@@ -0,0 +1,112 @@
+"""
+Compares decoding a page of DynamoDB items with ``ItemSchema`` against
+schema-less ``decode_item`` & a naive recursive decoder.
+
+All three produce identical output (numbers as ``Decimal``), so the numbers
+only reflect the decoding strategy.
+
+Usage::
+
+    $ python benchmarks/bench_dynamodb_types.py [number_of_items]
+
+Defaults to 1,000,000 items.
+"""
+import gc
+import sys
+import time
+from decimal import Decimal
+
+from boto3.dynamodb.types import ItemSchema, decode_item
+
+
+def naive_decode(value):
+    # The sort of thing everyone writes first: inspect every value, recurse
+    # into every dict.
+    if isinstance(value, dict):
+        if len(value) == 1:
+            tag = list(value.keys())[0]
+            raw = value[tag]
+
+            if tag == 'S':
+                return raw
+            elif tag == 'N':
+                return Decimal(raw)
+            elif tag == 'SS':
+                return set(raw)
+            elif tag == 'NS':
+                return set([Decimal(n) for n in raw])
+
+        return dict([(k, naive_decode(v)) for k, v in value.items()])
+
+    return value
+
+
+def build_page(count):
+    return [
+        {
+            'id': {'S': 'user-{0}'.format(i)},
+            'created': {'N': str(1380000000 + i)},
+            'score': {'N': '{0}.5'.format(i % 100)},
+            'name': {'S': 'Some Body'},
+            'email': {'S': 'user-{0}@example.com'.format(i)},
+            'logins': {'N': str(i % 50)},
+            'tags': {'SS': ['a', 'b']},
+        }
+        for i in range(count)
+    ]
+
+
+def timed(label, func, page):
+    # Keep collector pauses (from building millions of dicts) out of the
+    # numbers.
+    gc.collect()
+    gc.disable()
+
+    try:
+        start = time.time()
+        result = func(page)
+        elapsed = time.time() - start
+    finally:
+        gc.enable()
+
+    print('{0:<28} {1:8.3f}s  {2:12,.0f} items/s'.format(
+        label,
+        elapsed,
+        len(page) / elapsed
+    ))
+    return elapsed, result
+
+
+def main(count):
+    page = build_page(count)
+    print('Decoding {0:,} items ({1} attributes each)'.format(count, 7))
+
+    naive, naive_result = timed(
+        'naive recursion',
+        lambda items: [naive_decode(item) for item in items],
+        page
+    )
+    plain, plain_result = timed(
+        'decode_item (no schema)',
+        lambda items: [decode_item(item) for item in items],
+        page
+    )
+    schema = ItemSchema(attribute_types={'id': 'S', 'created': 'N'})
+    fast, fast_result = timed(
+        'ItemSchema.decode_page',
+        schema.decode_page,
+        page
+    )
+    assert naive_result == plain_result == fast_result
+
+    print('Schema vs. no schema: {0:.2f}x'.format(plain / fast))
+    print('Schema vs. naive:     {0:.2f}x'.format(naive / fast))
+
+
+if __name__ == '__main__':
+    count = 1000000
+
+    if len(sys.argv) > 1:
+        count = int(sys.argv[1])
+
+    main(count)
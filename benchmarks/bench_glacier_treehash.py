@@ -0,0 +1,112 @@
+"""
+Compares ``tree_hash_file`` (memory-mapped, leaves hashed on a thread pool,
+tree combined in one pass) against a naive Glacier tree hash that reads the
+file into a list of leaves & pairs up digests level by level.
+
+Both produce the same hash, which is checked.
+
+Usage::
+
+    $ python benchmarks/bench_glacier_treehash.py [megabytes] [threads]
+
+Defaults to a 512 MB file & one thread per CPU.
+"""
+import binascii
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from boto3.glacier.treehash import MB, tree_hash_file
+
+
+def naive_tree_hash(path):
+    hashes = []
+
+    with open(path, 'rb') as fileobj:
+        while True:
+            leaf = fileobj.read(MB)
+
+            if not leaf:
+                break
+
+            hashes.append(hashlib.sha256(leaf).digest())
+
+    if not hashes:
+        hashes = [hashlib.sha256(b'').digest()]
+
+    while len(hashes) > 1:
+        paired = []
+
+        for i in range(0, len(hashes), 2):
+            if i + 1 < len(hashes):
+                paired.append(
+                    hashlib.sha256(hashes[i] + hashes[i + 1]).digest()
+                )
+            else:
+                paired.append(hashes[i])
+
+        hashes = paired
+
+    return binascii.hexlify(hashes[0]).decode('ascii')
+
+
+def timed(label, func, size):
+    start = time.time()
+    result = func()
+    elapsed = time.time() - start
+    print('{0:<32} {1:8.3f}s  {2:10,.1f} MB/s'.format(
+        label,
+        elapsed,
+        size / float(MB) / elapsed
+    ))
+    return elapsed, result
+
+
+def main(megabytes, threads):
+    handle, path = tempfile.mkstemp()
+
+    try:
+        chunk = os.urandom(MB)
+
+        with os.fdopen(handle, 'wb') as fileobj:
+            for i in range(megabytes):
+                fileobj.write(chunk)
+
+        size = megabytes * MB
+        print('Tree hashing a {0:,} MB file'.format(megabytes))
+
+        naive, naive_result = timed(
+            'naive',
+            lambda: naive_tree_hash(path),
+            size
+        )
+        single, single_result = timed(
+            'tree_hash_file (1 thread)',
+            lambda: tree_hash_file(path, max_workers=1),
+            size
+        )
+        fast, fast_result = timed(
+            'tree_hash_file ({0} threads)'.format(threads or 'auto'),
+            lambda: tree_hash_file(path, max_workers=threads),
+            size
+        )
+        assert naive_result == single_result == fast_result
+
+        print('Threaded vs. naive: {0:.2f}x'.format(naive / fast))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    megabytes = 512
+    threads = None
+
+    if len(sys.argv) > 1:
+        megabytes = int(sys.argv[1])
+
+    if len(sys.argv) > 2:
+        threads = int(sys.argv[2])
+
+    main(megabytes, threads)
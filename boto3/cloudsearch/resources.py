@@ -0,0 +1,114 @@
+import boto3
+from boto3.cloudsearch.utils import SNAPSHOT_SECTIONS, snapshot_domains
+from boto3.core.collections import Collection
+from boto3.core.resources import Resource
+
+
+class DomainCustomizations(Resource):
+    def get_domain_name(self):
+        """
+        Returns the name of the domain, whether the instance was built with
+        ``domain_name`` (i.e. by ``DomainCollection.each``) or ``id``.
+
+        :rtype: string
+        """
+        return self._data.get('domain_name') or self._data.get('id')
+
+    def update_params(self, conn_method_name, params):
+        params = super(DomainCustomizations, self).update_params(
+            conn_method_name,
+            params
+        )
+
+        # The API knows domains by ``domain_name``, not ``id``.
+        params.pop('id', None)
+
+        if not 'domain_name' in params:
+            params['domain_name'] = self.get_domain_name()
+
+        return params
+
+    def snapshot(self, max_workers=len(SNAPSHOT_SECTIONS), executor=None):
+        """
+        Captures the domain's whole configuration, with all the
+        ``Describe*`` calls made concurrently.
+
+        See ``boto3.cloudsearch.utils.snapshot_domains`` for the details.
+
+        :param max_workers: (Optional) How many calls to make at once. Use
+            ``1`` to make them one after another. Default is one per
+            ``Describe*`` call (``7``).
+        :type max_workers: integer
+
+        :param executor: (Optional) An existing thread pool to call on
+        :type executor: <concurrent.futures.Executor> instance
+
+        :rtype: <boto3.cloudsearch.utils.DomainConfig> instance
+        """
+        snapshots = snapshot_domains(
+            [self],
+            max_workers=max_workers,
+            executor=executor
+        )
+        return snapshots[self.get_domain_name()]
+
+
+class DomainCollectionCustomizations(Collection):
+    def snapshot(self, domain_names=None, max_workers=8, executor=None):
+        """
+        Captures the configuration of many domains at once.
+
+        See ``boto3.cloudsearch.utils.snapshot_domains`` for the details.
+
+        :param domain_names: (Optional) The domains to snapshot. By default,
+            every domain in the region.
+        :type domain_names: list
+
+        :param max_workers: (Optional) How many calls to make at once.
+            Default is ``8``.
+        :type max_workers: integer
+
+        :param executor: (Optional) An existing thread pool to call on
+        :type executor: <concurrent.futures.Executor> instance
+
+        :returns: A ``DomainConfig`` per domain, by domain name
+        :rtype: OrderedDict
+        """
+        if domain_names is None:
+            resp = self._connection.describe_domains()
+            domain_names = [
+                status['DomainName']
+                for status in resp.get('DomainStatusList', [])
+            ]
+
+        domains = [
+            Domain(connection=self._connection, domain_name=name)
+            for name in domain_names
+        ]
+        return snapshot_domains(
+            domains,
+            max_workers=max_workers,
+            executor=executor
+        )
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+DomainCollection = boto3.session.get_collection(
+    'cloudsearch',
+    'DomainCollection',
+    base_class=DomainCollectionCustomizations
+)
+DocumentCollection = boto3.session.get_collection(
+    'cloudsearch',
+    'DocumentCollection'
+)
+Domain = boto3.session.get_resource(
+    'cloudsearch',
+    'Domain',
+    base_class=DomainCustomizations
+)
+Document = boto3.session.get_resource('cloudsearch', 'Document')
+
+# Keep it on the collection, not the session-wide cached version.
+DomainCollection.change_resource(Domain)
@@ -0,0 +1,536 @@
+import threading
+import time
+
+from concurrent import futures
+
+from boto3.core.exceptions import BotoException
+from boto3.utils import json
+from boto3.utils import OrderedDict
+
+
+API_VERSION = '2011-02-01'
+MB = 1024 * 1024
+MAX_BATCH_SIZE = 5 * MB
+MAX_DOCUMENT_SIZE = MB
+# What a ``DomainConfig`` is made of: the attribute name, the ``Domain``
+# method that describes it & where the response keeps it.
+SNAPSHOT_SECTIONS = (
+    ('index_fields', 'all_index_fields', 'IndexFields'),
+    ('rank_expressions', 'all_rank_expressions', 'RankExpressions'),
+    (
+        'service_access_policies',
+        'all_service_access_policies',
+        'AccessPolicies'
+    ),
+    ('stemming_options', 'all_stemming_options', 'Stems'),
+    ('stopword_options', 'all_stopword_options', 'Stopwords'),
+    ('synonym_options', 'all_synonym_options', 'Synonyms'),
+    (
+        'default_search_field',
+        'get_default_search_field',
+        'DefaultSearchField'
+    ),
+)
+
+
+class DocumentTooLarge(BotoException):
+    pass
+
+
+class BatchError(BotoException):
+    """
+    Raised when CloudSearch rejects (part of) a batch of documents.
+    """
+    def __init__(self, message, response=None):
+        self.response = response or {}
+        super(BatchError, self).__init__(message)
+
+
+class BatchBuilder(object):
+    """
+    Builds Search Data Format (SDF) batches, one operation at a time.
+
+    Each operation is serialized exactly once, straight onto the end of the
+    current batch's buffer. When the next one wouldn't fit under
+    ``max_batch_size``, the current batch is closed off & handed back as-is
+    (so nothing is ever re-serialized to find where to cut) & the operation
+    starts the next batch.
+
+    Usage::
+
+        >>> from boto3.cloudsearch.utils import BatchBuilder
+        >>> builder = BatchBuilder()
+        >>> batches = []
+        >>> for doc in docs:
+        ...     batches.extend(builder.add(doc.id, doc.version, doc.fields))
+        >>> batches.extend(builder.flush())
+
+    """
+    def __init__(self, max_batch_size=MAX_BATCH_SIZE,
+                 max_document_size=MAX_DOCUMENT_SIZE):
+        """
+        Creates a new ``BatchBuilder`` instance.
+
+        :param max_batch_size: (Optional) The largest a batch may be, in
+            bytes. Default is 5 MB.
+        :type max_batch_size: integer
+
+        :param max_document_size: (Optional) The largest a single operation
+            may be, in bytes. Default is 1 MB.
+        :type max_document_size: integer
+        """
+        super(BatchBuilder, self).__init__()
+        self.max_batch_size = max_batch_size
+        self.max_document_size = max_document_size
+        self._buffer = bytearray(b'[')
+        self.operations = 0
+        self.batches = 0
+
+    def __len__(self):
+        # The size the current batch would be, if closed now.
+        return len(self._buffer) + 1
+
+    def _close(self):
+        self._buffer.append(ord(']'))
+        batch = bytes(self._buffer)
+        self._buffer = bytearray(b'[')
+        self.operations = 0
+        self.batches += 1
+        return batch
+
+    def append(self, operation):
+        """
+        Adds a raw SDF operation.
+
+        :param operation: The operation (i.e.
+            ``{'type': 'add', 'id': ..., 'version': ..., 'fields': ...}``)
+        :type operation: dict
+
+        :returns: Any batches that were completed (zero or one of them)
+        :rtype: list
+        """
+        data = json.dumps(operation, separators=(',', ':')).encode('utf-8')
+
+        if len(data) > self.max_document_size:
+            raise DocumentTooLarge(
+                "Document '{0}' is {1} bytes, over the {2} byte limit.".format(
+                    operation.get('id'),
+                    len(data),
+                    self.max_document_size
+                )
+            )
+
+        completed = []
+        # A comma before it (unless it's first) & the closing bracket after.
+        needed = len(self._buffer) + len(data) + 1 + int(self.operations > 0)
+
+        if self.operations and needed > self.max_batch_size:
+            completed.append(self._close())
+
+        if self.operations:
+            self._buffer.append(ord(','))
+
+        self._buffer.extend(data)
+        self.operations += 1
+        return completed
+
+    def add(self, id, version, fields, lang='en'):
+        """
+        Adds (or replaces) a document.
+
+        :param id: The document's ID
+        :type id: string
+
+        :param version: The document's version. Must increase with each
+            change to the document.
+        :type version: integer
+
+        :param fields: The document's fields
+        :type fields: dict
+
+        :param lang: (Optional) The document's language. Default is ``en``.
+        :type lang: string
+
+        :returns: Any batches that were completed
+        :rtype: list
+        """
+        return self.append({
+            'type': 'add',
+            'id': id,
+            'version': version,
+            'lang': lang,
+            'fields': fields,
+        })
+
+    def delete(self, id, version):
+        """
+        Deletes a document.
+
+        :param id: The document's ID
+        :type id: string
+
+        :param version: The version of the deletion. Must be higher than the
+            document's current version.
+        :type version: integer
+
+        :returns: Any batches that were completed
+        :rtype: list
+        """
+        return self.append({
+            'type': 'delete',
+            'id': id,
+            'version': version,
+        })
+
+    def flush(self):
+        """
+        Closes off the current batch, if it has anything in it.
+
+        :returns: The last batch (if any)
+        :rtype: list
+        """
+        if not self.operations:
+            return []
+
+        return [self._close()]
+
+
+def http_sender(document_endpoint, timeout=60):
+    """
+    Returns a function that posts batches to a domain's document service
+    endpoint.
+
+    Document service requests are authorized by the domain's access
+    policies (by IP), not signed, so this is a plain HTTP ``POST``.
+
+    :param document_endpoint: The domain's ``DocService`` endpoint (i.e.
+        ``doc-mydomain-xxxx.us-east-1.cloudsearch.amazonaws.com``)
+    :type document_endpoint: string
+
+    :param timeout: (Optional) The request timeout, in seconds. Default is
+        ``60``.
+    :type timeout: integer
+
+    :rtype: callable
+    """
+    from botocore.vendored import requests
+
+    url = 'https://{0}/{1}/documents/batch'.format(
+        document_endpoint,
+        API_VERSION
+    )
+    http = requests.Session()
+
+    def _send(batch):
+        resp = http.post(
+            url,
+            data=batch,
+            headers={'Content-Type': 'application/json'},
+            timeout=timeout
+        )
+        return resp.json()
+
+    return _send
+
+
+class DocumentUploader(object):
+    """
+    Uploads documents to a CloudSearch domain, building SDF batches as it
+    goes & sending several batches at once.
+
+    Usage::
+
+        >>> from boto3.cloudsearch.utils import DocumentUploader, http_sender
+        >>> uploader = DocumentUploader(http_sender(doc_endpoint))
+        >>> for doc in docs:
+        ...     uploader.add(doc.id, doc.version, doc.fields)
+        >>> uploader.close()
+        >>> uploader.stats()
+        {'adds': 1000000, 'deletes': 0, 'batches': 212, 'errors': 0}
+
+    """
+    def __init__(self, send, max_workers=4, max_batch_size=MAX_BATCH_SIZE,
+                 max_document_size=MAX_DOCUMENT_SIZE, executor=None):
+        """
+        Creates a new ``DocumentUploader`` instance.
+
+        :param send: Sends one batch (bytes) & returns the decoded response.
+            See ``http_sender``.
+        :type send: callable
+
+        :param max_workers: (Optional) How many batches to send at once.
+            Default is ``4``.
+        :type max_workers: integer
+
+        :param max_batch_size: (Optional) The largest a batch may be, in
+            bytes. Default is 5 MB.
+        :type max_batch_size: integer
+
+        :param max_document_size: (Optional) The largest a single document
+            may be, in bytes. Default is 1 MB.
+        :type max_document_size: integer
+
+        :param executor: (Optional) An existing thread pool to send on
+        :type executor: <concurrent.futures.Executor> instance
+        """
+        super(DocumentUploader, self).__init__()
+        self.send = send
+        self.max_workers = max_workers
+        self.builder = BatchBuilder(
+            max_batch_size=max_batch_size,
+            max_document_size=max_document_size
+        )
+        self.executor = executor
+        self._own_executor = executor is None
+
+        if self._own_executor:
+            self.executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+        self._lock = threading.Lock()
+        self._pending = set()
+        self.adds = 0
+        self.deletes = 0
+        self.sent = 0
+        # ``BatchError`` (or other) exceptions, one per failed batch.
+        self.errors = []
+
+    def _send(self, batch):
+        resp = self.send(batch)
+
+        if resp.get('status') != 'success':
+            raise BatchError(
+                "Batch failed: {0}".format(resp.get('errors')),
+                response=resp
+            )
+
+        with self._lock:
+            self.adds += int(resp.get('adds', 0))
+            self.deletes += int(resp.get('deletes', 0))
+            self.sent += 1
+
+        return resp
+
+    def _submit(self, batches):
+        for batch in batches:
+            if len(self._pending) >= self.max_workers * 2:
+                self._reap(futures.FIRST_COMPLETED)
+
+            self._pending.add(self.executor.submit(self._send, batch))
+
+    def _reap(self, return_when):
+        done, self._pending = futures.wait(
+            self._pending,
+            return_when=return_when
+        )
+
+        for future in done:
+            err = future.exception()
+
+            if err is not None:
+                self.errors.append(err)
+
+    def add(self, id, version, fields, lang='en'):
+        """
+        Queues up a document to add. See ``BatchBuilder.add``.
+        """
+        self._submit(self.builder.add(id, version, fields, lang=lang))
+
+    def delete(self, id, version):
+        """
+        Queues up a document to delete. See ``BatchBuilder.delete``.
+        """
+        self._submit(self.builder.delete(id, version))
+
+    def flush(self):
+        """
+        Sends whatever's left & waits for every batch to finish.
+
+        :returns: Whether every batch succeeded
+        :rtype: boolean
+        """
+        self._submit(self.builder.flush())
+        self._reap(futures.ALL_COMPLETED)
+        return not self.errors
+
+    def close(self):
+        """
+        Flushes, then shuts down the thread pool (if the uploader created
+        it).
+
+        :returns: Whether every batch succeeded
+        :rtype: boolean
+        """
+        try:
+            return self.flush()
+        finally:
+            if self._own_executor:
+                self.executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Returns counters for everything uploaded so far.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'adds': self.adds,
+                'deletes': self.deletes,
+                'batches': self.sent,
+                'errors': len(self.errors),
+            }
+
+
+class DomainConfig(object):
+    """
+    A point-in-time copy of a CloudSearch domain's configuration.
+
+    Has an attribute per part of the configuration (``index_fields``,
+    ``rank_expressions``, ``service_access_policies``, ``stemming_options``,
+    ``stopword_options``, ``synonym_options`` & ``default_search_field``),
+    each holding what the matching ``Describe*`` call returned.
+
+    Round-trips through plain JSON (``to_json``/``from_json``), so snapshots
+    can be cached or diffed between runs.
+    """
+    def __init__(self, domain_name, taken_at=None, **sections):
+        """
+        Creates a new ``DomainConfig`` instance.
+
+        :param domain_name: The name of the domain
+        :type domain_name: string
+
+        :param taken_at: (Optional) When the snapshot was taken, in seconds
+            since the epoch
+        :type taken_at: float
+
+        :param **sections: The parts of the configuration, by attribute name
+        """
+        super(DomainConfig, self).__init__()
+        self.domain_name = domain_name
+        self.taken_at = taken_at
+
+        for name, method_name, result_key in SNAPSHOT_SECTIONS:
+            setattr(self, name, sections.get(name))
+
+    def __repr__(self):
+        return '<DomainConfig: {0}>'.format(self.domain_name)
+
+    def __eq__(self, other):
+        if not isinstance(other, DomainConfig):
+            return NotImplemented
+
+        return self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def to_dict(self):
+        """
+        Returns the snapshot as a dict.
+
+        :rtype: dict
+        """
+        data = {
+            'domain_name': self.domain_name,
+            'taken_at': self.taken_at,
+        }
+
+        for name, method_name, result_key in SNAPSHOT_SECTIONS:
+            data[name] = getattr(self, name)
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Rebuilds a snapshot from ``to_dict`` output.
+
+        :rtype: <boto3.cloudsearch.utils.DomainConfig> instance
+        """
+        data = dict(data)
+        return cls(data.pop('domain_name'), **data)
+
+    def to_json(self):
+        """
+        Returns the snapshot as a JSON string.
+
+        :rtype: string
+        """
+        # Timestamps may come back from botocore as ``datetime`` objects.
+        return json.dumps(self.to_dict(), sort_keys=True, default=str)
+
+    @classmethod
+    def from_json(cls, raw):
+        """
+        Rebuilds a snapshot from ``to_json`` output.
+
+        :rtype: <boto3.cloudsearch.utils.DomainConfig> instance
+        """
+        return cls.from_dict(json.loads(raw))
+
+
+def snapshot_domains(domains, max_workers=8, executor=None, clock=time.time):
+    """
+    Snapshots the configuration of many domains at once.
+
+    Every ``Describe*`` call for every domain is issued concurrently on one
+    thread pool, rather than seven round trips per domain, one after
+    another.
+
+    :param domains: The ``Domain`` resources to snapshot
+    :type domains: list
+
+    :param max_workers: (Optional) How many calls to make at once, if no
+        ``executor`` is provided. Default is ``8``.
+    :type max_workers: integer
+
+    :param executor: (Optional) An existing thread pool to call on
+    :type executor: <concurrent.futures.Executor> instance
+
+    :param clock: (Optional) Returns the current time in seconds. Default
+        is ``time.time``.
+    :type clock: callable
+
+    :returns: A ``DomainConfig`` per domain, by domain name (in the order
+        given)
+    :rtype: OrderedDict
+    """
+    own_executor = executor is None
+
+    if own_executor:
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+    try:
+        submitted = []
+
+        for domain in domains:
+            calls = [
+                (
+                    name,
+                    result_key,
+                    executor.submit(getattr(domain, method_name))
+                )
+                for name, method_name, result_key in SNAPSHOT_SECTIONS
+            ]
+            submitted.append((domain, calls))
+
+        snapshots = OrderedDict()
+
+        for domain, calls in submitted:
+            sections = {}
+
+            for name, result_key, future in calls:
+                sections[name] = future.result().get(result_key)
+
+            domain_name = domain.get_domain_name()
+            snapshots[domain_name] = DomainConfig(
+                domain_name,
+                taken_at=clock(),
+                **sections
+            )
+
+        return snapshots
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
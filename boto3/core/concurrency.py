@@ -0,0 +1,208 @@
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import THROTTLING_CODES
+
+
+# How a call went, as far as the limit's concerned.
+SUCCEEDED = 'succeeded'
+THROTTLED = 'throttled'
+FAILED = 'failed'
+
+
+class ConcurrencyLane(object):
+    """
+    The concurrency state for one service operation.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.in_flight = 0
+        self.waiting = 0
+        # Bumped on every decrease, so a burst of throttled calls that were
+        # all in flight together only counts once.
+        self.epoch = 0
+        self.throttled = 0
+
+
+class ConcurrencyLimiter(object):
+    """
+    Adapts how many calls can be in flight at once, per service operation,
+    to what the service will take (AIMD).
+
+    Each successful call raises the limit by ``increase / limit`` (so by
+    about ``increase`` per limit's worth of calls). A throttled one
+    multiplies it by ``decrease``. Other failures leave it be. Calls over
+    the limit wait their turn.
+
+    One lives on each ``Session`` (``session.concurrency_limiter``) &
+    every generated ``Connection`` method passes through it, so all the
+    threads of an application share what's been learned.
+
+    Usage::
+
+        >>> import boto3
+        >>> limiter = boto3.session.concurrency_limiter
+        >>> limiter.stats()
+        {('dynamodb', 'put_item'): {'limit': 11.5, 'in_flight': 11,
+            'waiting': 30, 'throttled': 4}}
+
+    """
+    lane_class = ConcurrencyLane
+
+    def __init__(self, initial=32, min_limit=1, max_limit=256, increase=1,
+                 decrease=0.5, throttling_codes=THROTTLING_CODES):
+        """
+        Creates a new ``ConcurrencyLimiter`` instance.
+
+        :param initial: (Optional) The limit each operation starts with.
+            Default is ``32``.
+        :type initial: float
+
+        :param min_limit: (Optional) The lowest the limit can go. Default is
+            ``1``.
+        :type min_limit: float
+
+        :param max_limit: (Optional) The highest the limit can go. Default is
+            ``256``.
+        :type max_limit: float
+
+        :param increase: (Optional) How much to raise the limit by per limit's
+            worth of successful calls. Default is ``1``.
+        :type increase: float
+
+        :param decrease: (Optional) What to multiply the limit by when a call
+            is throttled. Default is ``0.5``.
+        :type decrease: float
+
+        :param throttling_codes: (Optional) The error codes that mean a call
+            was throttled. Default is ``boto3.core.retries.THROTTLING_CODES``.
+        :type throttling_codes: tuple
+        """
+        super(ConcurrencyLimiter, self).__init__()
+        self.initial = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.throttling_codes = throttling_codes
+        self._cond = threading.Condition()
+        self._lanes = {}
+
+    def _lane(self, key):
+        lane = self._lanes.get(key)
+
+        if lane is None:
+            lane = self.lane_class(self.initial)
+            self._lanes[key] = lane
+
+        return lane
+
+    def limit(self, service_name, method_name):
+        """
+        Returns the current limit for an operation.
+
+        :rtype: float
+        """
+        with self._cond:
+            return self._lane((service_name, method_name)).limit
+
+    def stats(self):
+        """
+        Returns the limit, the calls in flight, the calls waiting & the
+        number of throttled calls for each operation used so far.
+
+        :returns: The figures, by ``(service_name, method_name)``
+        :rtype: dict
+        """
+        with self._cond:
+            return dict([
+                (key, {
+                    'limit': lane.limit,
+                    'in_flight': lane.in_flight,
+                    'waiting': lane.waiting,
+                    'throttled': lane.throttled,
+                })
+                for key, lane in self._lanes.items()
+            ])
+
+    def acquire(self, service_name, method_name):
+        """
+        Waits until a call can be made, then counts it as in flight.
+
+        :returns: A token to hand back to ``release``
+        """
+        key = (service_name, method_name)
+
+        with self._cond:
+            lane = self._lane(key)
+            lane.waiting += 1
+
+            try:
+                # The limit may sit between whole numbers, so round it.
+                while lane.in_flight >= max(int(lane.limit + 0.5), 1):
+                    self._cond.wait()
+            finally:
+                lane.waiting -= 1
+
+            lane.in_flight += 1
+            return (key, lane.epoch)
+
+    def release(self, token, outcome=SUCCEEDED):
+        """
+        Marks a call as finished, adjusting the limit.
+
+        :param token: What ``acquire`` returned
+        :type token: tuple
+
+        :param outcome: (Optional) How the call went: ``SUCCEEDED``,
+            ``THROTTLED`` or ``FAILED``. Default is ``SUCCEEDED``.
+        :type outcome: string
+        """
+        key, epoch = token
+
+        with self._cond:
+            lane = self._lane(key)
+            lane.in_flight -= 1
+
+            if outcome == SUCCEEDED:
+                lane.limit = min(
+                    lane.limit + float(self.increase) / lane.limit,
+                    self.max_limit
+                )
+            elif outcome == THROTTLED:
+                lane.throttled += 1
+
+                # Only cut once for calls that were in flight together.
+                if epoch == lane.epoch:
+                    lane.limit = max(
+                        lane.limit * self.decrease,
+                        self.min_limit
+                    )
+                    lane.epoch += 1
+
+            self._cond.notify_all()
+
+    def call(self, service_name, method_name, func):
+        """
+        Calls ``func`` (with no arguments) once the limit allows, adjusting
+        the limit by how it went.
+
+        :returns: Whatever ``func`` returns
+        """
+        token = self.acquire(service_name, method_name)
+
+        try:
+            result = func()
+        except ServerError as err:
+            if err.code in self.throttling_codes:
+                self.release(token, THROTTLED)
+            else:
+                self.release(token, FAILED)
+
+            raise
+        except Exception:
+            self.release(token, FAILED)
+            raise
+
+        self.release(token)
+        return result
@@ -2,6 +2,7 @@ from boto3.core.constants import DEFAULT_REGION
 from boto3.core.constants import NOTHING_PROVIDED
 from boto3.core.exceptions import ServerError
 from boto3.core.introspection import Introspection
+from boto3.core.retries import RetryPolicy
 from boto3.utils import six
 
 
@@ -112,7 +113,11 @@ class Connection(object):
     """
     A common base class for all the ``Connection`` objects.
     """
-    def __init__(self, region_name=DEFAULT_REGION):
+    # Shared by every connection, unless a service's class or an instance
+    # sets its own.
+    retry_policy = RetryPolicy()
+
+    def __init__(self, region_name=DEFAULT_REGION, retry_policy=None):
         """
         Creates a new connection instance.
 
@@ -120,10 +125,17 @@ class Connection(object):
             By default, this is the value from
             ``boto3.core.constants.DEFAULT_REGION``.
         :type region_name: string
+
+        :param retry_policy: (Optional) How to retry failed calls. By
+            default, this is the class's ``retry_policy``.
+        :type retry_policy: <boto3.core.retries.RetryPolicy> instance
         """
         super(Connection, self).__init__()
         self.region_name = region_name
 
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+
     def __str__(self):
         return u'<{0}: {0}>'.format(
             self.__class__.__name__,
@@ -185,7 +197,8 @@ class Connection(object):
             raise ServerError(
                 code=error.get('Code', 'ConnectionError'),
                 message=error.get('Message', 'No details available.'),
-                full_response=result_data
+                full_response=result_data,
+                status_code=getattr(results[0], 'status_code', None)
             )
 
     def _post_process_results(self, method_name, output, results):
@@ -215,6 +228,9 @@ class Connection(object):
     def _get_operation_params(self, method_name):
         return self._get_operation_data(method_name).get('params', [])
 
+    def _get_retry_policy(self, method_name):
+        return self.retry_policy.for_operation(method_name)
+
 
 class ConnectionFactory(object):
     """
@@ -353,10 +369,27 @@ class ConnectionFactory(object):
             op = service.get_operation(
                 op_data['api_name']
             )
-            results = op.call(endpoint, **service_params)
 
-            # Check for error conditions.
-            self._check_for_errors(results)
+            limiter = self._details.session.concurrency_limiter
+
+            def _attempt():
+                results = op.call(endpoint, **service_params)
+
+                # Check for error conditions.
+                self._check_for_errors(results)
+                return results
+
+            def _call():
+                # Wait for a slot, adapting to throttling as we go.
+                return limiter.call(
+                    self._details.service_name,
+                    method_name,
+                    _attempt
+                )
+
+            # Retry throttled (& some failed) calls, as the policy allows.
+            policy = self._get_retry_policy(method_name)
+            results = policy.call(method_name, _call)
 
             # Post-process results here
             post_processed = self._post_process_results(
@@ -12,10 +12,11 @@ class ServerError(BotoException):
     fmt = "[{0}]: {1}"
 
     def __init__(self, code='GeneralError', message='No message',
-                 full_response=None, **kwargs):
+                 full_response=None, status_code=None, **kwargs):
         self.code = code
         self.message = message
         self.full_response = full_response
+        self.status_code = status_code
 
         if self.full_response is None:
             self.full_response = {}
@@ -61,3 +62,7 @@ class ValidationError(BotoException):
 
 class MD5ValidationError(ValidationError):
     pass
+
+
+class TreeHashValidationError(ValidationError):
+    pass
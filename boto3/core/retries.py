@@ -0,0 +1,312 @@
+import copy
+import random
+import threading
+import time
+
+from boto3.core.exceptions import ServerError
+
+
+# Error codes that mean "slow down". The request wasn't acted on, so it's
+# always safe to try again.
+THROTTLING_CODES = (
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'SlowDown',
+)
+# Error codes for failures on the service's side. The request may or may not
+# have been acted on, so these are only retried for idempotent operations.
+TRANSIENT_CODES = (
+    'InternalError',
+    'InternalFailure',
+    'InternalServerError',
+    'ServiceUnavailable',
+    'ServiceUnavailableException',
+    'RequestTimeout',
+    'RequestTimeoutException',
+)
+# Operations starting with these only read, so repeating them is harmless.
+IDEMPOTENT_PREFIXES = (
+    'describe_',
+    'get_',
+    'head_',
+    'list_',
+)
+
+
+def backoff_delay(attempt, base_delay, max_delay, random=None):
+    """
+    Returns how long to wait after a given (failed) attempt, in seconds.
+
+    The delay doubles with each attempt (starting from ``base_delay``), up
+    to ``max_delay``. With ``random``, it's "full jitter": a random wait
+    between zero & that delay.
+
+    :param attempt: How many attempts have been made so far (from ``1``)
+    :type attempt: integer
+
+    :param base_delay: The delay after the first attempt, in seconds
+    :type base_delay: float
+
+    :param max_delay: The longest delay, in seconds
+    :type max_delay: float
+
+    :param random: (Optional) Returns a random float in ``[0, 1)``. Default
+        is no jitter.
+    :type random: callable
+
+    :rtype: float
+    """
+    ceiling = min(base_delay * (2 ** (attempt - 1)), max_delay)
+
+    if random is None:
+        return ceiling
+
+    return random() * ceiling
+
+
+class RetryPolicy(object):
+    """
+    Decides which failed calls to retry & how long to wait before each
+    retry.
+
+    Throttled calls are always retried. Server-side failures (5xx responses
+    or the ``TRANSIENT_CODES``) are only retried for idempotent operations,
+    since the first attempt may have gone through. The waits grow
+    exponentially, with "full jitter" (a random wait between zero & the
+    exponential delay), so that clients throttled together don't retry
+    together.
+
+    Policies can be set for every connection (``Connection.retry_policy``),
+    for a service (on its ``Connection`` subclass), for a single connection
+    (``retry_policy=...`` when it's created) & per operation (with
+    ``operations``).
+
+    Usage::
+
+        >>> from boto3.core.retries import RetryPolicy
+        >>> from boto3.sqs.connection import SqsConnection
+        >>> SqsConnection.retry_policy = RetryPolicy(
+        ...     max_attempts=8,
+        ...     operations={
+        ...         'send_message': RetryPolicy(max_attempts=3),
+        ...     }
+        ... )
+        >>> conn = SqsConnection()
+        >>> conn.create_queue(queue_name='jobs')
+        >>> SqsConnection.retry_policy.stats()
+        {'calls': 1, 'attempts': 1, 'retries': 0, 'retry_delay': 0.0}
+
+    """
+    def __init__(self, max_attempts=5, base_delay=0.05, max_delay=20,
+                 retryable_codes=THROTTLING_CODES,
+                 transient_codes=TRANSIENT_CODES, idempotent=None,
+                 operations=None, on_retry=None, random=random.random,
+                 sleep=time.sleep):
+        """
+        Creates a new ``RetryPolicy`` instance.
+
+        :param max_attempts: (Optional) The most times to make a call,
+            including the first. Default is ``5``.
+        :type max_attempts: integer
+
+        :param base_delay: (Optional) The longest wait before the first
+            retry, in seconds. Doubles with each retry. Default is ``0.05``.
+        :type base_delay: float
+
+        :param max_delay: (Optional) The longest wait between attempts, in
+            seconds. Default is ``20``.
+        :type max_delay: float
+
+        :param retryable_codes: (Optional) The error codes to always retry.
+            Default is ``THROTTLING_CODES``.
+        :type retryable_codes: tuple
+
+        :param transient_codes: (Optional) The error codes to retry for
+            idempotent operations. Default is ``TRANSIENT_CODES``.
+        :type transient_codes: tuple
+
+        :param idempotent: (Optional) The names of operations that are safe
+            to repeat, on top of the ones that only read (``describe_*``,
+            ``get_*``, etc.)
+        :type idempotent: list
+
+        :param operations: (Optional) Policies to use instead of this one,
+            by method name
+        :type operations: dict
+
+        :param on_retry: (Optional) Called as ``on_retry(method_name, err,
+            attempt, delay)`` before each retry
+        :type on_retry: callable
+
+        :param random: (Optional) Returns a random float in ``[0, 1)``, for
+            the jitter. ``None`` turns the jitter off. Default is
+            ``random.random``.
+        :type random: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(RetryPolicy, self).__init__()
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable_codes = retryable_codes
+        self.transient_codes = transient_codes
+        self.idempotent = set(idempotent or [])
+        self.operations = operations or {}
+        self.on_retry = on_retry
+        self._random = random
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.retry_delay = 0.0
+
+    def stats(self):
+        """
+        Returns how many calls have been made under this policy, how many
+        attempts & retries that took & the total time spent waiting to
+        retry (in seconds).
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'attempts': self.attempts,
+                'retries': self.retries,
+                'retry_delay': self.retry_delay,
+            }
+
+    def for_operation(self, method_name):
+        """
+        Returns the policy to use for a given method.
+
+        :rtype: <boto3.core.retries.RetryPolicy> instance
+        """
+        return self.operations.get(method_name, self)
+
+    def is_idempotent(self, method_name):
+        """
+        Returns whether a method is safe to repeat.
+
+        :rtype: boolean
+        """
+        if method_name in self.idempotent:
+            return True
+
+        return method_name.startswith(IDEMPOTENT_PREFIXES)
+
+    def should_retry(self, method_name, err, attempt):
+        """
+        Returns whether to retry a call that failed.
+
+        :param method_name: The name of the method called
+        :type method_name: string
+
+        :param err: The error the call failed with
+        :type err: <boto3.core.exceptions.ServerError> instance
+
+        :param attempt: How many attempts have been made so far
+        :type attempt: integer
+
+        :rtype: boolean
+        """
+        if attempt >= self.max_attempts:
+            return False
+
+        if err.code in self.retryable_codes:
+            return True
+
+        status_code = getattr(err, 'status_code', None) or 0
+
+        if err.code in self.transient_codes or status_code >= 500:
+            return self.is_idempotent(method_name)
+
+        return False
+
+    def delay(self, attempt):
+        """
+        Returns how long to wait after a given attempt, in seconds.
+
+        :rtype: float
+        """
+        return backoff_delay(
+            attempt,
+            self.base_delay,
+            self.max_delay,
+            random=self._random
+        )
+
+    def call(self, method_name, func):
+        """
+        Calls ``func`` (with no arguments), retrying as the policy allows.
+
+        :param method_name: The name of the method being called
+        :type method_name: string
+
+        :param func: Makes the call
+        :type func: callable
+
+        :returns: Whatever ``func`` returns
+        """
+        with self._lock:
+            self.calls += 1
+
+        attempt = 0
+
+        while True:
+            attempt += 1
+
+            with self._lock:
+                self.attempts += 1
+
+            try:
+                return func()
+            except ServerError as err:
+                if not self.should_retry(method_name, err, attempt):
+                    raise
+
+                delay = self.delay(attempt)
+
+                with self._lock:
+                    self.retries += 1
+                    self.retry_delay += delay
+
+                if self.on_retry is not None:
+                    self.on_retry(method_name, err, attempt, delay)
+
+                self._sleep(delay)
+
+
+# Makes every call just once.
+NO_RETRIES = RetryPolicy(max_attempts=1)
+
+
+def without_retries(conn):
+    """
+    Returns a copy of a connection that makes every call just once, for
+    helpers that handle throttling themselves (so calls aren't retried by
+    both).
+
+    Anything without a ``retry_policy`` (i.e. not a ``Connection``) is
+    returned as-is.
+
+    :param conn: The connection to copy
+    :type conn: A <boto3.core.connection.Connection> subclass instance
+
+    :returns: The copy
+    """
+    if getattr(conn, 'retry_policy', None) is None:
+        return conn
+
+    conn = copy.copy(conn)
+    conn.retry_policy = NO_RETRIES
+    return conn
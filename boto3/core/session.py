@@ -21,7 +21,8 @@ class Session(object):
     cache_class = ServiceCache
 
     def __init__(self, session=None, connection_factory=None,
-                 resource_factory=None, collection_factory=None):
+                 resource_factory=None, collection_factory=None,
+                 concurrency_limiter=None):
         """
         Creates a ``Session`` instance.
 
@@ -47,12 +48,20 @@ class Session(object):
             ``Collection`` objects are constructed by the session.
         :type collection_factory: <boto3.core.collections.CollectionFactory>
             instance
+
+        :param concurrency_limiter: (Optional) Specifies a custom
+            ``ConcurrencyLimiter`` for every ``Connection`` method call to
+            pass through. Useful if you need to change how many calls can be
+            in flight at once.
+        :type concurrency_limiter:
+            <boto3.core.concurrency.ConcurrencyLimiter> instance
         """
         super(Session, self).__init__()
         self.core_session = session
         self.connection_factory = connection_factory
         self.resource_factory = resource_factory
         self.collection_factory = collection_factory
+        self.concurrency_limiter = concurrency_limiter
 
         self.cache = self.cache_class()
 
@@ -74,6 +83,10 @@ class Session(object):
             from boto3.core.collections import CollectionFactory
             self.collection_factory = CollectionFactory(session=self)
 
+        if not self.concurrency_limiter:
+            from boto3.core.concurrency import ConcurrencyLimiter
+            self.concurrency_limiter = ConcurrencyLimiter()
+
     def get_connection(self, service_name):
         """
         Returns a ``Connection`` **class** for a given service.
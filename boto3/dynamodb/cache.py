@@ -0,0 +1,585 @@
+"""
+A read-through cache of DynamoDB items, shared by everything built from a
+session.
+
+Once enabled, ``Item.get`` answers from the cache when it can, which saves a
+``GetItem`` call (& the read capacity it would use). The cache is filled by
+``Item.get``, ``Table.query``, ``Table.scan`` & ``ItemCollection.get_batch``
+results. Writes made through the same session (``Item.update``,
+``Item.delete``, ``ItemCollection.create`` & ``ItemCollection.create_batch``)
+evict the items they touch.
+
+Entries expire after ``ttl`` seconds, which bounds how stale an item changed
+by some other writer can be. Strongly-consistent reads
+(``consistent_read=True``) & reads of only some attributes
+(``attributes_to_get``) always go to DynamoDB. Items that weren't found
+aren't cached.
+
+Usage::
+
+    >>> from boto3.dynamodb.cache import enable_item_cache
+    >>> cache = enable_item_cache(max_items=50000, ttl=30)
+    # Use ``Item``/``Table``/``ItemCollection`` as usual.
+    >>> cache.stats()
+    {'hits': 9120, 'misses': 880, 'evictions': 0, 'invalidations': 12, ...}
+
+"""
+import threading
+import time
+import weakref
+
+from boto3.dynamodb.types import encode_item
+from boto3.dynamodb.utils import operation_api_name
+from boto3.utils import OrderedDict
+
+
+class ItemCache(object):
+    """
+    A bounded, thread-safe LRU cache of raw (``AttributeValue`` form) items,
+    with a time-to-live.
+
+    Items are cached under ``(region_name, table_name)`` plus their primary
+    key. To pick the key out of ``Query``/``Scan`` results, the cache needs to
+    know each table's key attributes. These are learned from the ``key`` of
+    any ``GetItem``/``UpdateItem``/``DeleteItem`` call, or from a
+    ``DescribeTable`` (``Table.get``), or can be given with ``set_key_names``.
+    """
+    def __init__(self, max_items=10000, ttl=60, clock=time.time):
+        """
+        Creates a new ``ItemCache`` instance.
+
+        :param max_items: (Optional) The most items to hold. Once full, the
+            least recently used item is evicted. Default is ``10000``.
+        :type max_items: integer
+
+        :param ttl: (Optional) How many seconds an item may be served from the
+            cache. Default is ``60``.
+        :type ttl: float
+
+        :param clock: (Optional) A callable returning the current time in
+            seconds. By default, this is ``time.time``.
+        :type clock: callable
+        """
+        super(ItemCache, self).__init__()
+        self.max_items = max_items
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        # ``cache_key -> (expires_at, item)``, oldest first.
+        self._items = OrderedDict()
+        self._key_names = {}
+        # Bumped by every write to a table. A read that started before the
+        # latest write mustn't fill the cache with what may be the old item.
+        self._generations = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        """
+        Returns the cache's counters.
+
+        :returns: The ``hits``, ``misses``, ``evictions``, ``invalidations``,
+            current ``size`` & ``hit_rate`` (from ``0.0`` to ``1.0``)
+        :rtype: dict
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            hit_rate = 0.0
+
+            if lookups:
+                hit_rate = float(self.hits) / lookups
+
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'size': len(self._items),
+                'hit_rate': hit_rate,
+            }
+
+    def clear(self):
+        """
+        Empties the cache. The counters are left alone.
+        """
+        with self._lock:
+            self._items.clear()
+
+    def set_key_names(self, region_name, table_name, key_names):
+        """
+        Records the primary key attribute(s) of a table.
+
+        :param region_name: The region the table is in
+        :type region_name: string
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param key_names: The hash (& range, if any) key attribute names
+        :type key_names: list
+        """
+        with self._lock:
+            self._key_names[(region_name, table_name)] = tuple(
+                sorted(key_names)
+            )
+
+    def key_names(self, region_name, table_name):
+        """
+        Returns the primary key attribute(s) of a table, or ``None`` if they
+        aren't known yet.
+
+        :rtype: tuple
+        """
+        return self._key_names.get((region_name, table_name))
+
+    def generation(self, region_name, table_name):
+        """
+        Returns a token for the table's current state, to hand to ``put``
+        once a read completes.
+
+        :rtype: integer
+        """
+        return self._generations.get((region_name, table_name), 0)
+
+    def _cache_key(self, region_name, table_name, key):
+        # ``key`` is in ``AttributeValue`` form. Key attributes are always
+        # scalars, so the inner values are hashable.
+        return (region_name, table_name, tuple(sorted([
+            (name, tuple(sorted(attr.items()))) for name, attr in key.items()
+        ])))
+
+    def item_key(self, region_name, table_name, item):
+        """
+        Picks the primary key out of a raw item.
+
+        :returns: The key, or ``None`` if the table's key attributes aren't
+            known (or the item lacks them)
+        :rtype: dict
+        """
+        names = self.key_names(region_name, table_name)
+
+        if not names:
+            return None
+
+        key = {}
+
+        for name in names:
+            if not name in item:
+                return None
+
+            key[name] = item[name]
+
+        return key
+
+    def get(self, region_name, table_name, key):
+        """
+        Returns a cached item, or ``None`` if it's not cached (or expired).
+
+        :param region_name: The region the table is in
+        :type region_name: string
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param key: The item's primary key, in ``AttributeValue`` form
+        :type key: dict
+
+        :returns: A copy of the raw item
+        :rtype: dict
+        """
+        cache_key = self._cache_key(region_name, table_name, key)
+
+        with self._lock:
+            entry = self._items.get(cache_key)
+
+            if entry is not None:
+                expires_at, item = entry
+
+                if expires_at > self._clock():
+                    # Most recently used goes to the end.
+                    del self._items[cache_key]
+                    self._items[cache_key] = entry
+                    self.hits += 1
+                    return dict(item)
+
+                del self._items[cache_key]
+
+            self.misses += 1
+            return None
+
+    def put(self, region_name, table_name, item, generation=None, key=None):
+        """
+        Caches a raw item.
+
+        :param region_name: The region the table is in
+        :type region_name: string
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param item: The full item, in ``AttributeValue`` form
+        :type item: dict
+
+        :param generation: (Optional) The ``generation`` from when the read
+            started. If the table has been written to since, the item isn't
+            cached.
+        :type generation: integer
+
+        :param key: (Optional) The item's primary key. By default, this is
+            picked out of the item.
+        :type key: dict
+
+        :returns: Whether the item was cached
+        :rtype: boolean
+        """
+        if key is None:
+            key = self.item_key(region_name, table_name, item)
+
+        if not key:
+            return False
+
+        cache_key = self._cache_key(region_name, table_name, key)
+
+        with self._lock:
+            current = self._generations.get((region_name, table_name), 0)
+
+            if generation is not None and generation != current:
+                return False
+
+            self._items.pop(cache_key, None)
+            self._items[cache_key] = (self._clock() + self.ttl, dict(item))
+
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+            return True
+
+    def invalidate(self, region_name, table_name, key=None):
+        """
+        Evicts an item (or, without a ``key``, the whole table) after a write.
+
+        :param region_name: The region the table is in
+        :type region_name: string
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param key: (Optional) The written item's primary key, in
+            ``AttributeValue`` form. By default, every item cached for the
+            table is evicted.
+        :type key: dict
+        """
+        with self._lock:
+            self.invalidations += 1
+            self._evict(region_name, table_name, key)
+
+    def _evict(self, region_name, table_name, key):
+        # Must be called with the lock held.
+        table = (region_name, table_name)
+        self._generations[table] = self._generations.get(table, 0) + 1
+
+        if key is not None:
+            cache_key = self._cache_key(region_name, table_name, key)
+            self._items.pop(cache_key, None)
+            return
+
+        for cache_key in list(self._items.keys()):
+            if cache_key[:2] == table:
+                del self._items[cache_key]
+
+    def evict_written(self, region_name, table_name, key=None):
+        """
+        Like ``invalidate``, but not counted. Used once a write has succeeded,
+        having already been counted when it was sent.
+        """
+        with self._lock:
+            self._evict(region_name, table_name, key)
+
+
+_caches = weakref.WeakKeyDictionary()
+# What each thread's in-progress call needs to fill or invalidate the cache
+# once its response arrives.
+_pending = threading.local()
+
+
+def _default_session(session):
+    if session is None:
+        import boto3
+        session = boto3.session
+
+    return session
+
+
+def enable_item_cache(session=None, **kwargs):
+    """
+    Turns on the item cache for all DynamoDB resources built by a session.
+
+    :param session: (Optional) The ``Session`` to enable it for. By default,
+        this is ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+
+    :param **kwargs: (Optional) Passed along to ``ItemCache`` (i.e.
+        ``max_items``, ``ttl``).
+    :type **kwargs: dict
+
+    :returns: The session's cache
+    :rtype: <ItemCache> instance
+    """
+    session = _default_session(session)
+    cache = ItemCache(**kwargs)
+    _caches[session] = cache
+    return cache
+
+
+def disable_item_cache(session=None):
+    """
+    Turns off (& discards) the item cache for a session.
+
+    :param session: (Optional) The ``Session`` to disable it for. By default,
+        this is ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+    """
+    session = _default_session(session)
+    _caches.pop(session, None)
+
+
+def get_item_cache(session=None):
+    """
+    Returns the session's ``ItemCache``, or ``None`` if caching isn't enabled.
+
+    :param session: (Optional) The ``Session`` to check. By default, this is
+        ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+
+    :rtype: <ItemCache> instance or None
+    """
+    session = _default_session(session)
+    return _caches.get(session)
+
+
+def _is_full_read(params):
+    # Only whole items are worth caching (or serving).
+    if params.get('attributes_to_get') or params.get('index_name'):
+        return False
+
+    return params.get('select', 'ALL_ATTRIBUTES') == 'ALL_ATTRIBUTES'
+
+
+def cached_get(resource, params):
+    """
+    Answers an ``Item.get`` from the cache, if possible.
+
+    :param resource: The ``Item`` being fetched
+    :type resource: <boto3.dynamodb.resources.Item> instance
+
+    :param params: The parameters for ``get``
+    :type params: dict
+
+    :returns: A ``GetItem``-style response (``{'Item': {...}}``), or ``None``
+        if the call should go to DynamoDB
+    :rtype: dict
+    """
+    cache = get_item_cache(resource._details.session)
+
+    if cache is None:
+        return None
+
+    table_name = params.get('table_name')
+
+    if not table_name or not params.get('key'):
+        return None
+
+    if params.get('consistent_read') or not _is_full_read(params):
+        return None
+
+    region_name = resource._connection.region_name
+    item = cache.get(region_name, table_name, encode_item(params['key']))
+
+    if item is None:
+        return None
+
+    return {'Item': item}
+
+
+WRITE_APIS = ('UpdateItem', 'DeleteItem', 'PutItem', 'BatchWriteItem')
+
+
+def _written_keys(cache, region_name, api_name, params):
+    # Yields ``(table_name, key)`` for everything a write touches. A ``None``
+    # key (the table's key attributes aren't known) means the whole table.
+    if api_name in ('UpdateItem', 'DeleteItem'):
+        yield params.get('table_name'), params.get('key')
+    elif api_name == 'PutItem':
+        table_name = params.get('table_name')
+        yield table_name, cache.item_key(
+            region_name,
+            table_name,
+            params.get('item', {})
+        )
+    elif api_name == 'BatchWriteItem':
+        for table_name, requests in params.get('request_items', {}).items():
+            for request in requests:
+                if 'DeleteRequest' in request:
+                    key = request['DeleteRequest']['Key']
+                else:
+                    key = cache.item_key(
+                        region_name,
+                        table_name,
+                        request['PutRequest']['Item']
+                    )
+
+                yield table_name, key
+
+
+def note_request(resource, method_name, params):
+    """
+    Remembers what a call is about, so ``update_cache`` can fill or
+    invalidate the cache once it succeeds.
+
+    Writes evict what they touch right away, as well as once they've
+    succeeded. A write that times out may still have been applied.
+
+    Meant to be called from ``update_params``, with the encoded parameters.
+
+    :param resource: The resource (or collection) making the call
+    :type resource: <boto3.core.resources.Resource> instance
+
+    :param method_name: The name of the method being called (i.e. ``get``)
+    :type method_name: string
+
+    :param params: The parameters for the call
+    :type params: dict
+
+    :returns: The unmodified parameters
+    :rtype: dict
+    """
+    _pending.request = None
+    cache = get_item_cache(resource._details.session)
+
+    if cache is None:
+        return params
+
+    region_name = resource._connection.region_name
+    api_name = operation_api_name(resource, method_name)
+
+    if api_name in WRITE_APIS:
+        for table_name, key in _written_keys(
+                cache, region_name, api_name, params):
+            cache.invalidate(region_name, table_name, key)
+
+    tables = []
+
+    if params.get('request_items'):
+        tables = list(params['request_items'].keys())
+    elif params.get('table_name'):
+        tables = [params['table_name']]
+
+    generations = dict([
+        (table_name, cache.generation(region_name, table_name))
+        for table_name in tables
+    ])
+    _pending.request = (api_name, params, generations)
+    return params
+
+
+def _learn_key_names(cache, region_name, table_name, key):
+    if key and not cache.key_names(region_name, table_name):
+        cache.set_key_names(region_name, table_name, list(key.keys()))
+
+
+def _fill(cache, region_name, table_name, items, generation):
+    for item in items:
+        cache.put(region_name, table_name, item, generation=generation)
+
+
+def update_cache(resource, method_name, result):
+    """
+    Fills or invalidates the cache from a successful call.
+
+    Meant to be called from ``post_process``.
+
+    :param resource: The resource (or collection) that made the call
+    :type resource: <boto3.core.resources.Resource> instance
+
+    :param method_name: The name of the method called (i.e. ``get``)
+    :type method_name: string
+
+    :param result: The response data from the call
+    :type result: dict
+
+    :returns: The unmodified response data
+    :rtype: dict
+    """
+    request = getattr(_pending, 'request', None)
+    _pending.request = None
+    cache = get_item_cache(resource._details.session)
+
+    if cache is None or not hasattr(result, 'get'):
+        return result
+
+    region_name = resource._connection.region_name
+    api_name = operation_api_name(resource, method_name)
+
+    if api_name == 'DescribeTable':
+        table = result.get('Table', {})
+        key_schema = table.get('KeySchema')
+
+        if key_schema and table.get('TableName'):
+            cache.set_key_names(region_name, table['TableName'], [
+                key['AttributeName'] for key in key_schema
+            ])
+
+        return result
+
+    if request is None or request[0] != api_name:
+        return result
+
+    api_name, params, generations = request
+    table_name = params.get('table_name')
+
+    if api_name in ('GetItem', 'UpdateItem', 'DeleteItem'):
+        _learn_key_names(cache, region_name, table_name, params.get('key'))
+
+    if api_name == 'GetItem':
+        if result.get('Item') and _is_full_read(params):
+            cache.put(
+                region_name,
+                table_name,
+                result['Item'],
+                generation=generations.get(table_name),
+                key=params['key']
+            )
+    elif api_name in ('Query', 'Scan'):
+        if _is_full_read(params):
+            _fill(
+                cache,
+                region_name,
+                table_name,
+                result.get('Items', []),
+                generations.get(table_name)
+            )
+    elif api_name == 'BatchGetItem':
+        for name, items in result.get('Responses', {}).items():
+            request_items = params['request_items'].get(name, {})
+
+            if request_items.get('AttributesToGet'):
+                continue
+
+            keys = request_items.get('Keys')
+
+            if keys:
+                _learn_key_names(cache, region_name, name, keys[0])
+
+            _fill(cache, region_name, name, items, generations.get(name))
+    elif api_name in WRITE_APIS:
+        # Catches anything read (& cached) while the write was in flight.
+        for name, key in _written_keys(cache, region_name, api_name, params):
+            cache.evict_written(region_name, name, key)
+
+    return result
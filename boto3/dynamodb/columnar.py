@@ -0,0 +1,684 @@
+"""
+Exports DynamoDB query/scan results as columns rather than a list of items.
+
+Each page is decoded straight into one buffer per attribute, so millions of
+items never exist as individual dicts. Numbers go into compact ``array``
+buffers (64-bit integers or doubles), which ``to_numpy`` hands to NumPy
+without copying, if it's installed.
+
+Given a ``path``, the columns are written out every ``chunk_rows`` rows to a
+simple columnar file & the buffers emptied, so an export of any size runs in
+bounded memory. ``read_chunks``/``load_columns`` read the file back.
+
+Column types, per attribute:
+
+* ``int`` - ``N`` values without a fraction/exponent that fit in 64 bits
+* ``float`` - other ``N`` values (a column mixing both becomes ``float``)
+* ``string`` - ``S`` values
+* ``binary`` - ``B`` values, as bytes
+* ``object`` - sets, & any attribute whose type varies from item to item,
+  as decoded Python values
+
+Items lacking an attribute are recorded in that column's ``nulls`` mask.
+
+Usage::
+
+    >>> from boto3.dynamodb.resources import Table
+    >>> table = Table(table_name='events')
+    >>> export = table.export_columns(path='/tmp/events.col')
+    >>> for columns in read_chunks('/tmp/events.col'):
+    ...     durations = columns['duration'].to_numpy()
+
+"""
+import array
+import base64
+import json
+import struct
+import sys
+
+from boto3.dynamodb.types import decode_value, encode_value
+from boto3.utils import OrderedDict, six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+INT = 'int'
+FLOAT = 'float'
+STRING = 'string'
+BINARY = 'binary'
+OBJECT = 'object'
+
+MAGIC = b'B3COLS1\n'
+
+# 64-bit signed integers. Python 2's ``array`` has no ``q``, but ``l`` is 64
+# bits on the platforms that matter.
+try:
+    array.array('q')
+    INT_TYPECODE = 'q'
+except ValueError:
+    INT_TYPECODE = 'l'
+
+_NULL_DEFAULTS = {
+    INT: 0,
+    FLOAT: 0.0,
+}
+
+
+def _new_values(kind):
+    if kind == INT:
+        return array.array(INT_TYPECODE)
+
+    if kind == FLOAT:
+        return array.array('d')
+
+    return []
+
+
+def _to_bytes(arr):
+    if hasattr(arr, 'tobytes'):
+        return arr.tobytes()
+
+    return arr.tostring()
+
+
+def _from_bytes(arr, data):
+    if hasattr(arr, 'frombytes'):
+        arr.frombytes(data)
+    else:
+        arr.fromstring(data)
+
+    return arr
+
+
+def _is_integral(raw):
+    return not ('.' in raw or 'e' in raw or 'E' in raw)
+
+
+class Column(object):
+    """
+    The values of a single attribute, in row order.
+
+    ``values`` is an ``array`` for ``int``/``float`` columns & a list
+    otherwise. ``nulls`` is an ``array`` of bytes, ``1`` where the item
+    lacked the attribute (the matching entry in ``values`` is then ``0``,
+    ``0.0`` or ``None``).
+    """
+    def __init__(self, name, kind=None, null_rows=0):
+        """
+        Creates a new ``Column`` instance.
+
+        :param name: The attribute's name
+        :type name: string
+
+        :param kind: (Optional) The column's type. By default, this is taken
+            from the first value appended.
+        :type kind: string
+
+        :param null_rows: (Optional) How many rows to start with, all null.
+            Used when an attribute first turns up partway through a chunk.
+        :type null_rows: integer
+        """
+        super(Column, self).__init__()
+        self.name = name
+        self.kind = kind
+        self.values = _new_values(kind)
+        self.nulls = array.array('B')
+        self._pending_nulls = 0
+
+        if kind is None:
+            self._pending_nulls = null_rows
+        else:
+            for i in range(null_rows):
+                self.append_null()
+
+    def __len__(self):
+        return len(self.nulls) + self._pending_nulls
+
+    def __repr__(self):
+        return 'Column({0!r}, {1!r}, {2} rows)'.format(
+            self.name,
+            self.kind,
+            len(self)
+        )
+
+    def append_null(self):
+        """
+        Records a row lacking the attribute.
+        """
+        if self.kind is None:
+            self._pending_nulls += 1
+            return
+
+        self.values.append(_NULL_DEFAULTS.get(self.kind))
+        self.nulls.append(1)
+
+    def _start(self, kind):
+        self.kind = kind
+        self.values = _new_values(kind)
+        pending, self._pending_nulls = self._pending_nulls, 0
+
+        for i in range(pending):
+            self.append_null()
+
+    def promote(self, kind):
+        """
+        Converts the column to a more general type, keeping its values.
+
+        ``int`` columns can become ``float`` & anything can become
+        ``object``.
+
+        :param kind: The new type (``FLOAT`` or ``OBJECT``)
+        :type kind: string
+        """
+        if kind == self.kind:
+            return
+
+        if self.kind is None:
+            self._start(kind)
+            return
+
+        if kind == FLOAT and self.kind == INT:
+            self.values = array.array('d', [float(v) for v in self.values])
+        elif kind == OBJECT:
+            self.values = [
+                None if null else value
+                for value, null in zip(self.values, self.nulls)
+            ]
+        else:
+            raise TypeError("Can't convert a '{0}' column to '{1}'.".format(
+                self.kind,
+                kind
+            ))
+
+        self.kind = kind
+
+    def append_raw(self, attr):
+        """
+        Appends a value in ``AttributeValue`` form.
+
+        :param attr: The value (i.e. ``{'N': '42'}``)
+        :type attr: dict
+        """
+        for tag, raw in attr.items():
+            break
+        else:
+            raise ValueError("Empty AttributeValue.")
+
+        kind = self.kind
+
+        if tag == 'N':
+            if kind in (None, INT) and _is_integral(raw):
+                if kind is None:
+                    self._start(INT)
+
+                try:
+                    self.values.append(int(raw))
+                    self.nulls.append(0)
+                    return
+                except OverflowError:
+                    # Too big for 64 bits. Keep the exact value.
+                    self.promote(OBJECT)
+            elif kind in (None, INT, FLOAT):
+                self.promote(FLOAT)
+                self.values.append(float(raw))
+                self.nulls.append(0)
+                return
+        elif tag == 'S' and kind in (None, STRING):
+            if kind is None:
+                self._start(STRING)
+
+            self.values.append(raw)
+            self.nulls.append(0)
+            return
+        elif tag == 'B' and kind in (None, BINARY):
+            if kind is None:
+                self._start(BINARY)
+
+            self.values.append(base64.b64decode(raw))
+            self.nulls.append(0)
+            return
+
+        # Sets, or a type that doesn't match the column.
+        self.promote(OBJECT)
+        self.values.append(decode_value(attr))
+        self.nulls.append(0)
+
+    def extend(self, other):
+        """
+        Appends all the rows of another column for the same attribute (i.e.
+        from the next chunk).
+
+        :param other: The column to add
+        :type other: <Column> instance
+        """
+        if other.kind is None:
+            for i in range(len(other)):
+                self.append_null()
+
+            return
+
+        if self.kind != other.kind:
+            kinds = set([self.kind, other.kind])
+
+            if kinds == set([INT, FLOAT]):
+                kind = FLOAT
+            elif self.kind is None:
+                kind = other.kind
+            else:
+                kind = OBJECT
+
+            self.promote(kind)
+            other = other._as_kind(kind)
+
+        self.values.extend(other.values)
+        self.nulls.extend(other.nulls)
+
+    def _as_kind(self, kind):
+        # A converted copy, leaving this column alone.
+        column = Column(self.name, self.kind)
+        column.values = self.values[:]
+        column.nulls = array.array('B', self.nulls)
+        column.promote(kind)
+        return column
+
+    def to_numpy(self):
+        """
+        Returns the values as a NumPy array.
+
+        ``int``/``float`` columns share memory with ``values`` (no copy),
+        others become ``object`` arrays. Use ``null_mask`` to find the rows
+        lacking the attribute.
+
+        :rtype: <numpy.ndarray> instance
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required for 'to_numpy'.")
+
+        if self.kind == INT:
+            return numpy.frombuffer(self.values, dtype=numpy.int64)
+
+        if self.kind == FLOAT:
+            return numpy.frombuffer(self.values, dtype=numpy.float64)
+
+        values = numpy.empty(len(self), dtype=object)
+        values[:len(self.values)] = self.values
+        return values
+
+    def null_mask(self):
+        """
+        Returns a NumPy boolean array, ``True`` where the row lacked the
+        attribute.
+
+        :rtype: <numpy.ndarray> instance
+        """
+        if numpy is None:
+            raise ImportError("NumPy is required for 'null_mask'.")
+
+        if self.kind is None:
+            return numpy.ones(len(self), dtype=bool)
+
+        return numpy.frombuffer(self.nulls, dtype=numpy.uint8).astype(bool)
+
+
+def _encode_strings(values, encode):
+    lengths = array.array(INT_TYPECODE)
+    parts = []
+
+    for value in values:
+        if value is None:
+            lengths.append(0)
+            continue
+
+        data = encode(value)
+        lengths.append(len(data))
+        parts.append(data)
+
+    return _to_bytes(lengths), b''.join(parts)
+
+
+def _decode_strings(lengths, blob, nulls, decode):
+    values = []
+    offset = 0
+
+    for length, null in zip(lengths, nulls):
+        if null:
+            values.append(None)
+            continue
+
+        values.append(decode(blob[offset:offset + length]))
+        offset += length
+
+    return values
+
+
+def _object_to_json(value):
+    if value is None:
+        return None
+
+    attr = encode_value(value)
+
+    for tag in ('B', 'BS'):
+        if tag in attr:
+            raw = attr[tag]
+
+            if tag == 'B':
+                raw = [raw]
+
+            encoded = [base64.b64encode(b).decode('ascii') for b in raw]
+            attr = {tag: encoded[0] if tag == 'B' else encoded}
+
+    return attr
+
+
+def _serialize_column(column):
+    # Returns ``(metadata, [byte strings])``.
+    nulls = _to_bytes(column.nulls)
+    meta = {
+        'name': column.name,
+        'kind': column.kind,
+        'rows': len(column),
+    }
+
+    if column.kind is None:
+        return meta, []
+
+    if column.kind in (INT, FLOAT):
+        data = [_to_bytes(column.values)]
+    elif column.kind == STRING:
+        data = list(_encode_strings(
+            column.values,
+            lambda value: value.encode('utf-8')
+        ))
+    elif column.kind == BINARY:
+        data = list(_encode_strings(column.values, six.binary_type))
+    else:
+        data = [json.dumps([
+            _object_to_json(value) for value in column.values
+        ]).encode('utf-8')]
+
+    data.insert(0, nulls)
+    meta['sizes'] = [len(part) for part in data]
+    return meta, data
+
+
+def _deserialize_column(meta, parts, swap):
+    kind = meta['kind']
+    column = Column(meta['name'], kind, null_rows=0)
+
+    if kind is None:
+        column._pending_nulls = meta['rows']
+        return column
+
+    column.nulls = _from_bytes(array.array('B'), parts[0])
+
+    if kind in (INT, FLOAT):
+        values = _from_bytes(_new_values(kind), parts[1])
+
+        if swap:
+            values.byteswap()
+
+        column.values = values
+    elif kind in (STRING, BINARY):
+        lengths = _from_bytes(array.array(INT_TYPECODE), parts[1])
+
+        if swap:
+            lengths.byteswap()
+
+        decode = six.binary_type
+
+        if kind == STRING:
+            decode = lambda data: data.decode('utf-8')
+
+        column.values = _decode_strings(
+            lengths,
+            parts[2],
+            column.nulls,
+            decode
+        )
+    else:
+        column.values = [
+            None if attr is None else decode_value(attr)
+            for attr in json.loads(parts[1].decode('utf-8'))
+        ]
+
+    return column
+
+
+class ColumnarExport(object):
+    """
+    Collects items into columns, optionally spilling them to a file.
+
+    Usage::
+
+        >>> export = ColumnarExport(path='/tmp/users.col', chunk_rows=50000)
+        >>> for page in results.each_page():
+        ...     export.add_page(page)
+        >>> export.close()
+        >>> export.rows
+        1250000
+
+    """
+    def __init__(self, path=None, chunk_rows=65536):
+        """
+        Creates a new ``ColumnarExport`` instance.
+
+        :param path: (Optional) A file to write the columns to, a chunk at a
+            time. By default, everything is kept in memory (in ``columns``).
+        :type path: string
+
+        :param chunk_rows: (Optional) With a ``path``, how many rows to buffer
+            before writing them out. Default is ``65536``.
+        :type chunk_rows: integer
+        """
+        super(ColumnarExport, self).__init__()
+        self.path = path
+        self.chunk_rows = chunk_rows
+        self.columns = OrderedDict()
+        self.rows = 0
+        self.chunks_written = 0
+        self._chunk_rows = 0
+        self._file = None
+
+        if path is not None:
+            self._file = open(path, 'wb')
+            self._file.write(MAGIC)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add_items(self, items):
+        """
+        Appends raw (``AttributeValue`` form) items.
+
+        :param items: The items (i.e. ``page['Items']``)
+        :type items: list
+        """
+        columns = self.columns
+
+        for item in items:
+            row = self._chunk_rows
+
+            for name, attr in item.items():
+                column = columns.get(name)
+
+                if column is None:
+                    column = Column(name, null_rows=row)
+                    columns[name] = column
+
+                column.append_raw(attr)
+
+            self._chunk_rows = row = row + 1
+
+            if len(item) < len(columns):
+                for column in columns.values():
+                    if len(column) < row:
+                        column.append_null()
+
+            self.rows += 1
+
+            if self._file is not None and self._chunk_rows >= self.chunk_rows:
+                self.flush()
+                columns = self.columns
+
+    def add_page(self, page):
+        """
+        Appends the items from a ``Query``/``Scan`` response.
+
+        :param page: The response data
+        :type page: dict
+        """
+        self.add_items(page.get('Items', []))
+
+    def flush(self):
+        """
+        Writes the buffered rows out as a chunk & empties the buffers.
+
+        Does nothing without a ``path``.
+        """
+        if self._file is None or not self._chunk_rows:
+            return
+
+        metas = []
+        parts = []
+
+        for column in self.columns.values():
+            meta, data = _serialize_column(column)
+            metas.append(meta)
+            parts.extend(data)
+
+        header = json.dumps({
+            'rows': self._chunk_rows,
+            'byteorder': sys.byteorder,
+            'int_size': array.array(INT_TYPECODE).itemsize,
+            'columns': metas,
+        }).encode('utf-8')
+        self._file.write(struct.pack('>I', len(header)))
+        self._file.write(header)
+
+        for part in parts:
+            self._file.write(part)
+
+        self.columns = OrderedDict()
+        self._chunk_rows = 0
+        self.chunks_written += 1
+
+    def close(self):
+        """
+        Writes out anything still buffered & closes the file (if any).
+        """
+        if self._file is None:
+            return
+
+        self.flush()
+        self._file.close()
+        self._file = None
+
+
+def export_columns(pages, path=None, chunk_rows=65536):
+    """
+    Builds columns from a series of ``Query``/``Scan`` responses.
+
+    :param pages: The responses, typically ``PagedResults.each_page()``
+    :type pages: iterable
+
+    :param path: (Optional) A file to spill the columns to. By default,
+        everything is kept in memory.
+    :type path: string
+
+    :param chunk_rows: (Optional) With a ``path``, how many rows to buffer
+        before writing them out. Default is ``65536``.
+    :type chunk_rows: integer
+
+    :returns: The finished (closed) export. Without a ``path``, its
+        ``columns`` hold the data.
+    :rtype: <ColumnarExport> instance
+    """
+    export = ColumnarExport(path=path, chunk_rows=chunk_rows)
+
+    with export:
+        for page in pages:
+            export.add_page(page)
+
+    return export
+
+
+def read_chunks(path):
+    """
+    Reads back a file written by ``ColumnarExport``, a chunk at a time.
+
+    :param path: The file to read
+    :type path: string
+
+    :returns: A generator of ``OrderedDict``s of attribute name to
+        ``Column``
+    """
+    with open(path, 'rb') as handle:
+        if handle.read(len(MAGIC)) != MAGIC:
+            raise ValueError("'{0}' is not a columnar export.".format(path))
+
+        while True:
+            size = handle.read(4)
+
+            if not size:
+                break
+
+            header = json.loads(
+                handle.read(struct.unpack('>I', size)[0]).decode('utf-8')
+            )
+
+            if header['int_size'] != array.array(INT_TYPECODE).itemsize:
+                raise ValueError(
+                    "Integers in '{0}' are {1} bytes, not {2}.".format(
+                        path,
+                        header['int_size'],
+                        array.array(INT_TYPECODE).itemsize
+                    )
+                )
+
+            swap = header['byteorder'] != sys.byteorder
+            columns = OrderedDict()
+
+            for meta in header['columns']:
+                parts = [handle.read(size) for size in meta.get('sizes', [])]
+                columns[meta['name']] = _deserialize_column(meta, parts, swap)
+
+            yield columns
+
+
+def load_columns(path):
+    """
+    Reads a whole file written by ``ColumnarExport`` into memory, joining
+    the chunks into one ``Column`` per attribute.
+
+    :param path: The file to read
+    :type path: string
+
+    :rtype: ``OrderedDict`` of attribute name to ``Column``
+    """
+    columns = OrderedDict()
+    rows = 0
+
+    for chunk in read_chunks(path):
+        chunk_rows = 0
+
+        for name, column in chunk.items():
+            chunk_rows = max(chunk_rows, len(column))
+
+            if not name in columns:
+                columns[name] = Column(name, null_rows=rows)
+
+            columns[name].extend(column)
+
+        rows += chunk_rows
+
+        for column in columns.values():
+            while len(column) < rows:
+                column.append_null()
+
+    return columns
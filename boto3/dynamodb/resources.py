@@ -0,0 +1,294 @@
+import boto3
+from boto3.core.collections import Collection
+from boto3.core.resources import Resource
+from boto3.dynamodb.cache import cached_get, note_request, update_cache
+from boto3.dynamodb.columnar import export_columns
+from boto3.dynamodb.throttle import limit_request, settle_result
+from boto3.dynamodb.types import encode_params, get_schema
+from boto3.dynamodb.utils import PagedResults, parallel_scan
+
+
+class TableCustomizations(Resource):
+    def update_params(self, conn_method_name, params):
+        params = super(TableCustomizations, self).update_params(
+            conn_method_name,
+            params
+        )
+
+        # Tables built by ``TableCollection.create`` (or by hand, like
+        # ``Table(table_name='exports')``) know their name. Save the user from
+        # repeating it on every call.
+        if not 'table_name' in params and 'table_name' in self._data:
+            params['table_name'] = self._data['table_name']
+
+        params = encode_params(params, connection=self._connection)
+        params = limit_request(self, conn_method_name, params)
+        return note_request(self, conn_method_name, params)
+
+    def post_process(self, conn_method_name, result):
+        result = super(TableCustomizations, self).post_process(
+            conn_method_name,
+            result
+        )
+        result = settle_result(self, conn_method_name, result)
+        return update_cache(self, conn_method_name, result)
+
+    def get_schema(self, table_name=None):
+        """
+        Returns the shared ``ItemSchema`` for the table, used to convert items
+        between native Python values & ``AttributeValue`` form.
+
+        :param table_name: (Optional) The name of the table. By default, this
+            is the ``table_name`` from the instance data.
+        :type table_name: string
+
+        :rtype: <boto3.dynamodb.types.ItemSchema> instance
+        """
+        if table_name is None:
+            table_name = self._data.get('table_name')
+
+        return get_schema(
+            table_name,
+            description=self._data,
+            connection=self._connection
+        )
+
+    def _schema_for(self, decode, params):
+        if not decode:
+            return None
+
+        return self.get_schema(params.get('table_name'))
+
+    def iter_query(self, max_items=None, page_size=None, prefetch=False,
+                   decode=False, **kwargs):
+        """
+        Queries the table, paging through the results automatically.
+
+        Accepts all the same parameters as ``query``, plus the paging options
+        below. See ``boto3.dynamodb.utils.PagedResults`` for the details.
+
+        :param max_items: (Optional) The most items to return in total. By
+            default, every matching item is returned.
+        :type max_items: integer
+
+        :param page_size: (Optional) The most items to request per page.
+        :type page_size: integer
+
+        :param prefetch: (Optional) Whether to request the next page in the
+            background while the current one is being consumed. Default is
+            ``False``.
+        :type prefetch: boolean
+
+        :param decode: (Optional) Whether to convert the items to native
+            Python values. Default is ``False``.
+        :type decode: boolean
+
+        :returns: An iterable of the items, which also records the capacity
+            consumed by each page
+        :rtype: <boto3.dynamodb.utils.PagedResults> instance
+        """
+        return PagedResults(
+            self.query,
+            max_items=max_items,
+            page_size=page_size,
+            prefetch=prefetch,
+            schema=self._schema_for(decode, kwargs),
+            **kwargs
+        )
+
+    def iter_scan(self, max_items=None, page_size=None, prefetch=False,
+                  decode=False, **kwargs):
+        """
+        Scans the table, paging through the results automatically.
+
+        Accepts all the same parameters as ``scan``, plus the paging options
+        described on ``iter_query``.
+
+        :returns: An iterable of the items, which also records the capacity
+            consumed by each page
+        :rtype: <boto3.dynamodb.utils.PagedResults> instance
+        """
+        return PagedResults(
+            self.scan,
+            max_items=max_items,
+            page_size=page_size,
+            prefetch=prefetch,
+            schema=self._schema_for(decode, kwargs),
+            **kwargs
+        )
+
+    def parallel_scan(self, total_segments=4, max_workers=None,
+                      max_read_capacity=None, executor=None, decode=False,
+                      read_limiter=None, **kwargs):
+        """
+        Scans the table in ``total_segments`` parallel segments, yielding the
+        items from all of them as a single iterator.
+
+        See ``boto3.dynamodb.utils.parallel_scan`` for the details.
+
+        :param total_segments: (Optional) How many segments to split the table
+            into. Default is ``4``.
+        :type total_segments: integer
+
+        :param max_workers: (Optional) How many threads to scan with. By
+            default, this is one per segment.
+        :type max_workers: integer
+
+        :param max_read_capacity: (Optional) The most read capacity units per
+            second the scan may consume. By default, the scan is not
+            rate-limited.
+        :type max_read_capacity: float
+
+        :param executor: (Optional) An existing thread pool to run the segment
+            workers on.
+        :type executor: <concurrent.futures.Executor> instance
+
+        :param decode: (Optional) Whether to convert the items to native
+            Python values. Default is ``False``.
+        :type decode: boolean
+
+        :param read_limiter: (Optional) An existing bucket of read capacity
+            units to pace against, in place of ``max_read_capacity``.
+        :type read_limiter: <boto3.utils.ratelimit.TokenBucket> instance
+
+        :returns: A generator of the items
+        """
+        return parallel_scan(
+            self,
+            total_segments=total_segments,
+            max_workers=max_workers,
+            max_read_capacity=max_read_capacity,
+            executor=executor,
+            schema=self._schema_for(decode, kwargs),
+            read_limiter=read_limiter,
+            **kwargs
+        )
+
+    def export_columns(self, operation='scan', path=None, chunk_rows=65536,
+                       **kwargs):
+        """
+        Queries or scans the table, collecting the results into columns (one
+        per attribute) rather than a list of items.
+
+        Accepts all the same parameters as ``query``/``scan``, plus the
+        options below. See ``boto3.dynamodb.columnar`` for the details.
+
+        :param operation: (Optional) Either ``scan`` or ``query``. Default is
+            ``scan``.
+        :type operation: string
+
+        :param path: (Optional) A file to spill the columns to, every
+            ``chunk_rows`` rows. By default, everything is kept in memory.
+        :type path: string
+
+        :param chunk_rows: (Optional) With a ``path``, how many rows to buffer
+            before writing them out. Default is ``65536``.
+        :type chunk_rows: integer
+
+        :returns: The finished export. Without a ``path``, its ``columns``
+            hold the data.
+        :rtype: <boto3.dynamodb.columnar.ColumnarExport> instance
+        """
+        if not operation in ('scan', 'query'):
+            raise ValueError(
+                "Can only export from 'scan' or 'query', not '{0}'.".format(
+                    operation
+                )
+            )
+
+        results = PagedResults(getattr(self, operation), **kwargs)
+        return export_columns(
+            results.each_page(),
+            path=path,
+            chunk_rows=chunk_rows
+        )
+
+
+class ItemCustomizations(Resource):
+    def update_params(self, conn_method_name, params):
+        params = super(ItemCustomizations, self).update_params(
+            conn_method_name,
+            params
+        )
+        # Allow native values for ``key``, ``attribute_updates``, etc.
+        params = encode_params(params, connection=self._connection)
+        params = limit_request(self, conn_method_name, params)
+        return note_request(self, conn_method_name, params)
+
+    def post_process(self, conn_method_name, result):
+        result = super(ItemCustomizations, self).post_process(
+            conn_method_name,
+            result
+        )
+        result = settle_result(self, conn_method_name, result)
+        return update_cache(self, conn_method_name, result)
+
+
+class ItemCollectionCustomizations(Collection):
+    def update_params(self, conn_method_name, params):
+        params = super(ItemCollectionCustomizations, self).update_params(
+            conn_method_name,
+            params
+        )
+        # Allow native values for ``item``, ``request_items``, etc.
+        params = encode_params(params, connection=self._connection)
+        params = limit_request(self, conn_method_name, params)
+        return note_request(self, conn_method_name, params)
+
+    def post_process(self, conn_method_name, result):
+        result = super(ItemCollectionCustomizations, self).post_process(
+            conn_method_name,
+            result
+        )
+        result = settle_result(self, conn_method_name, result)
+        return update_cache(self, conn_method_name, result)
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+TableCollection = boto3.session.get_collection(
+    'dynamodb',
+    'TableCollection'
+)
+ItemCollection = boto3.session.get_collection(
+    'dynamodb',
+    'ItemCollection',
+    base_class=ItemCollectionCustomizations
+)
+Table = boto3.session.get_resource(
+    'dynamodb',
+    'Table',
+    base_class=TableCustomizations
+)
+GeneratedItem = boto3.session.get_resource(
+    'dynamodb',
+    'Item',
+    base_class=ItemCustomizations
+)
+
+
+class Item(GeneratedItem):
+    # The generated ``get`` lives on ``GeneratedItem`` itself, so only a
+    # subclass can put the cache in front of it.
+    def get(self, **kwargs):
+        """
+        Fetches an item (``GetItem``).
+
+        If the item cache is enabled for the session (see
+        ``boto3.dynamodb.cache``), a cached copy is returned when available,
+        without calling DynamoDB.
+
+        :returns: The response data, with the item under ``Item``
+        :rtype: dict
+        """
+        result = cached_get(self, kwargs)
+
+        if result is not None:
+            return self.full_post_process('get', result)
+
+        return super(Item, self).get(**kwargs)
+
+
+# Keep it on the collection, not the session-wide cached version.
+TableCollection.change_resource(Table)
+ItemCollection.change_resource(Item)
@@ -0,0 +1,501 @@
+"""
+Client-side pacing of DynamoDB calls against each table's provisioned
+throughput.
+
+Once enabled for a session, every ``Table``, ``Item`` & ``ItemCollection``
+call waits for capacity from a per-table token bucket before it's sent. The
+buckets refill at the table's provisioned read/write rate (from
+``DescribeTable``) & the true cost of each call is settled up afterward,
+using the ``ConsumedCapacity`` from the response. Parallel readers & writers
+sharing a session therefore pace themselves, rather than overrunning the
+table & retrying ``ProvisionedThroughputExceededException`` errors.
+
+Usage::
+
+    >>> from boto3.dynamodb.throttle import enable_capacity_limits
+    >>> limiter = enable_capacity_limits(utilization=0.8)
+    # Now use ``Table``/``Item``/``ItemCollection`` as usual, from as many
+    # threads as you like.
+    >>> limiter.table('users').read.rate
+    40.0
+
+"""
+import threading
+import time
+import weakref
+
+from boto3.dynamodb.utils import operation_api_name
+from boto3.utils.ratelimit import TokenBucket
+
+
+READ = 'read'
+WRITE = 'write'
+
+OPERATION_KINDS = {
+    'GetItem': READ,
+    'Query': READ,
+    'Scan': READ,
+    'BatchGetItem': READ,
+    'PutItem': WRITE,
+    'UpdateItem': WRITE,
+    'DeleteItem': WRITE,
+    'BatchWriteItem': WRITE,
+}
+
+
+class TableCapacity(object):
+    """
+    The read & write token buckets for a single table.
+    """
+    # How much weight the latest observed cost gets, when estimating the cost
+    # of the next call.
+    smoothing = 0.2
+
+    def __init__(self, table_name, read_units, write_units, utilization=1.0,
+                 burst_seconds=1.0, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``TableCapacity`` instance.
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param read_units: The table's provisioned read capacity units
+        :type read_units: float
+
+        :param write_units: The table's provisioned write capacity units
+        :type write_units: float
+
+        :param utilization: (Optional) The fraction of the provisioned
+            throughput to use. Default is ``1.0``.
+        :type utilization: float
+
+        :param burst_seconds: (Optional) How many seconds worth of unused
+            capacity may be saved up for a burst. Default is ``1.0``.
+        :type burst_seconds: float
+        """
+        super(TableCapacity, self).__init__()
+        self.table_name = table_name
+        self.utilization = utilization
+        self.burst_seconds = burst_seconds
+        self.loaded_at = clock()
+        self.read = self._build_bucket(read_units, clock, sleep)
+        self.write = self._build_bucket(write_units, clock, sleep)
+        self._estimates = {READ: 1.0, WRITE: 1.0}
+
+    def __str__(self):
+        return 'TableCapacity: {0} (read {1:.1f}/s, write {2:.1f}/s)'.format(
+            self.table_name,
+            self.read.rate,
+            self.write.rate
+        )
+
+    def _build_bucket(self, units, clock, sleep):
+        # Starts full, so a fresh table gets its burst straight away.
+        rate = float(units) * self.utilization
+        return TokenBucket(
+            rate=rate,
+            capacity=rate * self.burst_seconds,
+            clock=clock,
+            sleep=sleep
+        )
+
+    def set_provisioned(self, read_units, write_units):
+        """
+        Updates the refill rates from the table's provisioned throughput.
+
+        :param read_units: The table's provisioned read capacity units
+        :type read_units: float
+
+        :param write_units: The table's provisioned write capacity units
+        :type write_units: float
+        """
+        for bucket, units in ((self.read, read_units),
+                              (self.write, write_units)):
+            rate = float(units) * self.utilization
+            bucket.rate = rate
+            bucket.capacity = rate * self.burst_seconds
+
+    def bucket(self, kind):
+        """
+        Returns the bucket for ``READ`` or ``WRITE`` operations.
+
+        :rtype: <boto3.utils.ratelimit.TokenBucket> instance
+        """
+        if kind == READ:
+            return self.read
+
+        return self.write
+
+    def estimate(self, kind):
+        """
+        Returns the expected cost of the next single-item/page call of a kind,
+        based on recent calls.
+
+        :rtype: float
+        """
+        return self._estimates[kind]
+
+    def observe(self, kind, units):
+        """
+        Records the true cost of a call, to improve future estimates.
+
+        :param kind: ``READ`` or ``WRITE``
+        :type kind: string
+
+        :param units: The capacity units consumed
+        :type units: float
+        """
+        previous = self._estimates[kind]
+        self._estimates[kind] = max(
+            previous + self.smoothing * (units - previous),
+            0.5
+        )
+
+
+class CapacityLimiter(object):
+    """
+    Tracks the ``TableCapacity`` for every table a session talks to.
+
+    Typically created by ``enable_capacity_limits`` rather than by hand.
+    """
+    def __init__(self, utilization=1.0, burst_seconds=1.0,
+                 refresh_interval=300, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``CapacityLimiter`` instance.
+
+        :param utilization: (Optional) The fraction of each table's
+            provisioned throughput to use. Default is ``1.0``.
+        :type utilization: float
+
+        :param burst_seconds: (Optional) How many seconds worth of unused
+            capacity may be saved up for a burst. Default is ``1.0``.
+        :type burst_seconds: float
+
+        :param refresh_interval: (Optional) How often (in seconds) to re-read
+            each table's provisioned throughput, to pick up ``UpdateTable``
+            changes. Default is ``300``.
+        :type refresh_interval: integer
+        """
+        super(CapacityLimiter, self).__init__()
+        self.utilization = utilization
+        self.burst_seconds = burst_seconds
+        self.refresh_interval = refresh_interval
+        self._clock = clock
+        self._sleep = sleep
+        self._tables = {}
+        self._lock = threading.Lock()
+        # The estimates charged by the in-progress call on each thread, so
+        # the difference can be settled when the response arrives.
+        self._pending = threading.local()
+
+    def set_capacity(self, table_name, read_units, write_units):
+        """
+        Sets a table's provisioned throughput by hand, skipping the
+        ``DescribeTable`` call.
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param read_units: The table's provisioned read capacity units
+        :type read_units: float
+
+        :param write_units: The table's provisioned write capacity units
+        :type write_units: float
+
+        :rtype: <TableCapacity> instance
+        """
+        with self._lock:
+            capacity = self._tables.get(table_name)
+
+            if capacity is None:
+                capacity = TableCapacity(
+                    table_name,
+                    read_units,
+                    write_units,
+                    utilization=self.utilization,
+                    burst_seconds=self.burst_seconds,
+                    clock=self._clock,
+                    sleep=self._sleep
+                )
+                self._tables[table_name] = capacity
+            else:
+                capacity.set_provisioned(read_units, write_units)
+                capacity.loaded_at = self._clock()
+
+            return capacity
+
+    def table(self, table_name, connection=None):
+        """
+        Returns the ``TableCapacity`` for a table.
+
+        If the table isn't known yet (or the information is stale), its
+        provisioned throughput is read with ``DescribeTable`` over
+        ``connection``.
+
+        :param table_name: The name of the table
+        :type table_name: string
+
+        :param connection: (Optional) A DynamoDB connection, used to describe
+            the table if needed.
+        :type connection: <boto3.core.connection.Connection> subclass instance
+
+        :rtype: <TableCapacity> instance
+        """
+        capacity = self._tables.get(table_name)
+
+        if capacity is not None:
+            age = self._clock() - capacity.loaded_at
+
+            if connection is None or age < self.refresh_interval:
+                return capacity
+
+        if connection is None:
+            raise KeyError(
+                "No capacity known for table '{0}'.".format(table_name)
+            )
+
+        # Concurrent first calls may each describe the table. That's harmless
+        # & cheaper than holding the lock over a network call.
+        resp = connection.describe_table(table_name=table_name)
+        throughput = resp['Table']['ProvisionedThroughput']
+        return self.set_capacity(
+            table_name,
+            throughput['ReadCapacityUnits'],
+            throughput['WriteCapacityUnits']
+        )
+
+    def _estimate_costs(self, kind, params, connection):
+        # Returns a list of ``(TableCapacity, estimated_units, is_batch)``.
+        # Batch calls are flagged, since their cost says little about the
+        # next single-item call.
+        costs = []
+
+        if 'request_items' in params:
+            for table_name, requests in params['request_items'].items():
+                capacity = self.table(table_name, connection)
+
+                if hasattr(requests, 'items'):
+                    count = len(requests.get('Keys', []))
+                else:
+                    count = len(requests)
+
+                costs.append((capacity, capacity.estimate(kind) * count, True))
+        elif params.get('table_name'):
+            capacity = self.table(params['table_name'], connection)
+            costs.append((capacity, capacity.estimate(kind), False))
+
+        return costs
+
+    def acquire(self, kind, params, connection=None):
+        """
+        Waits until the tables a call touches have the capacity it's expected
+        to use.
+
+        Also ensures the call will report its ``ConsumedCapacity``, so
+        ``settle`` can account for the true cost.
+
+        :param kind: ``READ`` or ``WRITE``
+        :type kind: string
+
+        :param params: The parameters for the call
+        :type params: dict
+
+        :param connection: (Optional) A DynamoDB connection, used to describe
+            unfamiliar tables.
+        :type connection: <boto3.core.connection.Connection> subclass instance
+
+        :returns: The parameters, updated as needed
+        :rtype: dict
+        """
+        costs = self._estimate_costs(kind, params, connection)
+
+        for capacity, units, is_batch in costs:
+            capacity.bucket(kind).consume(units)
+
+        self._pending.charged = dict([
+            (capacity.table_name, (kind, units, is_batch))
+            for capacity, units, is_batch in costs
+        ])
+
+        if costs:
+            params.setdefault('return_consumed_capacity', 'TOTAL')
+
+        return params
+
+    def settle(self, result):
+        """
+        Accounts for the true cost of a call, using the ``ConsumedCapacity``
+        reported in the response.
+
+        :param result: The response data from the call
+        :type result: dict
+
+        :returns: The unmodified response data
+        :rtype: dict
+        """
+        charged = getattr(self._pending, 'charged', None) or {}
+        self._pending.charged = {}
+
+        if not hasattr(result, 'get'):
+            return result
+
+        consumed = result.get('ConsumedCapacity') or []
+
+        if hasattr(consumed, 'items'):
+            consumed = [consumed]
+
+        for cap in consumed:
+            table_name = cap.get('TableName')
+
+            if not table_name in charged:
+                continue
+
+            kind, estimated, is_batch = charged[table_name]
+            units = float(cap.get('CapacityUnits', 0))
+            capacity = self._tables[table_name]
+            capacity.bucket(kind).charge(units - estimated)
+
+            if not is_batch:
+                capacity.observe(kind, units)
+
+        return result
+
+
+_limiters = weakref.WeakKeyDictionary()
+
+
+def _default_session(session):
+    if session is None:
+        import boto3
+        session = boto3.session
+
+    return session
+
+
+def enable_capacity_limits(session=None, **kwargs):
+    """
+    Turns on capacity-aware pacing for all DynamoDB resources built by a
+    session.
+
+    :param session: (Optional) The ``Session`` to enable it for. By default,
+        this is ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+
+    :param **kwargs: (Optional) Passed along to ``CapacityLimiter`` (i.e.
+        ``utilization``, ``burst_seconds``, ``refresh_interval``).
+    :type **kwargs: dict
+
+    :returns: The session's limiter
+    :rtype: <CapacityLimiter> instance
+    """
+    session = _default_session(session)
+    limiter = CapacityLimiter(**kwargs)
+    _limiters[session] = limiter
+    return limiter
+
+
+def disable_capacity_limits(session=None):
+    """
+    Turns off capacity-aware pacing for a session.
+
+    :param session: (Optional) The ``Session`` to disable it for. By default,
+        this is ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+    """
+    session = _default_session(session)
+    _limiters.pop(session, None)
+
+
+def get_capacity_limiter(session=None):
+    """
+    Returns the session's ``CapacityLimiter``, or ``None`` if pacing isn't
+    enabled.
+
+    :param session: (Optional) The ``Session`` to check. By default, this is
+        ``boto3.session``.
+    :type session: <boto3.core.session.Session> instance
+
+    :rtype: <CapacityLimiter> instance or None
+    """
+    session = _default_session(session)
+    return _limiters.get(session)
+
+
+def limit_request(resource, method_name, params):
+    """
+    Waits for capacity before a ``Resource``/``Collection`` method's call is
+    sent, if pacing is enabled for its session.
+
+    Meant to be called from ``update_params``.
+
+    :param resource: The resource (or collection) making the call
+    :type resource: <boto3.core.resources.Resource> instance
+
+    :param method_name: The name of the method being called (i.e. ``query``)
+    :type method_name: string
+
+    :param params: The parameters for the call
+    :type params: dict
+
+    :returns: The parameters, updated as needed
+    :rtype: dict
+    """
+    limiter = get_capacity_limiter(resource._details.session)
+
+    if limiter is None:
+        return params
+
+    kind = OPERATION_KINDS.get(operation_api_name(resource, method_name))
+
+    if kind is None:
+        return params
+
+    return limiter.acquire(kind, params, connection=resource._connection)
+
+
+def settle_result(resource, method_name, result):
+    """
+    Accounts for the true cost of a ``Resource``/``Collection`` method's call,
+    if pacing is enabled for its session.
+
+    ``DescribeTable`` responses (i.e. from ``Table.get``) also refresh the
+    table's provisioned throughput.
+
+    Meant to be called from ``post_process``.
+
+    :param resource: The resource (or collection) that made the call
+    :type resource: <boto3.core.resources.Resource> instance
+
+    :param method_name: The name of the method called (i.e. ``query``)
+    :type method_name: string
+
+    :param result: The response data from the call
+    :type result: dict
+
+    :returns: The unmodified response data
+    :rtype: dict
+    """
+    limiter = get_capacity_limiter(resource._details.session)
+
+    if limiter is None:
+        return result
+
+    api_name = operation_api_name(resource, method_name)
+
+    if api_name == 'DescribeTable' and hasattr(result, 'get'):
+        table = result.get('Table', {})
+        throughput = table.get('ProvisionedThroughput')
+
+        if throughput and table.get('TableName'):
+            limiter.set_capacity(
+                table['TableName'],
+                throughput['ReadCapacityUnits'],
+                throughput['WriteCapacityUnits']
+            )
+
+        return result
+
+    if not api_name in OPERATION_KINDS:
+        return result
+
+    return limiter.settle(result)
@@ -0,0 +1,582 @@
+"""
+Converts between native Python values & DynamoDB's ``AttributeValue`` form.
+
+DynamoDB hands back (& expects) every attribute as a single-key dict naming
+its type, like ``{'S': 'hello'}`` or ``{'NS': ['1', '2']}``. The conversions
+here work on whole items & pages at a time, using an ``ItemSchema`` that
+remembers the type of each attribute it has seen, so decoding a page is a
+dict lookup & a single call per attribute.
+
+Usage::
+
+    >>> from boto3.dynamodb.types import get_schema
+    >>> schema = get_schema('users', connection=conn)
+    >>> schema.encode_item({'username': 'daniel', 'logins': 42})
+    {'username': {'S': 'daniel'}, 'logins': {'N': '42'}}
+    >>> schema.decode_page(page['Items'])
+    [{'username': 'daniel', 'logins': Decimal('42')}, ...]
+
+Numbers always decode to ``Decimal``, so every value of an ``N`` attribute
+(or member of an ``NS`` set) has the same type & keeps its exact value.
+
+"""
+import base64
+import operator
+import threading
+import weakref
+from decimal import Decimal
+
+from boto3.utils import six
+
+
+STRING = 'S'
+NUMBER = 'N'
+BINARY = 'B'
+STRING_SET = 'SS'
+NUMBER_SET = 'NS'
+BINARY_SET = 'BS'
+
+
+class Binary(object):
+    """
+    Wraps binary data, so it's stored as ``B`` rather than ``S``.
+
+    Only needed on Python 2, where ``str`` could be either. On Python 3,
+    ``bytes`` are stored as binary without wrapping. Decoded binary values are
+    always ``Binary`` instances.
+    """
+    def __init__(self, value):
+        if not isinstance(value, (six.binary_type, bytearray)):
+            raise TypeError("Binary values must be bytes, not '{0}'.".format(
+                type(value).__name__
+            ))
+
+        self.value = six.binary_type(value)
+
+    def __eq__(self, other):
+        if isinstance(other, Binary):
+            return self.value == other.value
+
+        return self.value == other
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.value)
+
+    def __repr__(self):
+        return 'Binary({0!r})'.format(self.value)
+
+    def __bytes__(self):
+        return self.value
+
+    def __str__(self):
+        return str(self.value)
+
+
+def _encode_number(value):
+    if isinstance(value, bool):
+        return str(int(value))
+
+    if isinstance(value, float):
+        # ``repr`` gives the shortest string that round-trips.
+        return repr(value)
+
+    return str(value)
+
+
+# DynamoDB numbers carry up to 38 digits of precision, which only ``Decimal``
+# holds exactly.
+_decode_number = Decimal
+
+
+def _decode_binary(value):
+    # Binary arrives base64-encoded in the JSON response.
+    return Binary(base64.b64decode(value))
+
+
+def _decode_string_set(value):
+    return set(value)
+
+
+def _decode_number_set(value):
+    return set([_decode_number(number) for number in value])
+
+
+def _decode_binary_set(value):
+    return set([_decode_binary(binary) for binary in value])
+
+
+DECODERS = {
+    # ``None`` means the raw value is already what we want.
+    STRING: None,
+    NUMBER: _decode_number,
+    BINARY: _decode_binary,
+    STRING_SET: _decode_string_set,
+    NUMBER_SET: _decode_number_set,
+    BINARY_SET: _decode_binary_set,
+}
+
+NUMBER_TYPES = six.integer_types + (float, Decimal)
+
+
+def _is_binary(value):
+    if isinstance(value, Binary):
+        return True
+
+    # On Python 2, ``str`` is text as far as we're concerned.
+    return six.PY3 and isinstance(value, (six.binary_type, bytearray))
+
+
+def _raw_binary(value):
+    # ``botocore`` takes care of the base64-encoding on the way out.
+    if isinstance(value, Binary):
+        return value.value
+
+    return six.binary_type(value)
+
+
+def encode_value(value):
+    """
+    Converts a native Python value into ``AttributeValue`` form.
+
+    Strings become ``S``, numbers (``int``, ``float``, ``Decimal``) become
+    ``N``, ``Binary`` (or ``bytes`` on Python 3) become ``B`` & non-empty
+    sets of any of those become ``SS``/``NS``/``BS``.
+
+    A dict is assumed to already be in ``AttributeValue`` form & is returned
+    untouched.
+
+    :param value: The value to convert
+    :type value: string, number, ``Binary`` or set
+
+    :returns: The ``AttributeValue`` form of the value
+    :rtype: dict
+    """
+    if hasattr(value, 'items'):
+        return value
+
+    if isinstance(value, six.string_types) and not _is_binary(value):
+        return {STRING: value}
+
+    if isinstance(value, NUMBER_TYPES):
+        return {NUMBER: _encode_number(value)}
+
+    if _is_binary(value):
+        return {BINARY: _raw_binary(value)}
+
+    if isinstance(value, (set, frozenset)):
+        if not value:
+            raise ValueError("DynamoDB can not store empty sets.")
+
+        if all([isinstance(v, NUMBER_TYPES) for v in value]):
+            return {NUMBER_SET: [_encode_number(v) for v in value]}
+
+        if all([_is_binary(v) for v in value]):
+            return {BINARY_SET: [_raw_binary(v) for v in value]}
+
+        if all([isinstance(v, six.string_types) for v in value]):
+            return {STRING_SET: list(value)}
+
+        raise TypeError("Sets must contain only strings, numbers or binary.")
+
+    raise TypeError("Unsupported type '{0}' for DynamoDB.".format(
+        type(value).__name__
+    ))
+
+
+def _compile_getter(tag):
+    # Builds a function taking the whole ``AttributeValue`` & returning the
+    # native value, raising ``KeyError`` if it holds some other type.
+    decoder = DECODERS[tag]
+
+    if decoder is None:
+        # A C-level lookup, with no Python call overhead at all.
+        return operator.itemgetter(tag)
+
+    def _getter(attr):
+        return decoder(attr[tag])
+
+    return _getter
+
+
+def decode_value(attr):
+    """
+    Converts an ``AttributeValue`` into a native Python value.
+
+    :param attr: The ``AttributeValue`` (i.e. ``{'N': '42'}``)
+    :type attr: dict
+
+    :returns: The native value
+    """
+    for tag, value in attr.items():
+        decoder = DECODERS.get(tag)
+
+        if decoder is None:
+            if not tag in DECODERS:
+                raise TypeError("Unknown DynamoDB type '{0}'.".format(tag))
+
+            return value
+
+        return decoder(value)
+
+    raise ValueError("Empty AttributeValue.")
+
+
+class ItemSchema(object):
+    """
+    Encodes & decodes whole items for a single table.
+
+    Attribute types can be declared up front (``from_table_description``
+    picks up the key attributes), & any other attribute is learned the first
+    time it's seen. Each known attribute gets a getter compiled for its type,
+    so decoding it is a dict lookup & a single call, rather than inspecting
+    every ``AttributeValue``.
+
+    Schemas are safe to share between threads. Typically, you'd fetch the
+    shared schema for a table via ``get_schema``.
+    """
+    def __init__(self, attribute_types=None):
+        """
+        Creates a new ``ItemSchema`` instance.
+
+        :param attribute_types: (Optional) A mapping of attribute names to
+            their type (``S``, ``N``, ``B``, ``SS``, ``NS`` or ``BS``).
+        :type attribute_types: dict
+        """
+        super(ItemSchema, self).__init__()
+        self._types = {}
+        self._getters = {}
+
+        for name, tag in (attribute_types or {}).items():
+            self.declare(name, tag)
+
+    def __contains__(self, name):
+        return name in self._types
+
+    @classmethod
+    def from_table_description(cls, description):
+        """
+        Builds a schema from a table's description, as returned by
+        ``DescribeTable`` or ``CreateTable``.
+
+        :param description: The table's description. Either the full response
+            or just the ``Table``/``TableDescription`` portion. Keys may be
+            either the raw API names or snake_cased (as found on a ``Table``
+            instance's data).
+        :type description: dict
+
+        :returns: A new schema with the key attribute types declared
+        :rtype: <ItemSchema> instance
+        """
+        for wrapper in ('Table', 'TableDescription', 'table'):
+            if wrapper in description:
+                description = description[wrapper]
+
+        definitions = description.get(
+            'AttributeDefinitions',
+            description.get('attribute_definitions', [])
+        )
+        types = {}
+
+        for definition in definitions:
+            types[definition['AttributeName']] = definition['AttributeType']
+
+        return cls(attribute_types=types)
+
+    @property
+    def attribute_types(self):
+        """
+        Returns the known type of each attribute.
+
+        :rtype: dict
+        """
+        return dict(self._types)
+
+    def declare(self, name, tag):
+        """
+        Records the type of an attribute.
+
+        :param name: The attribute's name
+        :type name: string
+
+        :param tag: The attribute's type (``S``, ``N``, ``B``, ``SS``, ``NS``
+            or ``BS``)
+        :type tag: string
+        """
+        if not tag in DECODERS:
+            raise TypeError("Unknown DynamoDB type '{0}'.".format(tag))
+
+        # Readers only ever look at ``_getters``, which is updated in a single
+        # assignment, so this is safe without a lock.
+        self._types[name] = tag
+        self._getters[name] = _compile_getter(tag)
+
+    def _learn(self, name, attr):
+        for tag in attr:
+            self.declare(name, tag)
+
+        return decode_value(attr)
+
+    def decode_item(self, item):
+        """
+        Converts an item from ``AttributeValue`` form to native values.
+
+        :param item: The raw item
+        :type item: dict
+
+        :returns: The item with native values
+        :rtype: dict
+        """
+        getters = self._getters
+        decoded = {}
+
+        for name, attr in item.items():
+            getter = getters.get(name)
+
+            if getter is not None:
+                try:
+                    decoded[name] = getter(attr)
+                    continue
+                except KeyError:
+                    pass
+
+            # Either new or stored as a different type this time. The latest
+            # type wins, since that's the likeliest next time.
+            decoded[name] = self._learn(name, attr)
+
+        return decoded
+
+    def decode_page(self, items):
+        """
+        Converts a page (list) of items to native values.
+
+        :param items: The raw items (i.e. ``page['Items']``)
+        :type items: list
+
+        :returns: The items with native values
+        :rtype: list
+        """
+        decode_item = self.decode_item
+        return [decode_item(item) for item in items]
+
+    def encode_item(self, item):
+        """
+        Converts an item's native values to ``AttributeValue`` form.
+
+        Values already in ``AttributeValue`` form are left alone, so partly
+        encoded items are fine.
+
+        :param item: The item with native values
+        :type item: dict
+
+        :returns: The raw item
+        :rtype: dict
+        """
+        encoded = {}
+
+        for name, value in item.items():
+            attr = encode_value(value)
+            encoded[name] = attr
+
+            if not name in self._types:
+                for tag in attr:
+                    self.declare(name, tag)
+
+        return encoded
+
+    def encode_page(self, items):
+        """
+        Converts a page (list) of items' native values to ``AttributeValue``
+        form.
+
+        :param items: The items with native values
+        :type items: list
+
+        :returns: The raw items
+        :rtype: list
+        """
+        encode_item = self.encode_item
+        return [encode_item(item) for item in items]
+
+
+# Keyed by ``Session``, then by ``(region_name, table_name)``. Tables with the
+# same name in different regions (or accounts) are different tables.
+_schemas = weakref.WeakKeyDictionary()
+_schemas_lock = threading.Lock()
+
+
+def get_schema(table_name, description=None, connection=None):
+    """
+    Returns the shared ``ItemSchema`` for a table, creating it if needed.
+
+    Everything working with the same table (``Table``, ``Item``,
+    ``ItemCollection``) through the same session & region shares one schema,
+    so attribute types learned by one are used by all.
+
+    :param table_name: The name of the table
+    :type table_name: string
+
+    :param description: (Optional) The table's description, used to declare
+        the key attribute types if the schema is being created.
+    :type description: dict
+
+    :param connection: (Optional) The connection the table is reached
+        through. Without one, there's nothing to share the schema under, so a
+        new (unshared) schema is returned.
+    :type connection: <boto3.core.connection.Connection> subclass instance
+
+    :rtype: <ItemSchema> instance
+    """
+    if not table_name or connection is None:
+        return ItemSchema.from_table_description(description or {})
+
+    session = connection._details.session
+    key = (connection.region_name, table_name)
+
+    with _schemas_lock:
+        tables = _schemas.setdefault(session, {})
+        schema = tables.get(key)
+
+        if schema is None:
+            if description:
+                schema = ItemSchema.from_table_description(description)
+            else:
+                schema = ItemSchema()
+
+            tables[key] = schema
+
+        return schema
+
+
+def _encode_conditions(conditions):
+    # Handles ``attribute_updates``, ``expected``, ``key_conditions`` &
+    # ``scan_filter``, which all wrap values in a per-attribute dict.
+    encoded = {}
+
+    for name, spec in conditions.items():
+        spec = dict(spec)
+
+        if 'Value' in spec:
+            spec['Value'] = encode_value(spec['Value'])
+
+        if 'AttributeValueList' in spec:
+            spec['AttributeValueList'] = [
+                encode_value(value) for value in spec['AttributeValueList']
+            ]
+
+        encoded[name] = spec
+
+    return encoded
+
+
+def _encode_request_items(request_items, connection):
+    encoded = {}
+
+    for table_name, requests in request_items.items():
+        schema = get_schema(table_name, connection=connection)
+
+        if hasattr(requests, 'items'):
+            # ``BatchGetItem``.
+            requests = dict(requests)
+
+            if 'Keys' in requests:
+                requests['Keys'] = schema.encode_page(requests['Keys'])
+        else:
+            # ``BatchWriteItem``.
+            requests = [_encode_write_request(schema, req) for req in requests]
+
+        encoded[table_name] = requests
+
+    return encoded
+
+
+def _encode_write_request(schema, request):
+    request = dict(request)
+
+    if 'PutRequest' in request:
+        request['PutRequest'] = {
+            'Item': schema.encode_item(request['PutRequest']['Item']),
+        }
+
+    if 'DeleteRequest' in request:
+        request['DeleteRequest'] = {
+            'Key': schema.encode_item(request['DeleteRequest']['Key']),
+        }
+
+    return request
+
+
+def encode_params(params, connection=None):
+    """
+    Converts any native values within the parameters for a DynamoDB call to
+    ``AttributeValue`` form.
+
+    Handles ``key``, ``item``, ``exclusive_start_key``, ``attribute_updates``,
+    ``expected``, ``key_conditions``, ``scan_filter`` & ``request_items``.
+    Values already in ``AttributeValue`` form are left alone.
+
+    :param params: The parameters for the call
+    :type params: dict
+
+    :param connection: (Optional) The connection the call will be made on,
+        so the attribute types seen are recorded on the shared schema for the
+        table (see ``get_schema``).
+    :type connection: <boto3.core.connection.Connection> subclass instance
+
+    :returns: The parameters, with everything encoded
+    :rtype: dict
+    """
+    params = dict(params)
+    table_name = params.get('table_name')
+
+    if table_name and connection is not None:
+        encode = get_schema(table_name, connection=connection).encode_item
+    else:
+        encode = encode_item
+
+    for name in ('key', 'item', 'exclusive_start_key'):
+        if params.get(name):
+            params[name] = encode(params[name])
+
+    for name in ('attribute_updates', 'expected', 'key_conditions',
+                 'scan_filter'):
+        if params.get(name):
+            params[name] = _encode_conditions(params[name])
+
+    if params.get('request_items'):
+        params['request_items'] = _encode_request_items(
+            params['request_items'],
+            connection
+        )
+
+    return params
+
+
+def encode_item(item):
+    """
+    Converts an item's native values to ``AttributeValue`` form, without a
+    schema.
+
+    :param item: The item with native values
+    :type item: dict
+
+    :returns: The raw item
+    :rtype: dict
+    """
+    return dict([(name, encode_value(value)) for name, value in item.items()])
+
+
+def decode_item(item):
+    """
+    Converts an item from ``AttributeValue`` form to native values, without a
+    schema.
+
+    :param item: The raw item
+    :type item: dict
+
+    :returns: The item with native values
+    :rtype: dict
+    """
+    return dict([(name, decode_value(attr)) for name, attr in item.items()])
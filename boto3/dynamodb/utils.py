@@ -0,0 +1,440 @@
+import threading
+
+from concurrent import futures
+
+from boto3.utils import six
+from boto3.utils.ratelimit import TokenBucket
+
+
+# Placed on the results queue by a segment worker once it has run out of pages.
+_SEGMENT_DONE = object()
+
+
+def consumed_capacity_units(page):
+    """
+    Returns the read/write capacity units a response reports having consumed.
+
+    Handles both the single-table form (``Query``, ``Scan``, ``GetItem``, etc.)
+    & the per-table list returned by the batch operations. Returns ``0.0`` if
+    the call was made without ``return_consumed_capacity``.
+
+    :param page: The response data from a DynamoDB call
+    :type page: dict
+
+    :returns: The total capacity units consumed
+    :rtype: float
+    """
+    consumed = page.get('ConsumedCapacity')
+
+    if not consumed:
+        return 0.0
+
+    if hasattr(consumed, 'items'):
+        consumed = [consumed]
+
+    return sum([float(cap.get('CapacityUnits', 0)) for cap in consumed])
+
+
+def operation_api_name(resource, method_name):
+    """
+    Returns the API name (i.e. ``GetItem``) behind a ``Resource`` or
+    ``Collection`` method.
+
+    :param resource: The resource (or collection)
+    :type resource: <boto3.core.resources.Resource> instance
+
+    :param method_name: The name of the method (i.e. ``get``)
+    :type method_name: string
+
+    :returns: The API name, or ``None`` if it's not an API-backed method
+    :rtype: string
+    """
+    details = resource._details
+
+    if hasattr(details, 'resource_data'):
+        data = details.resource_data
+    else:
+        data = details.collection_data
+
+    op = data.get('operations', {}).get(method_name, {})
+    return op.get('api_name')
+
+
+class PagedResults(object):
+    """
+    Iterates over every item a ``Query`` or ``Scan`` matches, following
+    ``LastEvaluatedKey`` from page to page automatically.
+
+    Iterating yields the raw items (or native ones, if given a ``schema``).
+    Use ``each_page`` instead if you need the full (raw) response for every
+    page. As pages arrive, the capacity each consumed is recorded in
+    ``consumed_capacity``.
+
+    Once done, ``last_evaluated_key`` is the key to pass as
+    ``exclusive_start_key`` to carry on after the last item returned, or
+    ``None`` if there's nothing more. If a page had to be trimmed to
+    ``max_items``, the key is rebuilt from the last item kept (using the
+    attribute names of the service's ``LastEvaluatedKey``). Should that not be
+    possible (i.e. the items don't include the key attributes), it's ``None``
+    rather than a key that would silently skip the trimmed items.
+
+    Usage::
+
+        >>> from boto3.dynamodb.resources import Table
+        >>> table = Table(table_name='events')
+        >>> results = PagedResults(
+        ...     table.query,
+        ...     key_conditions={...},
+        ...     max_items=5000,
+        ...     prefetch=True
+        ... )
+        >>> for item in results:
+        ...     print(item['id']['S'])
+        >>> sum(results.consumed_capacity)
+        412.5
+
+    """
+    def __init__(self, method, max_items=None, page_size=None,
+                 prefetch=False, schema=None, **kwargs):
+        """
+        Creates a new ``PagedResults`` instance.
+
+        :param method: The method to page through. Typically ``Table.query``
+            or ``Table.scan``, but anything accepting ``exclusive_start_key``
+            & returning ``LastEvaluatedKey`` will do.
+        :type method: callable
+
+        :param max_items: (Optional) The most items to return in total. By
+            default, every matching item is returned.
+        :type max_items: integer
+
+        :param page_size: (Optional) The most items to request per page
+            (``Limit``). By default, DynamoDB decides (up to 1MB of data).
+        :type page_size: integer
+
+        :param prefetch: (Optional) Whether to request the next page in the
+            background while the current one is being consumed. Default is
+            ``False``.
+        :type prefetch: boolean
+
+        :param schema: (Optional) If provided, items are decoded to native
+            values a page at a time using this schema.
+        :type schema: <boto3.dynamodb.types.ItemSchema> instance
+
+        :param **kwargs: (Optional) Any further parameters for the call (i.e.
+            ``table_name``, ``key_conditions``, etc.)
+        :type **kwargs: dict
+        """
+        super(PagedResults, self).__init__()
+        self.method = method
+        self.max_items = max_items
+        self.page_size = page_size
+        self.prefetch = prefetch
+        self.schema = schema
+        self.params = kwargs
+        # Ask for the consumed capacity, unless told otherwise. It's free.
+        self.params.setdefault('return_consumed_capacity', 'TOTAL')
+        self.consumed_capacity = []
+        self.last_evaluated_key = None
+
+    def __iter__(self):
+        for page in self.each_page():
+            items = page.get('Items', [])
+
+            if self.schema is not None:
+                items = self.schema.decode_page(items)
+
+            for item in items:
+                yield item
+
+    def _fetch(self, params):
+        return self.method(**params)
+
+    def _page_limit(self, seen):
+        # Never ask for more than we still need.
+        limit = self.page_size
+
+        if self.max_items is not None:
+            remaining = self.max_items - seen
+
+            if limit is None or remaining < limit:
+                limit = remaining
+
+        return limit
+
+    def _resume_key(self, item, key_names):
+        # The key to carry on from, right after ``item``.
+        if not key_names:
+            return None
+
+        key = {}
+
+        for name in key_names:
+            if not name in item:
+                return None
+
+            key[name] = item[name]
+
+        return key
+
+    def _next_params(self, params, last_key, seen):
+        next_params = dict(params)
+        next_params['exclusive_start_key'] = last_key
+        limit = self._page_limit(seen)
+
+        if limit is not None:
+            next_params['limit'] = limit
+
+        return next_params
+
+    def each_page(self):
+        """
+        Yields the full response for each page, in order.
+
+        If ``max_items`` is reached partway through a page, that page's
+        ``Items`` are trimmed to fit & its ``LastEvaluatedKey`` is pointed at
+        the last item kept (see ``last_evaluated_key``).
+
+        :returns: A generator of response dicts
+        """
+        self.consumed_capacity = []
+        self.last_evaluated_key = None
+        params = dict(self.params)
+        seen = 0
+        # The attributes making up the paging key, for when a trimmed page's
+        # key has to be rebuilt.
+        key_names = list(params.get('exclusive_start_key') or [])
+        limit = self._page_limit(seen)
+
+        if limit is not None:
+            params['limit'] = limit
+
+        if limit == 0:
+            return
+
+        executor = None
+        pending = None
+
+        if self.prefetch:
+            executor = futures.ThreadPoolExecutor(max_workers=1)
+
+        try:
+            page = self._fetch(params)
+
+            while True:
+                items = page.get('Items', [])
+                seen += len(items)
+
+                if page.get('LastEvaluatedKey'):
+                    key_names = list(page['LastEvaluatedKey'])
+
+                if self.max_items is not None and seen > self.max_items:
+                    items = items[:len(items) - (seen - self.max_items)]
+                    page['Items'] = items
+                    seen = self.max_items
+                    # The service's key points past the items just dropped.
+                    resume_key = self._resume_key(items[-1], key_names)
+
+                    if resume_key:
+                        page['LastEvaluatedKey'] = resume_key
+                    else:
+                        page.pop('LastEvaluatedKey', None)
+
+                self.consumed_capacity.append(consumed_capacity_units(page))
+                self.last_evaluated_key = page.get('LastEvaluatedKey')
+                done = not self.last_evaluated_key
+
+                if self.max_items is not None and seen >= self.max_items:
+                    done = True
+
+                if not done:
+                    params = self._next_params(
+                        params,
+                        self.last_evaluated_key,
+                        seen
+                    )
+
+                    if executor is not None:
+                        # Start on the next page before handing this one
+                        # over.
+                        pending = executor.submit(self._fetch, params)
+
+                yield page
+
+                if done:
+                    break
+
+                if pending is not None:
+                    page = pending.result()
+                    pending = None
+                else:
+                    page = self._fetch(params)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True)
+
+
+def parallel_scan(table, total_segments=4, max_workers=None,
+                  max_read_capacity=None, executor=None, schema=None,
+                  read_limiter=None, **kwargs):
+    """
+    Scans a table in ``total_segments`` parallel segments, yielding the items
+    from all of them as a single iterator.
+
+    Each segment is scanned by its own worker (``Segment``/``TotalSegments``),
+    following ``LastEvaluatedKey`` until that segment is exhausted. Items are
+    yielded in whatever order the pages arrive, so there is no ordering
+    guarantee across segments.
+
+    If the consumer stops iterating early (or the generator is closed), the
+    workers are stopped after their current page.
+
+    Usage::
+
+        >>> from boto3.dynamodb.resources import Table
+        >>> table = Table(table_name='exports')
+        >>> for item in parallel_scan(table, total_segments=8,
+        ...                           max_read_capacity=200):
+        ...     print(item['id']['S'])
+
+    :param table: The table to scan. Anything with a ``scan`` method that
+        accepts the ``Scan`` parameters will do.
+    :type table: <boto3.dynamodb.resources.Table> instance
+
+    :param total_segments: (Optional) How many segments to split the table
+        into. Default is ``4``.
+    :type total_segments: integer
+
+    :param max_workers: (Optional) How many threads to scan with. By default,
+        this is one per segment. Ignored if ``executor`` is provided.
+    :type max_workers: integer
+
+    :param max_read_capacity: (Optional) The most read capacity units per
+        second the scan may consume, shared across all segments. By default,
+        the scan is not rate-limited.
+    :type max_read_capacity: float
+
+    :param executor: (Optional) An existing ``concurrent.futures.Executor``
+        to run the segment workers on. This needs to be a thread pool, since
+        the ``Table`` & its connection can't be pickled for a process pool.
+        CPU-heavy consumers should hand the yielded items off to their own
+        process pool instead.
+    :type executor: <concurrent.futures.Executor> instance
+
+    :param schema: (Optional) If provided, each page is decoded to native
+        values (by the worker that fetched it) using this schema.
+    :type schema: <boto3.dynamodb.types.ItemSchema> instance
+
+    :param read_limiter: (Optional) An existing bucket of read capacity units
+        to pace the segments against, in place of ``max_read_capacity``.
+        Useful for sharing one budget between several scans.
+    :type read_limiter: <boto3.utils.ratelimit.TokenBucket> instance
+
+    :param **kwargs: (Optional) Any further parameters for ``Scan`` (i.e.
+        ``table_name``, ``scan_filter``, ``limit``, etc.)
+    :type **kwargs: dict
+
+    :returns: A generator of the items, raw (in ``AttributeValue`` form)
+        unless a ``schema`` was provided
+    """
+    bucket = read_limiter
+
+    if bucket is None and max_read_capacity:
+        bucket = TokenBucket(rate=max_read_capacity)
+
+    if bucket is not None:
+        kwargs['return_consumed_capacity'] = 'TOTAL'
+
+    # Bounded, so that fast segments can't run arbitrarily far ahead of a slow
+    # consumer.
+    results = six.moves.queue.Queue(maxsize=total_segments * 2)
+    stop = threading.Event()
+
+    def put(value):
+        # Never block forever. If the consumer has gone away, give up.
+        while not stop.is_set():
+            try:
+                results.put(value, timeout=0.1)
+                return True
+            except six.moves.queue.Full:
+                continue
+
+        return False
+
+    def scan_segment(segment):
+        params = dict(kwargs)
+        params['segment'] = segment
+        params['total_segments'] = total_segments
+        # Guess that each page costs what the previous one did.
+        estimate = 1
+
+        try:
+            while not stop.is_set():
+                if bucket is not None:
+                    bucket.consume(estimate)
+
+                page = table.scan(**params)
+
+                if bucket is not None:
+                    consumed = consumed_capacity_units(page)
+                    bucket.charge(consumed - estimate)
+                    estimate = max(consumed, 1)
+
+                items = page.get('Items', [])
+
+                if schema is not None:
+                    items = schema.decode_page(items)
+
+                if not put(items):
+                    return
+
+                last_key = page.get('LastEvaluatedKey')
+
+                if not last_key:
+                    break
+
+                params['exclusive_start_key'] = last_key
+        except Exception as err:
+            put(err)
+            return
+
+        put(_SEGMENT_DONE)
+
+    own_executor = executor is None
+
+    if own_executor:
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max_workers or total_segments
+        )
+
+    workers = [
+        executor.submit(scan_segment, segment)
+        for segment in range(total_segments)
+    ]
+    remaining = total_segments
+
+    try:
+        while remaining:
+            value = results.get()
+
+            if value is _SEGMENT_DONE:
+                remaining -= 1
+                continue
+
+            if isinstance(value, Exception):
+                raise value
+
+            for item in value:
+                yield item
+    finally:
+        stop.set()
+
+        # Drain anything left, so no worker is stuck waiting on a full queue.
+        while not all([worker.done() for worker in workers]):
+            try:
+                results.get(timeout=0.1)
+            except six.moves.queue.Empty:
+                pass
+
+        if own_executor:
+            executor.shutdown(wait=True)
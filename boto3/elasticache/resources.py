@@ -0,0 +1,42 @@
+import boto3
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+CacheClusterCollection = boto3.session.get_collection(
+    'elasticache',
+    'CacheClusterCollection'
+)
+CacheParameterGroupCollection = boto3.session.get_collection(
+    'elasticache',
+    'CacheParameterGroupCollection'
+)
+CacheSecurityGroupCollection = boto3.session.get_collection(
+    'elasticache',
+    'CacheSecurityGroupCollection'
+)
+CacheSubnetGroupCollection = boto3.session.get_collection(
+    'elasticache',
+    'CacheSubnetGroupCollection'
+)
+ReplicationGroupCollection = boto3.session.get_collection(
+    'elasticache',
+    'ReplicationGroupCollection'
+)
+CacheCluster = boto3.session.get_resource('elasticache', 'CacheCluster')
+CacheParameterGroup = boto3.session.get_resource(
+    'elasticache',
+    'CacheParameterGroup'
+)
+CacheSecurityGroup = boto3.session.get_resource(
+    'elasticache',
+    'CacheSecurityGroup'
+)
+CacheSubnetGroup = boto3.session.get_resource(
+    'elasticache',
+    'CacheSubnetGroup'
+)
+ReplicationGroup = boto3.session.get_resource(
+    'elasticache',
+    'ReplicationGroup'
+)
@@ -0,0 +1,360 @@
+import calendar
+import datetime
+import re
+import time
+
+from concurrent import futures
+
+from boto3.utils import OrderedDict
+
+
+# The most parameters ``ModifyCacheParameterGroup`` takes per call.
+MAX_PARAMETERS_PER_MODIFY = 20
+
+
+def _epoch(date):
+    # Event dates come back as ISO 8601 strings or ``datetime``s (depending
+    # on the botocore version) & ``start_time`` can be either, so they're
+    # compared as seconds since the epoch. Naive ``datetime``s are UTC.
+    if isinstance(date, datetime.datetime):
+        return calendar.timegm(date.utctimetuple()) + \
+            date.microsecond / 1000000.0
+
+    seconds = calendar.timegm(time.strptime(date[:19], '%Y-%m-%dT%H:%M:%S'))
+    fraction = re.match(r'\.\d+', date[19:])
+
+    if fraction:
+        seconds += float(fraction.group(0))
+
+    return seconds
+
+
+class EventFollower(object):
+    """
+    Follows the ElastiCache event stream, fetching only what's new.
+
+    Rather than ``CacheCluster.describe_events`` per cluster (each re-reading
+    an overlapping window), one ``DescribeEvents`` call (paged with
+    ``Marker``) covers every source per poll, starting from the newest event
+    already seen. Events on that boundary second are remembered, so they're
+    not handed back twice.
+
+    Usage::
+
+        >>> from boto3.elasticache.connection import ElasticacheConnection
+        >>> from boto3.elasticache.utils import EventFollower
+        >>> follower = EventFollower(
+        ...     ElasticacheConnection(),
+        ...     source_type='cache-cluster'
+        ... )
+        >>> for event in follower.follow(interval=60):
+        ...     print(event['SourceIdentifier'], event['Message'])
+
+    """
+    def __init__(self, conn, source_type=None, source_identifier=None,
+                 start_time=None, max_records=100, clock=time.time,
+                 sleep=time.sleep):
+        """
+        Creates a new ``EventFollower`` instance.
+
+        :param conn: A ``Connection`` subclass for ElastiCache
+        :type conn: A <boto3.core.connection.Connection> subclass
+
+        :param source_type: (Optional) Only follow events from this kind of
+            source (i.e. ``cache-cluster``). Default is all of them.
+        :type source_type: string
+
+        :param source_identifier: (Optional) Only follow events from this
+            source. Default is all of them.
+        :type source_identifier: string
+
+        :param start_time: (Optional) Where to start following from. Default
+            is the service's default (the last hour).
+        :type start_time: string or datetime
+
+        :param max_records: (Optional) How many events to fetch per page.
+            Default is ``100``.
+        :type max_records: integer
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(EventFollower, self).__init__()
+        self.conn = conn
+        self.source_type = source_type
+        self.source_identifier = source_identifier
+        self.max_records = max_records
+        self.clock = clock
+        self._sleep = sleep
+        # The date of the newest event seen & the events seen on it.
+        self.cursor = start_time
+        self._cursor_at = None
+        self._boundary = set()
+
+        if start_time is not None:
+            self._cursor_at = _epoch(start_time)
+        self.calls = 0
+        self.events = 0
+
+    def _key(self, event):
+        return (
+            event.get('SourceType'),
+            event.get('SourceIdentifier'),
+            event.get('Date'),
+            event.get('Message'),
+        )
+
+    def _fetch(self):
+        kwargs = {'max_records': self.max_records}
+
+        if self.source_type is not None:
+            kwargs['source_type'] = self.source_type
+
+        if self.source_identifier is not None:
+            kwargs['source_identifier'] = self.source_identifier
+
+        if self.cursor is not None:
+            kwargs['start_time'] = self.cursor
+
+        events = []
+
+        while True:
+            self.calls += 1
+            resp = self.conn.describe_events(**kwargs)
+            events.extend(resp.get('Events', []))
+
+            if not resp.get('Marker'):
+                return events
+
+            kwargs['marker'] = resp['Marker']
+
+    def poll(self):
+        """
+        Fetches the events since the last poll.
+
+        :returns: The new events, oldest first
+        :rtype: list
+        """
+        # Stable, so same-second events keep the service's order.
+        events = sorted(
+            [(_epoch(event['Date']), event) for event in self._fetch()],
+            key=lambda pair: pair[0]
+        )
+        new = []
+
+        for at, event in events:
+            key = self._key(event)
+
+            if self._cursor_at is not None:
+                if at < self._cursor_at:
+                    continue
+
+                if at == self._cursor_at and key in self._boundary:
+                    continue
+
+            if self._cursor_at is None or at > self._cursor_at:
+                self.cursor = event['Date']
+                self._cursor_at = at
+                self._boundary = set()
+
+            self._boundary.add(key)
+            new.append(event)
+
+        self.events += len(new)
+        return new
+
+    def follow(self, interval=60, until=None):
+        """
+        Yields new events as they happen, polling every ``interval`` seconds.
+
+        :param interval: (Optional) How long to wait between polls, in
+            seconds. Default is ``60``.
+        :type interval: float
+
+        :param until: (Optional) Called before each poll. Following stops
+            once it returns ``True``. Default is to follow forever.
+        :type until: callable
+
+        :returns: A generator of event dicts
+        """
+        while until is None or not until():
+            started = self.clock()
+
+            for event in self.poll():
+                yield event
+
+            self._sleep(max(started + interval - self.clock(), 0))
+
+
+def describe_parameters(conn, group_name):
+    """
+    Fetches every parameter of a cache parameter group, following
+    ``Marker`` through all the pages.
+
+    :param conn: A ``Connection`` subclass for ElastiCache
+    :type conn: A <boto3.core.connection.Connection> subclass
+
+    :param group_name: The name of the parameter group
+    :type group_name: string
+
+    :returns: Each parameter's description, by ``ParameterName``
+    :rtype: OrderedDict
+    """
+    parameters = OrderedDict()
+    kwargs = {'cache_parameter_group_name': group_name}
+
+    while True:
+        resp = conn.describe_cache_parameters(**kwargs)
+
+        for param in resp.get('Parameters', []):
+            parameters[param['ParameterName']] = param
+
+        if not resp.get('Marker'):
+            return parameters
+
+        kwargs['marker'] = resp['Marker']
+
+
+def _as_value(value):
+    # The API deals in strings, so ``True`` & ``'true'`` are the same thing.
+    if isinstance(value, bool):
+        return value and 'true' or 'false'
+
+    return '{0}'.format(value)
+
+
+def diff_parameters(parameters, desired):
+    """
+    Works out which parameters need changing to match ``desired``.
+
+    :param parameters: The group's current parameters (as returned by
+        ``describe_parameters``)
+    :type parameters: dict
+
+    :param desired: The values wanted, by parameter name
+    :type desired: dict
+
+    :returns: ``(current, wanted)`` for each parameter that differs
+    :rtype: OrderedDict
+    """
+    changes = OrderedDict()
+
+    for name in sorted(desired):
+        if name not in parameters:
+            raise ValueError("Unknown parameter '{0}'.".format(name))
+
+        param = parameters[name]
+        current = param.get('ParameterValue')
+        wanted = _as_value(desired[name])
+
+        if current == wanted:
+            continue
+
+        if param.get('IsModifiable') is False:
+            raise ValueError(
+                "Parameter '{0}' can't be modified.".format(name)
+            )
+
+        changes[name] = (current, wanted)
+
+    return changes
+
+
+def apply_parameters(conn, desired, max_workers=8, dry_run=False,
+                     chunk_size=MAX_PARAMETERS_PER_MODIFY):
+    """
+    Brings many cache parameter groups in line with the desired values,
+    changing only what differs.
+
+    Every group's parameters are fetched concurrently & diffed. The
+    changes are then made in chunks of up to ``chunk_size`` parameters
+    per ``ModifyCacheParameterGroup`` call, again concurrently.
+
+    Usage::
+
+        >>> from boto3.elasticache.utils import apply_parameters
+        >>> tuning = {'maxmemory-policy': 'allkeys-lru', 'timeout': 300}
+        >>> results = apply_parameters(conn, {
+        ...     'sessions': tuning,
+        ...     'pages': tuning,
+        ... })
+        >>> results['sessions']
+        OrderedDict([('timeout', ('0', '300'))])
+
+    :param conn: A ``Connection`` subclass for ElastiCache
+    :type conn: A <boto3.core.connection.Connection> subclass
+
+    :param desired: The values wanted, by parameter name, for each group
+    :type desired: dict
+
+    :param max_workers: (Optional) How many calls to make at once. Default
+        is ``8``.
+    :type max_workers: integer
+
+    :param dry_run: (Optional) Work out what would change without changing
+        anything. Default is ``False``.
+    :type dry_run: boolean
+
+    :param chunk_size: (Optional) The most parameters to change per call.
+        Default is ``20`` (the API's limit).
+    :type chunk_size: integer
+
+    :returns: For each group, the ``(old, new)`` values of each parameter
+        changed, or the exception that stopped it
+    :rtype: OrderedDict
+    """
+    results = OrderedDict([(name, None) for name in sorted(desired)])
+
+    def _fetch(group_name):
+        parameters = describe_parameters(conn, group_name)
+        return diff_parameters(parameters, desired[group_name])
+
+    def _modify(group_name, values):
+        conn.modify_cache_parameter_group(
+            cache_parameter_group_name=group_name,
+            parameter_name_values=[
+                {'ParameterName': name, 'ParameterValue': value}
+                for name, value in values
+            ]
+        )
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = [
+            (group_name, executor.submit(_fetch, group_name))
+            for group_name in results
+        ]
+        writes = []
+
+        for group_name, future in fetched:
+            try:
+                results[group_name] = future.result()
+            except Exception as err:
+                results[group_name] = err
+                continue
+
+            if dry_run:
+                continue
+
+            values = [
+                (name, new) for name, (old, new) in results[group_name].items()
+            ]
+
+            for start in range(0, len(values), chunk_size):
+                writes.append((group_name, executor.submit(
+                    _modify,
+                    group_name,
+                    values[start:start + chunk_size]
+                )))
+
+        for group_name, future in writes:
+            try:
+                future.result()
+            except Exception as err:
+                results[group_name] = err
+
+    return results
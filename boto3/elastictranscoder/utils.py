@@ -0,0 +1,599 @@
+from collections import deque
+import threading
+import time
+
+from concurrent import futures
+
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import backoff_delay, THROTTLING_CODES
+from boto3.core.retries import without_retries
+from boto3.utils import OrderedDict
+
+
+# Jobs in these states won't change again.
+FINISHED_STATUSES = ('Complete', 'Canceled', 'Error')
+ACTIVE_STATUSES = ('Submitted', 'Progressing')
+# Error codes that mean "slow down" rather than "this job is bad". Elastic
+# Transcoder also says ``LimitExceededException`` when too many jobs are
+# queued.
+RETRYABLE_CODES = THROTTLING_CODES + ('LimitExceededException',)
+
+
+def _list_pages(method, **kwargs):
+    # Yields each page of a ``ListJobsBy*`` call.
+    while True:
+        resp = method(**kwargs)
+        yield resp.get('Jobs', [])
+        page_token = resp.get('NextPageToken')
+
+        if not page_token:
+            return
+
+        kwargs['page_token'] = page_token
+
+
+class JobTracker(object):
+    """
+    Watches many Elastic Transcoder jobs at once, using a handful of list
+    calls per poll rather than a ``ReadJob`` per job.
+
+    Jobs whose pipeline is known are found by paging through
+    ``ListJobsByPipeline`` (newest first), stopping as soon as every
+    tracked job in that pipeline has been seen. Any others are looked for
+    among the ``Submitted`` & ``Progressing`` jobs (``ListJobsByStatus``);
+    the few that have dropped out of those lists since the last poll are
+    read individually to learn how they finished.
+
+    Each poll diffs the new statuses against the last ones seen, calling
+    ``on_change`` for every change & the job's completion callbacks once it
+    finishes (``Complete``, ``Canceled`` or ``Error``), at which point it's
+    no longer tracked.
+
+    Usage::
+
+        >>> from boto3.elastictranscoder.connection import (
+        ...     ElastictranscoderConnection
+        ... )
+        >>> from boto3.elastictranscoder.utils import JobTracker
+        >>> tracker = JobTracker(ElastictranscoderConnection())
+        >>> for job_id, pipeline_id in submitted:
+        ...     tracker.track(job_id, pipeline_id, callback=publish)
+        >>> tracker.wait(interval=30)
+
+    """
+    def __init__(self, conn, on_change=None, on_complete=None,
+                 clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``JobTracker`` instance.
+
+        :param conn: A ``Connection`` subclass for Elastic Transcoder
+        :type conn: A <boto3.core.connection.Connection> subclass
+
+        :param on_change: (Optional) Called as ``on_change(job, old_status)``
+            whenever a tracked job's status changes
+        :type on_change: callable
+
+        :param on_complete: (Optional) Called as ``on_complete(job)`` for
+            every job that finishes, in addition to any per-job callback
+        :type on_complete: callable
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(JobTracker, self).__init__()
+        self.conn = conn
+        self.on_change = on_change
+        self.on_complete = on_complete
+        self.clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Job ID -> {'pipeline_id', 'status', 'callbacks'}.
+        self._jobs = OrderedDict()
+        self.list_calls = 0
+        self.read_calls = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
+
+    def __contains__(self, job_id):
+        with self._lock:
+            return job_id in self._jobs
+
+    def track(self, job_id, pipeline_id=None, callback=None,
+              status='Submitted'):
+        """
+        Starts watching a job.
+
+        :param job_id: The job's ID
+        :type job_id: string
+
+        :param pipeline_id: (Optional) The job's pipeline. Makes polling for
+            it cheaper.
+        :type pipeline_id: string
+
+        :param callback: (Optional) Called as ``callback(job)`` once the job
+            finishes
+        :type callback: callable
+
+        :param status: (Optional) The job's current status. Default is
+            ``Submitted``.
+        :type status: string
+        """
+        with self._lock:
+            entry = self._jobs.setdefault(job_id, {
+                'pipeline_id': pipeline_id,
+                'status': status,
+                'callbacks': [],
+            })
+
+            if pipeline_id is not None:
+                entry['pipeline_id'] = pipeline_id
+
+            if callback is not None:
+                entry['callbacks'].append(callback)
+
+    def track_job(self, job, callback=None):
+        """
+        Starts watching a job, from its description (i.e. the ``Job`` in a
+        ``CreateJob`` response).
+
+        :param job: The job's description
+        :type job: dict
+
+        :param callback: (Optional) Called as ``callback(job)`` once the job
+            finishes
+        :type callback: callable
+        """
+        self.track(
+            job['Id'],
+            pipeline_id=job.get('PipelineId'),
+            callback=callback,
+            status=job.get('Status', 'Submitted')
+        )
+
+    def untrack(self, job_id):
+        """
+        Stops watching a job (without calling its callbacks).
+
+        :param job_id: The job's ID
+        :type job_id: string
+        """
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def _list(self, method, **kwargs):
+        for page in _list_pages(method, **kwargs):
+            with self._lock:
+                self.list_calls += 1
+
+            yield page
+
+    def _fetch_statuses(self):
+        with self._lock:
+            by_pipeline = OrderedDict()
+            unplaced = set()
+
+            for job_id, entry in self._jobs.items():
+                if entry['pipeline_id'] is None:
+                    unplaced.add(job_id)
+                else:
+                    pipeline_jobs = by_pipeline.setdefault(
+                        entry['pipeline_id'],
+                        set()
+                    )
+                    pipeline_jobs.add(job_id)
+
+        seen = {}
+
+        for pipeline_id, job_ids in by_pipeline.items():
+            missing = set(job_ids)
+
+            for page in self._list(
+                self.conn.list_jobs_by_pipeline,
+                pipeline_id=pipeline_id,
+                ascending='false'
+            ):
+                for job in page:
+                    if job['Id'] in missing:
+                        seen[job['Id']] = job
+                        missing.discard(job['Id'])
+
+                if not missing:
+                    break
+
+            # Not listed (yet). Look for them with the rest.
+            unplaced.update(missing)
+
+        if unplaced:
+            active = set(unplaced)
+
+            for status in ACTIVE_STATUSES:
+                for page in self._list(
+                    self.conn.list_jobs_by_status,
+                    status=status,
+                    ascending='false'
+                ):
+                    for job in page:
+                        if job['Id'] in active:
+                            seen[job['Id']] = job
+                            active.discard(job['Id'])
+
+            # No longer active, so they've finished since the last poll.
+            for job_id in active:
+                with self._lock:
+                    self.read_calls += 1
+
+                seen[job_id] = self.conn.read_job(id=job_id)['Job']
+
+        return seen
+
+    def poll(self):
+        """
+        Checks on every tracked job once, firing any callbacks.
+
+        :returns: The jobs that finished
+        :rtype: list
+        """
+        seen = self._fetch_statuses()
+        changed = []
+        finished = []
+
+        with self._lock:
+            for job_id, job in seen.items():
+                entry = self._jobs.get(job_id)
+
+                if entry is None:
+                    continue
+
+                old_status = entry['status']
+                entry['status'] = job.get('Status', old_status)
+
+                if entry['pipeline_id'] is None:
+                    entry['pipeline_id'] = job.get('PipelineId')
+
+                if entry['status'] != old_status:
+                    changed.append((job, old_status))
+
+                if entry['status'] in FINISHED_STATUSES:
+                    finished.append((job, entry['callbacks']))
+                    del self._jobs[job_id]
+
+        # Outside the lock, so callbacks can track more jobs.
+        if self.on_change is not None:
+            for job, old_status in changed:
+                self.on_change(job, old_status)
+
+        for job, callbacks in finished:
+            for callback in callbacks:
+                callback(job)
+
+            if self.on_complete is not None:
+                self.on_complete(job)
+
+        return [job for job, callbacks in finished]
+
+    def wait(self, interval=30, timeout=None):
+        """
+        Polls every ``interval`` seconds until every tracked job has
+        finished.
+
+        :param interval: (Optional) How long to wait between polls, in
+            seconds. Default is ``30``.
+        :type interval: float
+
+        :param timeout: (Optional) The longest to wait, in seconds. Default
+            is forever.
+        :type timeout: float
+
+        :returns: Whether every job finished in time
+        :rtype: boolean
+        """
+        deadline = None
+
+        if timeout is not None:
+            deadline = self.clock() + timeout
+
+        while len(self):
+            self.poll()
+
+            if not len(self):
+                break
+
+            if deadline is not None and self.clock() + interval > deadline:
+                return False
+
+            self._sleep(interval)
+
+        return True
+
+
+class JobScheduler(object):
+    """
+    Drains a backlog of Elastic Transcoder jobs across a set of equivalent
+    pipelines, without flooding them.
+
+    At most ``depth`` jobs are kept in flight (submitted but not finished)
+    per pipeline, with each new job going to the least busy pipeline.
+    ``CreateJob`` calls are made concurrently, & a ``JobTracker`` notices
+    jobs finishing, at which point their slots are refilled. Throttled
+    submissions pause all submitting for a while (with exponential
+    backoff) & are then retried.
+
+    The backlog is read lazily, so it can be a generator of any length.
+
+    Usage::
+
+        >>> from boto3.elastictranscoder.connection import (
+        ...     ElastictranscoderConnection
+        ... )
+        >>> from boto3.elastictranscoder.utils import JobScheduler
+        >>> scheduler = JobScheduler(
+        ...     ElastictranscoderConnection(),
+        ...     pipeline_ids=['1111111111111-abcde1', '1111111111111-abcde2'],
+        ...     depth=10
+        ... )
+        >>> for params, job, error in scheduler.run(backlog):
+        ...     if error is not None:
+        ...         print('Failed to submit', params, error)
+        ...     else:
+        ...         print(job['Id'], job['Status'])
+
+    """
+    def __init__(self, conn, pipeline_ids, depth=4, max_workers=8,
+                 interval=15, max_retries=5, base_delay=1, max_delay=60,
+                 executor=None, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``JobScheduler`` instance.
+
+        :param conn: A ``Connection`` subclass for Elastic Transcoder
+        :type conn: A <boto3.core.connection.Connection> subclass
+
+        :param pipeline_ids: The pipelines to spread the jobs across
+        :type pipeline_ids: list
+
+        :param depth: (Optional) The most jobs to have in flight per
+            pipeline. Default is ``4``.
+        :type depth: integer
+
+        :param max_workers: (Optional) The most ``CreateJob`` calls to make
+            at once. Default is ``8``.
+        :type max_workers: integer
+
+        :param interval: (Optional) How often to check on in-flight jobs, in
+            seconds. Default is ``15``.
+        :type interval: float
+
+        :param max_retries: (Optional) How many times to retry a throttled
+            submission. Default is ``5``.
+        :type max_retries: integer
+
+        :param base_delay: (Optional) How long to pause after the first
+            throttled submission, in seconds. Doubles with each retry.
+            Default is ``1``.
+        :type base_delay: float
+
+        :param max_delay: (Optional) The longest to pause, in seconds.
+            Default is ``60``.
+        :type max_delay: float
+
+        :param executor: (Optional) The executor to submit jobs with.
+            Default is a new thread pool of ``max_workers`` threads.
+        :type executor: A ``concurrent.futures.Executor``
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(JobScheduler, self).__init__()
+
+        if not pipeline_ids:
+            raise ValueError("At least one pipeline is needed.")
+
+        self.conn = conn
+        # Submissions are retried (after a pause) by ``run``, so they're
+        # made just once per attempt. Polling keeps the usual retries.
+        self._create_conn = without_retries(conn)
+        self.depth = depth
+        self.max_workers = max_workers
+        self.interval = interval
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.executor = executor
+        self.clock = clock
+        self._sleep = sleep
+        self.tracker = JobTracker(conn, clock=clock, sleep=sleep)
+        self.in_flight = OrderedDict([
+            (pipeline_id, 0) for pipeline_id in pipeline_ids
+        ])
+        self._resume_at = 0
+        self.submitted = 0
+        self.completed = 0
+        self.throttled = 0
+        self.failed = 0
+
+    def stats(self):
+        """
+        Returns counters for the jobs handled so far & the number in flight
+        on each pipeline.
+
+        :rtype: dict
+        """
+        return {
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'throttled': self.throttled,
+            'failed': self.failed,
+            'in_flight': dict(self.in_flight),
+        }
+
+    def _pick(self):
+        # The least busy pipeline with room, earliest listed on a tie.
+        best = None
+
+        for pipeline_id, count in self.in_flight.items():
+            if count >= self.depth:
+                continue
+
+            if best is None or count < self.in_flight[best]:
+                best = pipeline_id
+
+        return best
+
+    def _create(self, pipeline_id, params):
+        return self._create_conn.create_job(
+            pipeline_id=pipeline_id,
+            **params
+        )['Job']
+
+    def _finisher(self, params, pipeline_id, results):
+        def finished(job):
+            self.in_flight[pipeline_id] -= 1
+            self.completed += 1
+            results.append((params, job, None))
+
+        return finished
+
+    def run(self, jobs):
+        """
+        Submits every job, yielding each once it's finished (or failed to
+        submit).
+
+        :param jobs: The ``CreateJob`` parameters for each job (``input``,
+            ``output`` or ``outputs``, etc.), without ``pipeline_id``
+        :type jobs: iterable of dicts
+
+        :returns: A generator of ``(params, job, error)`` tuples. ``job`` is
+            the finished job's description (check its ``Status``), or
+            ``None`` if submitting it failed, in which case ``error`` is the
+            ``ServerError``.
+        """
+        jobs = iter(jobs)
+        exhausted = False
+        retries = deque()
+        submitting = {}
+        results = deque()
+        next_poll = self.clock() + self.interval
+        executor = self.executor
+        own_executor = executor is None
+
+        if own_executor:
+            executor = futures.ThreadPoolExecutor(
+                max_workers=self.max_workers
+            )
+
+        try:
+            while True:
+                while len(submitting) < self.max_workers:
+                    if self.clock() < self._resume_at:
+                        break
+
+                    pipeline_id = self._pick()
+
+                    if pipeline_id is None:
+                        break
+
+                    if retries:
+                        params, attempt = retries.popleft()
+                    elif not exhausted:
+                        try:
+                            params, attempt = next(jobs), 0
+                        except StopIteration:
+                            exhausted = True
+                            break
+                    else:
+                        break
+
+                    self.in_flight[pipeline_id] += 1
+                    future = executor.submit(
+                        self._create,
+                        pipeline_id,
+                        params
+                    )
+                    submitting[future] = (params, pipeline_id, attempt)
+
+                while results:
+                    yield results.popleft()
+
+                if submitting:
+                    done, not_done = futures.wait(
+                        list(submitting),
+                        return_when=futures.FIRST_COMPLETED
+                    )
+
+                    for future in done:
+                        params, pipeline_id, attempt = submitting.pop(future)
+
+                        try:
+                            job = future.result()
+                        except ServerError as err:
+                            self.in_flight[pipeline_id] -= 1
+
+                            if err.code not in RETRYABLE_CODES or \
+                               attempt >= self.max_retries:
+                                self.failed += 1
+                                results.append((params, None, err))
+                                continue
+
+                            self.throttled += 1
+                            delay = backoff_delay(
+                                attempt + 1,
+                                self.base_delay,
+                                self.max_delay
+                            )
+                            self._resume_at = max(
+                                self._resume_at,
+                                self.clock() + delay
+                            )
+                            retries.append((params, attempt + 1))
+                            continue
+
+                        self.submitted += 1
+                        self.tracker.track_job(
+                            job,
+                            callback=self._finisher(
+                                params,
+                                pipeline_id,
+                                results
+                            )
+                        )
+
+                    continue
+
+                now = self.clock()
+
+                if not len(self.tracker):
+                    if exhausted and not retries:
+                        break
+
+                    # Nothing in flight, so we must be backing off.
+                    self._sleep(max(self._resume_at - now, 0))
+                    continue
+
+                if now >= next_poll:
+                    self.tracker.poll()
+                    next_poll = now + self.interval
+                    continue
+
+                wake_at = next_poll
+
+                if now < self._resume_at < wake_at:
+                    wake_at = self._resume_at
+
+                self._sleep(wake_at - now)
+
+            while results:
+                yield results.popleft()
+        finally:
+            if own_executor:
+                executor.shutdown()
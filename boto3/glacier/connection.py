@@ -0,0 +1,6 @@
+import boto3
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+GlacierConnection = boto3.session.get_connection('glacier')
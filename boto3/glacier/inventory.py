@@ -0,0 +1,255 @@
+"""
+Streaming reader for Glacier vault inventories.
+
+An inventory retrieval job's output is one JSON document::
+
+    {
+        "VaultARN": "arn:aws:glacier:us-east-1:...:vaults/backups",
+        "InventoryDate": "2013-11-02T09:20:10Z",
+        "ArchiveList": [
+            {
+                "ArchiveId": "...",
+                "ArchiveDescription": "...",
+                "CreationDate": "2013-11-01T06:00:52Z",
+                "Size": 2140123,
+                "SHA256TreeHash": "..."
+            },
+            ...
+        ]
+    }
+
+For big vaults, ``ArchiveList`` runs to millions of entries. Rather than
+``json.load`` the lot, this reads the stream a chunk at a time & decodes one
+archive entry at a time, so memory use stays flat however big the vault.
+
+Usage::
+
+    >>> from boto3.glacier.inventory import iter_archives
+    >>> resp = conn.get_job_output(vault_name='backups', job_id=job_id)
+    >>> for archive in iter_archives(resp, vault_name='backups'):
+    ...     print(archive.id, archive.size)
+
+"""
+import codecs
+
+from boto3.utils import json
+from boto3.utils.mangle import to_snake_case
+
+
+CHUNK_SIZE = 64 * 1024
+WHITESPACE = ' \t\n\r'
+
+
+class InventoryScanner(object):
+    """
+    Pulls JSON values out of a byte stream, reading only as much as it needs.
+    """
+    def __init__(self, stream, chunk_size=CHUNK_SIZE):
+        """
+        Creates a new ``InventoryScanner`` instance.
+
+        :param stream: The inventory, as bytes
+        :type stream: file-like object
+
+        :param chunk_size: (Optional) How many bytes to read at a time.
+            Default is 64 KB.
+        :type chunk_size: integer
+        """
+        super(InventoryScanner, self).__init__()
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self):
+        if self.eof:
+            return False
+
+        data = self.stream.read(self.chunk_size)
+
+        if not data:
+            self.eof = True
+            self.buf = self.buf[self.pos:] + self._text.decode(b'', True)
+            self.pos = 0
+            return False
+
+        # Drop what's been consumed, so the buffer only ever holds the value
+        # being decoded.
+        self.buf = self.buf[self.pos:] + self._text.decode(data)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Skips whitespace & returns the next character (without consuming it),
+        or ``None`` at the end of the stream.
+
+        :rtype: string
+        """
+        while True:
+            buf = self.buf
+
+            while self.pos < len(buf) and buf[self.pos] in WHITESPACE:
+                self.pos += 1
+
+            if self.pos < len(buf):
+                return buf[self.pos]
+
+            if not self._read_more():
+                return None
+
+    def expect(self, chars):
+        """
+        Consumes the next (non-whitespace) character, which must be one of
+        ``chars``.
+
+        :returns: The character consumed
+        :rtype: string
+        """
+        char = self.peek()
+
+        if char is None or char not in chars:
+            raise ValueError(
+                "Expected one of '{0}' in the inventory, found {1!r}.".format(
+                    chars,
+                    char
+                )
+            )
+
+        self.pos += 1
+        return char
+
+    def value(self):
+        """
+        Decodes & consumes the next complete JSON value.
+        """
+        self.peek()
+
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if not self._read_more():
+                    raise
+                continue
+
+            # A number right at the end of the buffer may carry on in the next
+            # chunk.
+            if end == len(self.buf) and not self.eof:
+                if self._read_more():
+                    continue
+
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+
+            self.pos = end
+            return value
+
+
+def iter_inventory(stream, metadata=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields the raw entries of an inventory's ``ArchiveList``, one at a time.
+
+    :param stream: The inventory, as bytes
+    :type stream: file-like object
+
+    :param metadata: (Optional) A dict to fill with the inventory's other
+        top-level fields (``VaultARN``, ``InventoryDate``), as they're read
+    :type metadata: dict
+
+    :param chunk_size: (Optional) How many bytes to read at a time. Default
+        is 64 KB.
+    :type chunk_size: integer
+
+    :returns: A generator of dicts
+    """
+    if metadata is None:
+        metadata = {}
+
+    scanner = InventoryScanner(stream, chunk_size=chunk_size)
+    scanner.expect('{')
+
+    if scanner.peek() == '}':
+        return
+
+    while True:
+        key = scanner.value()
+        scanner.expect(':')
+
+        if key == 'ArchiveList':
+            scanner.expect('[')
+
+            if scanner.peek() == ']':
+                scanner.expect(']')
+            else:
+                while True:
+                    yield scanner.value()
+
+                    if scanner.expect(',]') == ']':
+                        break
+        else:
+            metadata[key] = scanner.value()
+
+        if scanner.expect(',}') == '}':
+            return
+
+
+def iter_archives(job_output, connection=None, vault_name=None,
+                  metadata=None, resource_class=None, chunk_size=CHUNK_SIZE):
+    """
+    Yields an ``Archive`` for each entry in an inventory job's output.
+
+    Each carries the ``id``, ``size``, ``description``, ``creation_date`` &
+    ``sha256_tree_hash`` of the archive (& the ``vault_name``, if given).
+
+    :param job_output: Either the response from ``GetJobOutput`` (i.e. from
+        ``Job.get``) or any file-like object with the inventory's bytes
+    :type job_output: dict or file-like object
+
+    :param connection: (Optional) The connection the ``Archive`` objects
+        should use
+    :type connection: <boto3.core.connection.Connection> subclass
+
+    :param vault_name: (Optional) The name of the inventoried vault
+    :type vault_name: string
+
+    :param metadata: (Optional) A dict to fill with the inventory's
+        ``VaultARN`` & ``InventoryDate``
+    :type metadata: dict
+
+    :param resource_class: (Optional) The class to build for each archive.
+        Default is ``boto3.glacier.resources.Archive``.
+    :type resource_class: class
+
+    :param chunk_size: (Optional) How many bytes to read at a time. Default
+        is 64 KB.
+    :type chunk_size: integer
+
+    :returns: A generator of ``Archive`` objects
+    """
+    if resource_class is None:
+        from boto3.glacier.resources import Archive
+        resource_class = Archive
+
+    stream = job_output
+
+    if isinstance(job_output, dict):
+        stream = job_output['body']
+
+    for entry in iter_inventory(stream, metadata, chunk_size=chunk_size):
+        data = {}
+
+        for key, value in entry.items():
+            data[to_snake_case(key)] = value
+
+        data['id'] = data.pop('archive_id', None)
+
+        if 'archive_description' in data:
+            data['description'] = data.pop('archive_description')
+
+        if vault_name is not None:
+            data['vault_name'] = vault_name
+
+        yield resource_class(connection=connection, **data)
@@ -0,0 +1,19 @@
+import boto3
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+VaultCollection = boto3.session.get_collection('glacier', 'VaultCollection')
+ArchiveCollection = boto3.session.get_collection(
+    'glacier',
+    'ArchiveCollection'
+)
+MultipartUploadCollection = boto3.session.get_collection(
+    'glacier',
+    'MultipartUploadCollection'
+)
+JobCollection = boto3.session.get_collection('glacier', 'JobCollection')
+Vault = boto3.session.get_resource('glacier', 'Vault')
+Archive = boto3.session.get_resource('glacier', 'Archive')
+MultipartUpload = boto3.session.get_resource('glacier', 'MultipartUpload')
+Job = boto3.session.get_resource('glacier', 'Job')
@@ -0,0 +1,416 @@
+"""
+Glacier's SHA-256 tree hash.
+
+Glacier checksums data by hashing each 1 MB chunk (the "leaves") with
+SHA-256, then hashing adjacent pairs of digests together, level by level,
+until one digest remains. An odd digest out at any level is carried up as-is.
+
+``TreeHash`` computes this incrementally, as data is fed in, holding only
+one digest per level of the tree. For whole files, ``tree_hash_file`` hashes
+the leaves on a thread pool (``hashlib`` releases the GIL while hashing),
+straight out of an ``mmap`` where possible, so nothing is copied.
+
+Usage::
+
+    >>> from boto3.glacier.treehash import TreeHash
+    >>> tree = TreeHash()
+    >>> tree.update(b'hello ')
+    >>> tree.update(b'world')
+    >>> tree.hexdigest()
+    'b94d27b9934d3e08a52e52d7da7dabfac484efe37a5380ee9088f7ace2efcde9'
+
+"""
+import binascii
+import hashlib
+import mmap
+import os
+
+from concurrent import futures
+
+from boto3.utils import six
+
+
+MB = 1024 * 1024
+LEAF_SIZE = MB
+# How many leaves each task on the pool hashes. Big enough to keep the
+# per-task overhead negligible, small enough to spread the work about.
+LEAVES_PER_TASK = 16
+# How many leaves at a time are read from a stream.
+BUFFER_LEAVES = 64
+
+
+def combine(left, right):
+    """
+    Hashes two (binary) digests together, as one node of the tree.
+
+    :rtype: bytes
+    """
+    return hashlib.sha256(left + right).digest()
+
+
+class TreeHash(object):
+    """
+    An incremental Glacier tree hash.
+
+    Leaves can be added either as raw data (``update``) or as already-computed
+    leaf/subtree digests (``add_digest``), which is how the tree hashes of
+    individual parts are folded into the tree hash of a whole archive.
+    """
+    def __init__(self, data=None):
+        """
+        Creates a new ``TreeHash`` instance.
+
+        :param data: (Optional) Initial data to hash
+        :type data: bytes
+        """
+        super(TreeHash, self).__init__()
+        # ``(level, digest)`` pairs, with strictly decreasing levels. Works
+        # like a binary counter: two equal levels combine into the next one.
+        self._stack = []
+        self._leaf = hashlib.sha256()
+        self._leaf_size = 0
+        self.size = 0
+
+        if data:
+            self.update(data)
+
+    def update(self, data):
+        """
+        Feeds more data into the hash.
+
+        :param data: The data
+        :type data: bytes
+        """
+        view = memoryview(data)
+        offset = 0
+        length = len(view)
+        self.size += length
+
+        while offset < length:
+            take = min(LEAF_SIZE - self._leaf_size, length - offset)
+            self._leaf.update(view[offset:offset + take])
+            self._leaf_size += take
+            offset += take
+
+            if self._leaf_size == LEAF_SIZE:
+                self._push(0, self._leaf.digest())
+                self._leaf = hashlib.sha256()
+                self._leaf_size = 0
+
+    def add_digest(self, digest, level=0, size=None):
+        """
+        Adds a precomputed digest: a leaf's SHA-256 (``level=0``) or the tree
+        hash of ``2 ** level`` whole leaves.
+
+        The tree must be at a leaf boundary (no partial leaf pending).
+
+        :param digest: The binary digest
+        :type digest: bytes
+
+        :param level: (Optional) The height of the subtree the digest covers.
+            Default is ``0`` (a single leaf).
+        :type level: integer
+
+        :param size: (Optional) How many bytes the digest covers. By default,
+            this is ``2 ** level`` full leaves.
+        :type size: integer
+        """
+        if self._leaf_size:
+            raise ValueError("Can't add a digest partway through a leaf.")
+
+        if size is None:
+            size = LEAF_SIZE * (2 ** level)
+
+        self.size += size
+        self._push(level, digest)
+
+    def _push(self, level, digest):
+        stack = self._stack
+
+        while stack and stack[-1][0] == level:
+            left = stack.pop()[1]
+            digest = combine(left, digest)
+            level += 1
+
+        if stack and stack[-1][0] < level:
+            raise ValueError(
+                "Subtrees must be added largest first, on a subtree boundary."
+            )
+
+        stack.append((level, digest))
+
+    def digest(self):
+        """
+        Returns the tree hash of everything fed in so far.
+
+        The ``TreeHash`` can still be updated afterward.
+
+        :rtype: bytes
+        """
+        digests = [digest for level, digest in self._stack]
+
+        if self._leaf_size or not digests:
+            # The last (partial) leaf. Empty data hashes as one empty leaf.
+            digests.append(self._leaf.digest())
+
+        # Fold from the right: odd digests carried up meet their partner in
+        # the level above.
+        result = digests.pop()
+
+        while digests:
+            result = combine(digests.pop(), result)
+
+        return result
+
+    def hexdigest(self):
+        """
+        Returns the tree hash as a hex string, as Glacier expects it in
+        ``checksum`` parameters.
+
+        :rtype: string
+        """
+        return binascii.hexlify(self.digest()).decode('ascii')
+
+
+def leaf_digests(data):
+    """
+    Returns the SHA-256 digest of each 1 MB leaf of a byte string.
+
+    Handy when the same leaves feed more than one tree (i.e. a part's & the
+    whole archive's), so each is only hashed once.
+
+    :param data: The data
+    :type data: bytes
+
+    :returns: A list of ``(digest, size)`` tuples
+    :rtype: list
+    """
+    view = memoryview(data)
+    length = len(view)
+
+    if not length:
+        return [(hashlib.sha256().digest(), 0)]
+
+    return [
+        (
+            hashlib.sha256(view[offset:offset + LEAF_SIZE]).digest(),
+            min(LEAF_SIZE, length - offset)
+        )
+        for offset in range(0, length, LEAF_SIZE)
+    ]
+
+
+def tree_hash(data):
+    """
+    Returns the hex tree hash of a byte string.
+
+    :param data: The data
+    :type data: bytes
+
+    :rtype: string
+    """
+    return TreeHash(data).hexdigest()
+
+
+def _hash_leaves(view, start, end):
+    length = len(view)
+    return [
+        (
+            hashlib.sha256(view[offset:offset + LEAF_SIZE]).digest(),
+            min(LEAF_SIZE, length - offset)
+        )
+        for offset in range(start, end, LEAF_SIZE)
+    ]
+
+
+def parallel_leaf_digests(data, executor=None, max_workers=None):
+    """
+    Returns the SHA-256 digest of each 1 MB leaf of a buffer, like
+    ``leaf_digests``, but hashes the leaves on a thread pool.
+
+    :param data: The data. Anything supporting the buffer protocol (bytes,
+        ``bytearray``, ``mmap``, ``memoryview``) works & isn't copied.
+    :type data: bytes
+
+    :param executor: (Optional) An existing thread pool to hash on
+    :type executor: <concurrent.futures.Executor> instance
+
+    :param max_workers: (Optional) How many threads to hash on, if no
+        ``executor`` is provided. Default is one per CPU.
+    :type max_workers: integer
+
+    :returns: A list of ``(digest, size)`` tuples
+    :rtype: list
+    """
+    view = memoryview(data)
+    length = len(view)
+    step = LEAF_SIZE * LEAVES_PER_TASK
+
+    if length <= step:
+        return leaf_digests(view)
+
+    own_executor = executor is None
+
+    if own_executor:
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max_workers or _cpu_count()
+        )
+
+    try:
+        starts = list(range(0, length, step))
+        chunks = executor.map(
+            _hash_leaves,
+            [view] * len(starts),
+            starts,
+            [min(start + step, length) for start in starts]
+        )
+        digests = []
+
+        for chunk in chunks:
+            digests.extend(chunk)
+
+        return digests
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+def _cpu_count():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
+def _fill(fileobj, view):
+    # Reads until ``view`` is full or the stream runs out, since a short read
+    # mid-stream would otherwise shift every leaf boundary after it.
+    filled = 0
+    length = len(view)
+
+    while filled < length:
+        if hasattr(fileobj, 'readinto'):
+            read = fileobj.readinto(view[filled:])
+        else:
+            data = fileobj.read(length - filled)
+            read = len(data)
+            view[filled:filled + read] = data
+
+        if not read:
+            break
+
+        filled += read
+
+    return filled
+
+
+def _mmap_file(fileobj):
+    try:
+        fileno = fileobj.fileno()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+    if os.fstat(fileno).st_size == 0:
+        # ``mmap`` won't map an empty file.
+        return None
+
+    try:
+        mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+    except (EnvironmentError, ValueError):
+        return None
+
+    try:
+        memoryview(mapped)
+    except TypeError:
+        # Python 2's ``mmap`` doesn't support the new buffer protocol.
+        mapped.close()
+        return None
+
+    return mapped
+
+
+def tree_hash_file(source, executor=None, max_workers=None):
+    """
+    Returns the hex tree hash of a whole file.
+
+    Regular files are memory-mapped & their leaves hashed in parallel, with
+    no copies. Anything else (pipes, sockets, ``BytesIO``) is read into a
+    reused buffer ``BUFFER_LEAVES`` MB at a time & each buffer hashed in
+    parallel.
+
+    Usage::
+
+        >>> from boto3.glacier.treehash import tree_hash_file
+        >>> tree_hash_file('/backups/2013-11.tar')
+        '9d8f5b1ab17dcbeae0a62bc0a2ae9b48c9c3bea1e8a3f2d9a1a9e6e0be14c8a2'
+
+    :param source: A path or a file-like object (read from its current
+        position to the end)
+    :type source: string or file-like object
+
+    :param executor: (Optional) An existing thread pool to hash on
+    :type executor: <concurrent.futures.Executor> instance
+
+    :param max_workers: (Optional) How many threads to hash on, if no
+        ``executor`` is provided. Default is one per CPU.
+    :type max_workers: integer
+
+    :rtype: string
+    """
+    if isinstance(source, six.string_types):
+        with open(source, 'rb') as fileobj:
+            return tree_hash_file(
+                fileobj,
+                executor=executor,
+                max_workers=max_workers
+            )
+
+    own_executor = executor is None
+
+    if own_executor:
+        executor = futures.ThreadPoolExecutor(
+            max_workers=max_workers or _cpu_count()
+        )
+
+    tree = TreeHash()
+
+    try:
+        mapped = None
+
+        if hasattr(source, 'tell') and source.tell() == 0:
+            mapped = _mmap_file(source)
+
+        if mapped is not None:
+            try:
+                view = memoryview(mapped)
+
+                for digest, size in parallel_leaf_digests(view, executor):
+                    tree.add_digest(digest, size=size)
+
+                if hasattr(view, 'release'):
+                    view.release()
+            finally:
+                mapped.close()
+
+            return tree.hexdigest()
+
+        buf = bytearray(LEAF_SIZE * BUFFER_LEAVES)
+        view = memoryview(buf)
+
+        while True:
+            read = _fill(source, view)
+
+            if read:
+                digests = parallel_leaf_digests(view[:read], executor)
+
+                for digest, size in digests:
+                    tree.add_digest(digest, size=size)
+
+            if read < len(buf):
+                break
+
+        return tree.hexdigest()
+    finally:
+        if own_executor:
+            executor.shutdown(wait=True)
@@ -0,0 +1,695 @@
+import binascii
+import os
+import threading
+
+from concurrent import futures
+
+from boto3.core.exceptions import TreeHashValidationError
+from boto3.glacier.treehash import MB, TreeHash, _fill, leaf_digests
+from boto3.glacier.treehash import tree_hash
+from boto3.utils import json
+
+
+DEFAULT_PART_SIZE = 8 * MB
+MAX_PART_SIZE = 4096 * MB
+MAX_PARTS = 10000
+
+
+def part_size_for(archive_size, minimum=DEFAULT_PART_SIZE):
+    """
+    Returns the smallest valid part size (a power of two number of MB) that
+    uploads an archive in at most 10,000 parts.
+
+    :param archive_size: The size of the archive, in bytes
+    :type archive_size: integer
+
+    :param minimum: (Optional) The smallest part size to consider. Default is
+        8 MB.
+    :type minimum: integer
+
+    :rtype: integer
+    """
+    part_size = MB
+
+    while part_size < minimum or part_size * MAX_PARTS < archive_size:
+        part_size *= 2
+
+    if part_size > MAX_PART_SIZE:
+        raise ValueError(
+            "Archives can be at most {0} bytes.".format(
+                MAX_PART_SIZE * MAX_PARTS
+            )
+        )
+
+    return part_size
+
+
+def _check_part_size(part_size):
+    if part_size < MB or part_size > MAX_PART_SIZE:
+        raise ValueError("Part sizes must be between 1 MB & 4 GB.")
+
+    megabytes = part_size // MB
+
+    if part_size % MB or megabytes & (megabytes - 1):
+        raise ValueError(
+            "Part sizes must be a power of two number of MB, not {0}.".format(
+                part_size
+            )
+        )
+
+
+class ArchiveUploader(object):
+    """
+    Uploads a (potentially huge) archive to a Glacier vault in parts,
+    several at a time.
+
+    The file is read once, a part at a time. As each part is read, its leaves
+    are hashed once & fed into both the part's tree hash & the whole
+    archive's, so no second pass over the data is needed. At most
+    ``2 * max_workers`` parts are held in memory at any point.
+
+    If anything goes wrong, the multipart upload is left in place (its ID is
+    on ``upload_id``), so it can be resumed by calling ``upload`` again with
+    that ``upload_id``. Parts Glacier already has (with a matching tree hash)
+    are then skipped.
+
+    Usage::
+
+        >>> from boto3.glacier.connection import GlacierConnection
+        >>> from boto3.glacier.utils import ArchiveUploader
+        >>> conn = GlacierConnection()
+        >>> uploader = ArchiveUploader(conn, 'backups', max_workers=8)
+        >>> with open('/backups/2013-11.tar', 'rb') as archive:
+        ...     resp = uploader.upload(archive, description='November')
+        >>> resp['archiveId']
+        'NkbByEejwEggmBz2fTHgJrg0XBoDfjP4q6iu87-TjhqG6eGoOY9Z8i1_AUyUs...'
+
+    """
+    def __init__(self, conn, vault_name, part_size=DEFAULT_PART_SIZE,
+                 max_workers=4, account_id='-', executor=None):
+        """
+        Creates a new ``ArchiveUploader`` instance.
+
+        :param conn: A ``Connection`` subclass for Glacier
+        :type conn: A <boto3.core.connection.Connection> subclass
+
+        :param vault_name: The name of the vault to upload to
+        :type vault_name: string
+
+        :param part_size: (Optional) The size of each part, in bytes. Must be
+            a power of two number of MB, from 1 MB to 4 GB. Default is 8 MB.
+            When resuming, the upload's own part size is used instead.
+        :type part_size: integer
+
+        :param max_workers: (Optional) How many parts to upload at once.
+            Default is ``4``.
+        :type max_workers: integer
+
+        :param account_id: (Optional) The account owning the vault. Default
+            is ``-`` (the account of the credentials in use).
+        :type account_id: string
+
+        :param executor: (Optional) An existing thread pool to upload parts
+            on.
+        :type executor: <concurrent.futures.Executor> instance
+        """
+        super(ArchiveUploader, self).__init__()
+        _check_part_size(part_size)
+        self.conn = conn
+        self.vault_name = vault_name
+        self.part_size = part_size
+        self.max_workers = max_workers
+        self.account_id = account_id
+        self.executor = executor
+        self.upload_id = None
+        self.parts_uploaded = 0
+        self.parts_skipped = 0
+
+    def _initiate(self, description):
+        kwargs = {}
+
+        if description is not None:
+            kwargs['archive_description'] = description
+
+        resp = self.conn.initiate_multipart_upload(
+            vault_name=self.vault_name,
+            account_id=self.account_id,
+            part_size=str(self.part_size),
+            **kwargs
+        )
+        return resp['uploadId']
+
+    def uploaded_parts(self, upload_id):
+        """
+        Asks Glacier which parts of a multipart upload it already has.
+
+        Also adopts the upload's part size.
+
+        :param upload_id: The ID of the multipart upload
+        :type upload_id: string
+
+        :returns: The tree hash of each part, by the part's starting byte
+        :rtype: dict
+        """
+        parts = {}
+        marker = None
+
+        while True:
+            kwargs = {}
+
+            # botocore won't let us include this if it's ``None``.
+            if marker is not None:
+                kwargs['marker'] = marker
+
+            resp = self.conn.list_parts(
+                vault_name=self.vault_name,
+                account_id=self.account_id,
+                upload_id=upload_id,
+                **kwargs
+            )
+
+            if resp.get('PartSizeInBytes'):
+                self.part_size = int(resp['PartSizeInBytes'])
+
+            for part in resp.get('Parts', []):
+                start = int(part['RangeInBytes'].split('-')[0])
+                parts[start] = part['SHA256TreeHash']
+
+            marker = resp.get('Marker')
+
+            if not marker:
+                return parts
+
+    def _upload_part(self, start, data, checksum):
+        resp = self.conn.upload_multipart_part(
+            vault_name=self.vault_name,
+            account_id=self.account_id,
+            upload_id=self.upload_id,
+            range='bytes {0}-{1}/*'.format(start, start + len(data) - 1),
+            checksum=checksum,
+            body=data
+        )
+        received = resp.get('checksum')
+
+        if received and received != checksum:
+            raise TreeHashValidationError(
+                "Part at byte {0} was received with tree hash '{1}', not "
+                "'{2}'.".format(start, received, checksum)
+            )
+
+        return resp
+
+    def _read_part(self, fileobj):
+        # A single ``read`` may come back short (pipes, sockets, etc.) well
+        # before the end of the stream, so keep reading until the part's full.
+        buf = bytearray(self.part_size)
+        read = _fill(fileobj, memoryview(buf))
+        return bytes(buf[:read])
+
+    def _reap(self, pending, return_when):
+        done, not_done = futures.wait(pending, return_when=return_when)
+
+        for future in done:
+            # Raises if the part failed.
+            future.result()
+            self.parts_uploaded += 1
+
+        return not_done
+
+    def upload(self, fileobj, description=None, upload_id=None):
+        """
+        Uploads the contents of a file-like object as a new archive.
+
+        :param fileobj: The data to upload, read from its current position to
+            the end
+        :type fileobj: file-like object
+
+        :param description: (Optional) A description for the archive
+        :type description: string
+
+        :param upload_id: (Optional) The ID of an interrupted multipart upload
+            of the same data, to resume
+        :type upload_id: string
+
+        :returns: The ``CompleteMultipartUpload`` response, including the
+            ``archiveId``, ``checksum`` & ``location``
+        :rtype: dict
+
+        :raises: ``ValueError`` if there's no data to upload
+        """
+        existing = {}
+
+        if upload_id is not None:
+            existing = self.uploaded_parts(upload_id)
+            _check_part_size(self.part_size)
+
+        data = self._read_part(fileobj)
+
+        # Glacier won't store an empty archive, so don't start an upload
+        # that could never be completed.
+        if not data:
+            raise ValueError("Can't upload an empty archive.")
+
+        if upload_id is None:
+            upload_id = self._initiate(description)
+
+        self.upload_id = upload_id
+        self.parts_uploaded = 0
+        self.parts_skipped = 0
+        archive_tree = TreeHash()
+        executor = self.executor
+        own_executor = executor is None
+
+        if own_executor:
+            executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        pending = set()
+        start = 0
+
+        try:
+            while data:
+                part_tree = TreeHash()
+
+                for digest, size in leaf_digests(data):
+                    part_tree.add_digest(digest, size=size)
+                    archive_tree.add_digest(digest, size=size)
+
+                checksum = part_tree.hexdigest()
+
+                if existing.get(start) == checksum:
+                    self.parts_skipped += 1
+                else:
+                    if len(pending) >= self.max_workers * 2:
+                        pending = self._reap(
+                            pending,
+                            futures.FIRST_COMPLETED
+                        )
+
+                    pending.add(executor.submit(
+                        self._upload_part,
+                        start,
+                        data,
+                        checksum
+                    ))
+
+                start += len(data)
+
+                if len(data) < self.part_size:
+                    break
+
+                data = self._read_part(fileobj)
+
+            self._reap(pending, futures.FIRST_EXCEPTION)
+            pending = set()
+        finally:
+            if pending:
+                for future in pending:
+                    future.cancel()
+
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        return self.conn.complete_multipart_upload(
+            vault_name=self.vault_name,
+            account_id=self.account_id,
+            upload_id=upload_id,
+            archive_size=str(archive_tree.size),
+            checksum=archive_tree.hexdigest()
+        )
+
+
+def upload_archive(conn, vault_name, fileobj, description=None,
+                   part_size=DEFAULT_PART_SIZE, max_workers=4,
+                   upload_id=None):
+    """
+    Uploads a file-like object as a new archive, in parallel parts.
+
+    A shortcut for ``ArchiveUploader(...).upload(...)``. See
+    ``ArchiveUploader`` for the details.
+
+    :param conn: A ``Connection`` subclass for Glacier
+    :type conn: A <boto3.core.connection.Connection> subclass
+
+    :param vault_name: The name of the vault to upload to
+    :type vault_name: string
+
+    :param fileobj: The data to upload
+    :type fileobj: file-like object
+
+    :param description: (Optional) A description for the archive
+    :type description: string
+
+    :param part_size: (Optional) The size of each part, in bytes. Default is
+        8 MB.
+    :type part_size: integer
+
+    :param max_workers: (Optional) How many parts to upload at once. Default
+        is ``4``.
+    :type max_workers: integer
+
+    :param upload_id: (Optional) The ID of an interrupted multipart upload to
+        resume
+    :type upload_id: string
+
+    :returns: The ``CompleteMultipartUpload`` response
+    :rtype: dict
+    """
+    uploader = ArchiveUploader(
+        conn,
+        vault_name,
+        part_size=part_size,
+        max_workers=max_workers
+    )
+    return uploader.upload(
+        fileobj,
+        description=description,
+        upload_id=upload_id
+    )
+
+
+def _read_body(body):
+    # Depending on the botocore version, the body is either already read or
+    # a stream.
+    if hasattr(body, 'read'):
+        return body.read()
+
+    return body
+
+
+def _level_of(chunk_size):
+    level = 0
+
+    while (MB << level) < chunk_size:
+        level += 1
+
+    return level
+
+
+class JobOutputDownloader(object):
+    """
+    Downloads the output of a Glacier retrieval job to a file in byte ranges,
+    several at a time.
+
+    The file is preallocated, then each range is fetched with
+    ``GetJobOutput``, checked against the tree hash Glacier sends back &
+    written into place. Finished ranges (& their tree hashes) are recorded
+    in a small JSON state file next to the download (``<path>.state``), so
+    if the process dies, calling ``download`` again only fetches the ranges
+    that are missing. Once everything is down, the range hashes are combined
+    & checked against the archive's tree hash, then the state file is
+    removed.
+
+    Usage::
+
+        >>> from boto3.glacier.connection import GlacierConnection
+        >>> from boto3.glacier.utils import JobOutputDownloader
+        >>> conn = GlacierConnection()
+        >>> downloader = JobOutputDownloader(conn, 'backups', job_id)
+        >>> downloader.download('/restore/2013-11.tar')
+
+    """
+    def __init__(self, conn, vault_name, job_id, chunk_size=DEFAULT_PART_SIZE,
+                 max_workers=4, account_id='-', executor=None):
+        """
+        Creates a new ``JobOutputDownloader`` instance.
+
+        :param conn: A ``Connection`` subclass for Glacier
+        :type conn: A <boto3.core.connection.Connection> subclass
+
+        :param vault_name: The name of the vault the job ran against
+        :type vault_name: string
+
+        :param job_id: The ID of the (completed) retrieval job
+        :type job_id: string
+
+        :param chunk_size: (Optional) The size of each range, in bytes. Must
+            be a power of two number of MB (so Glacier returns a tree hash
+            for each range). Default is 8 MB.
+        :type chunk_size: integer
+
+        :param max_workers: (Optional) How many ranges to fetch at once.
+            Default is ``4``.
+        :type max_workers: integer
+
+        :param account_id: (Optional) The account owning the vault. Default
+            is ``-`` (the account of the credentials in use).
+        :type account_id: string
+
+        :param executor: (Optional) An existing thread pool to fetch ranges
+            on.
+        :type executor: <concurrent.futures.Executor> instance
+        """
+        super(JobOutputDownloader, self).__init__()
+        _check_part_size(chunk_size)
+        self.conn = conn
+        self.vault_name = vault_name
+        self.job_id = job_id
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.account_id = account_id
+        self.executor = executor
+        self.ranges_fetched = 0
+        self.ranges_skipped = 0
+        self._lock = threading.Lock()
+
+    def describe(self):
+        """
+        Looks up the job's output size & (for archive retrievals) tree hash.
+
+        :returns: A ``(size, tree_hash)`` tuple. ``tree_hash`` may be
+            ``None``.
+        :rtype: tuple
+        """
+        job = self.conn.describe_job(
+            vault_name=self.vault_name,
+            account_id=self.account_id,
+            job_id=self.job_id
+        )
+
+        if job.get('Action') == 'InventoryRetrieval':
+            return int(job['InventorySizeInBytes']), None
+
+        return int(job['ArchiveSizeInBytes']), job.get('SHA256TreeHash')
+
+    def _load_state(self, state_path, size):
+        try:
+            with open(state_path, 'r') as state_file:
+                state = json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+        expected = (self.job_id, size, self.chunk_size)
+
+        if (state.get('job_id'), state.get('size'),
+                state.get('chunk_size')) != expected:
+            return None
+
+        return state
+
+    def _save_state(self, state_path, state):
+        # Written aside & renamed into place, so a crash mid-write can't
+        # leave a half-written state file.
+        temp_path = state_path + '.tmp'
+
+        with open(temp_path, 'w') as state_file:
+            json.dump(state, state_file)
+
+        if os.name == 'nt' and os.path.exists(state_path):
+            os.remove(state_path)
+
+        os.rename(temp_path, state_path)
+
+    def _fetch(self, fileobj, start, end, state, state_path):
+        resp = self.conn.get_job_output(
+            vault_name=self.vault_name,
+            account_id=self.account_id,
+            job_id=self.job_id,
+            range='bytes={0}-{1}'.format(start, end - 1)
+        )
+        data = _read_body(resp['body'])
+
+        if len(data) != end - start:
+            raise TreeHashValidationError(
+                "Expected {0} bytes at byte {1}, got {2}.".format(
+                    end - start,
+                    start,
+                    len(data)
+                )
+            )
+
+        checksum = tree_hash(data)
+        expected = resp.get('checksum')
+
+        if expected and expected != checksum:
+            raise TreeHashValidationError(
+                "Range at byte {0} has tree hash '{1}', not '{2}'.".format(
+                    start,
+                    checksum,
+                    expected
+                )
+            )
+
+        with self._lock:
+            fileobj.seek(start)
+            fileobj.write(data)
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+            state['ranges'][str(start)] = checksum
+            self._save_state(state_path, state)
+            self.ranges_fetched += 1
+
+    def _reap(self, pending, return_when):
+        done, not_done = futures.wait(pending, return_when=return_when)
+
+        for future in done:
+            # Raises if the range failed.
+            future.result()
+
+        return not_done
+
+    def download(self, path, size=None, checksum=None):
+        """
+        Downloads the job's output to a file, resuming an earlier attempt if
+        one was interrupted.
+
+        :param path: Where to write the output
+        :type path: string
+
+        :param size: (Optional) The size of the output, in bytes. If not
+            provided, it (& ``checksum``) is looked up with ``DescribeJob``.
+        :type size: integer
+
+        :param checksum: (Optional) The expected tree hash of the whole
+            output
+        :type checksum: string
+
+        :returns: The tree hash of the downloaded output
+        :rtype: string
+        """
+        if size is None:
+            size, described = self.describe()
+            checksum = checksum or described
+
+        state_path = path + '.state'
+        state = None
+
+        if os.path.exists(path):
+            state = self._load_state(state_path, size)
+
+        if state is None:
+            state = {
+                'job_id': self.job_id,
+                'size': size,
+                'chunk_size': self.chunk_size,
+                'ranges': {},
+            }
+            # Preallocate, so every range can be written straight into place.
+            with open(path, 'wb') as fileobj:
+                fileobj.truncate(size)
+
+            self._save_state(state_path, state)
+
+        self.ranges_fetched = 0
+        self.ranges_skipped = 0
+        executor = self.executor
+        own_executor = executor is None
+
+        if own_executor:
+            executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        pending = set()
+
+        try:
+            with open(path, 'r+b') as fileobj:
+                for start in range(0, size, self.chunk_size):
+                    if str(start) in state['ranges']:
+                        self.ranges_skipped += 1
+                        continue
+
+                    if len(pending) >= self.max_workers * 2:
+                        pending = self._reap(pending, futures.FIRST_COMPLETED)
+
+                    pending.add(executor.submit(
+                        self._fetch,
+                        fileobj,
+                        start,
+                        min(start + self.chunk_size, size),
+                        state,
+                        state_path
+                    ))
+
+                self._reap(pending, futures.FIRST_EXCEPTION)
+                pending = set()
+        finally:
+            for future in pending:
+                future.cancel()
+
+            if own_executor:
+                executor.shutdown(wait=True)
+
+        # Each range is a whole subtree of the archive's tree, so their hashes
+        # combine into the archive's without rereading anything.
+        tree = TreeHash()
+        level = _level_of(self.chunk_size)
+
+        for start in range(0, size, self.chunk_size):
+            tree.add_digest(
+                binascii.unhexlify(state['ranges'][str(start)]),
+                level=level,
+                size=min(self.chunk_size, size - start)
+            )
+
+        result = tree.hexdigest()
+
+        if checksum and checksum != result:
+            raise TreeHashValidationError(
+                "Downloaded output has tree hash '{0}', not '{1}'.".format(
+                    result,
+                    checksum
+                )
+            )
+
+        os.remove(state_path)
+        return result
+
+
+def download_job_output(conn, vault_name, job_id, path,
+                        chunk_size=DEFAULT_PART_SIZE, max_workers=4):
+    """
+    Downloads the output of a retrieval job to a file, in parallel ranges,
+    resuming an interrupted download of the same job to the same path.
+
+    A shortcut for ``JobOutputDownloader(...).download(...)``. See
+    ``JobOutputDownloader`` for the details.
+
+    :param conn: A ``Connection`` subclass for Glacier
+    :type conn: A <boto3.core.connection.Connection> subclass
+
+    :param vault_name: The name of the vault the job ran against
+    :type vault_name: string
+
+    :param job_id: The ID of the retrieval job
+    :type job_id: string
+
+    :param path: Where to write the output
+    :type path: string
+
+    :param chunk_size: (Optional) The size of each range, in bytes. Default
+        is 8 MB.
+    :type chunk_size: integer
+
+    :param max_workers: (Optional) How many ranges to fetch at once. Default
+        is ``4``.
+    :type max_workers: integer
+
+    :returns: The tree hash of the downloaded output
+    :rtype: string
+    """
+    downloader = JobOutputDownloader(
+        conn,
+        vault_name,
+        job_id,
+        chunk_size=chunk_size,
+        max_workers=max_workers
+    )
+    return downloader.download(path)
@@ -0,0 +1,538 @@
+import threading
+import time
+
+from concurrent import futures
+
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import RetryPolicy, without_retries
+from boto3.utils import json
+from boto3.utils import OrderedDict
+from boto3.utils import six
+from boto3.utils.ratelimit import TokenBucket
+
+
+# The outcomes of ``apply_policy``, per target.
+UNCHANGED = 'unchanged'
+CREATED = 'created'
+UPDATED = 'updated'
+# How each kind of principal's inline policies are read & written.
+PRINCIPAL_KINDS = {
+    'user': ('get_user_policy', 'put_user_policy', 'user_name'),
+    'group': ('get_group_policy', 'put_group_policy', 'group_name'),
+    'role': ('get_role_policy', 'put_role_policy', 'role_name'),
+}
+
+
+class ThrottledCaller(object):
+    """
+    Makes IAM calls, optionally paced by a token bucket, retrying throttled
+    ones with exponential backoff (see ``boto3.core.retries.RetryPolicy``).
+
+    Shared by all the threads of a bulk operation, so they back off (&
+    stay under ``rate``) together. The methods it's handed should come from
+    a connection without its own retries (see
+    ``boto3.core.retries.without_retries``), so calls aren't retried twice.
+    """
+    def __init__(self, rate=None, max_retries=5, base_delay=0.5,
+                 max_delay=20, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``ThrottledCaller`` instance.
+
+        :param rate: (Optional) The most calls to make per second. Default
+            is no limit (rely on backing off).
+        :type rate: float
+
+        :param max_retries: (Optional) How many times to retry a throttled
+            call. Default is ``5``.
+        :type max_retries: integer
+
+        :param base_delay: (Optional) How long to wait before the first
+            retry, in seconds. Doubles with each retry. Default is ``0.5``.
+        :type base_delay: float
+
+        :param max_delay: (Optional) The longest to wait between retries, in
+            seconds. Default is ``20``.
+        :type max_delay: float
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(ThrottledCaller, self).__init__()
+        self.bucket = None
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        # Throttling only: other failures are left to the bulk operation.
+        self.policy = RetryPolicy(
+            max_attempts=max_retries + 1,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            transient_codes=(),
+            random=None,
+            sleep=sleep
+        )
+
+        if rate is not None:
+            self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+
+    def __call__(self, method, **kwargs):
+        def _attempt():
+            if self.bucket is not None:
+                self.bucket.consume()
+
+            with self._lock:
+                self.calls += 1
+
+            try:
+                return method(**kwargs)
+            except ServerError as err:
+                if err.code in self.policy.retryable_codes:
+                    with self._lock:
+                        self.throttled += 1
+
+                raise
+
+        return self.policy.call(getattr(method, '__name__', ''), _attempt)
+
+    def pages(self, method, result_key, **kwargs):
+        """
+        Calls a paginated IAM ``List*`` method until every page is in,
+        returning everything under ``result_key``.
+
+        :rtype: list
+        """
+        results = []
+
+        while True:
+            resp = self(method, **kwargs)
+            results.extend(resp.get(result_key, []))
+
+            if not resp.get('IsTruncated'):
+                return results
+
+            kwargs['marker'] = resp['Marker']
+
+
+class AccountSnapshot(object):
+    """
+    An in-memory copy of an account's IAM users, groups, roles & instance
+    profiles, plus indexes for answering "who's in what" without any more
+    API calls.
+
+    ``take`` builds one: the top-level ``List*`` calls are made
+    concurrently, then the per-user/group/role details are fetched on a
+    thread pool. Throttled calls are retried with backoff (& can be paced
+    with ``rate``).
+
+    Usage::
+
+        >>> from boto3.iam.connection import IamConnection
+        >>> from boto3.iam.utils import AccountSnapshot
+        >>> snapshot = AccountSnapshot.take(IamConnection(), max_workers=8)
+        >>> snapshot.groups_for_user('alice')
+        ['admins', 'developers']
+        >>> snapshot.users_in_group('admins')
+        ['alice', 'bob']
+        >>> snapshot.save('/tmp/iam.json')
+        >>> AccountSnapshot.load('/tmp/iam.json').roles.keys()
+        ['web', 'worker']
+
+    """
+    def __init__(self, users=None, groups=None, roles=None,
+                 instance_profiles=None, user_groups=None, user_policies=None,
+                 group_policies=None, role_policies=None, access_keys=None,
+                 taken_at=None):
+        """
+        Creates a new ``AccountSnapshot`` instance.
+
+        Typically, use ``take`` or ``load`` instead.
+        """
+        super(AccountSnapshot, self).__init__()
+        # Each by name, as ``List*`` returned them.
+        self.users = users or {}
+        self.groups = groups or {}
+        self.roles = roles or {}
+        self.instance_profiles = instance_profiles or {}
+        # User name -> group names.
+        self.user_groups = user_groups or {}
+        # Principal name -> inline policy names.
+        self.user_policies = user_policies or {}
+        self.group_policies = group_policies or {}
+        self.role_policies = role_policies or {}
+        # User name -> access key metadata.
+        self.access_keys = access_keys or {}
+        self.taken_at = taken_at
+        self._build_indexes()
+
+    def _build_indexes(self):
+        self.group_users = dict([(name, []) for name in self.groups])
+
+        for user_name in sorted(self.user_groups):
+            for group_name in self.user_groups[user_name]:
+                self.group_users.setdefault(group_name, []).append(user_name)
+
+        self.role_instance_profiles = dict([(name, []) for name in self.roles])
+        self.instance_profile_roles = {}
+
+        for name in sorted(self.instance_profiles):
+            profile = self.instance_profiles[name]
+            role_names = [
+                role['RoleName'] for role in profile.get('Roles', [])
+            ]
+            self.instance_profile_roles[name] = role_names
+
+            for role_name in role_names:
+                profiles = self.role_instance_profiles.setdefault(
+                    role_name,
+                    []
+                )
+                profiles.append(name)
+
+    @classmethod
+    def take(cls, iam_conn, max_workers=8, rate=None, caller=None,
+             clock=time.time):
+        """
+        Snapshots the account.
+
+        :param iam_conn: A ``Connection`` subclass for IAM
+        :type iam_conn: A <boto3.core.connection.Connection> subclass
+
+        :param max_workers: (Optional) How many calls to make at once.
+            Default is ``8``.
+        :type max_workers: integer
+
+        :param rate: (Optional) The most calls to make per second. Default is
+            no limit (backing off when throttled).
+        :type rate: float
+
+        :param caller: (Optional) A ``ThrottledCaller`` to make the calls
+            with. Overrides ``rate``.
+        :type caller: <boto3.iam.utils.ThrottledCaller> instance
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :rtype: <boto3.iam.utils.AccountSnapshot> instance
+        """
+        if caller is None:
+            caller = ThrottledCaller(rate=rate)
+
+        # ``caller`` handles the throttling.
+        iam_conn = without_retries(iam_conn)
+        taken_at = clock()
+
+        with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = [
+                executor.submit(caller.pages, iam_conn.list_users, 'Users'),
+                executor.submit(caller.pages, iam_conn.list_groups, 'Groups'),
+                executor.submit(caller.pages, iam_conn.list_roles, 'Roles'),
+                executor.submit(
+                    caller.pages,
+                    iam_conn.list_instance_profiles,
+                    'InstanceProfiles'
+                ),
+            ]
+            users, groups, roles, profiles = [
+                dict([(entry[key], entry) for entry in future.result()])
+                for future, key in zip(listings, (
+                    'UserName',
+                    'GroupName',
+                    'RoleName',
+                    'InstanceProfileName',
+                ))
+            ]
+
+            details = []
+
+            def _detail(index, key, method, result_key, **kwargs):
+                details.append((index, key, executor.submit(
+                    caller.pages,
+                    method,
+                    result_key,
+                    **kwargs
+                )))
+
+            user_groups = {}
+            user_policies = {}
+            access_keys = {}
+            group_policies = {}
+            role_policies = {}
+
+            for name in users:
+                _detail(
+                    user_groups,
+                    name,
+                    iam_conn.list_groups_for_user,
+                    'Groups',
+                    user_name=name
+                )
+                _detail(
+                    user_policies,
+                    name,
+                    iam_conn.list_user_policies,
+                    'PolicyNames',
+                    user_name=name
+                )
+                _detail(
+                    access_keys,
+                    name,
+                    iam_conn.list_access_keys,
+                    'AccessKeyMetadata',
+                    user_name=name
+                )
+
+            for name in groups:
+                _detail(
+                    group_policies,
+                    name,
+                    iam_conn.list_group_policies,
+                    'PolicyNames',
+                    group_name=name
+                )
+
+            for name in roles:
+                _detail(
+                    role_policies,
+                    name,
+                    iam_conn.list_role_policies,
+                    'PolicyNames',
+                    role_name=name
+                )
+
+            for index, key, future in details:
+                index[key] = future.result()
+
+        for name in user_groups:
+            user_groups[name] = sorted([
+                group['GroupName'] for group in user_groups[name]
+            ])
+
+        return cls(
+            users=users,
+            groups=groups,
+            roles=roles,
+            instance_profiles=profiles,
+            user_groups=user_groups,
+            user_policies=user_policies,
+            group_policies=group_policies,
+            role_policies=role_policies,
+            access_keys=access_keys,
+            taken_at=taken_at
+        )
+
+    def groups_for_user(self, user_name):
+        """
+        Returns the names of the groups a user is in.
+
+        :rtype: list
+        """
+        return list(self.user_groups.get(user_name, []))
+
+    def users_in_group(self, group_name):
+        """
+        Returns the names of the users in a group.
+
+        :rtype: list
+        """
+        return list(self.group_users.get(group_name, []))
+
+    def instance_profiles_for_role(self, role_name):
+        """
+        Returns the names of the instance profiles a role belongs to.
+
+        :rtype: list
+        """
+        return list(self.role_instance_profiles.get(role_name, []))
+
+    def roles_for_instance_profile(self, profile_name):
+        """
+        Returns the names of the roles in an instance profile.
+
+        :rtype: list
+        """
+        return list(self.instance_profile_roles.get(profile_name, []))
+
+    def to_dict(self):
+        """
+        Returns the snapshot's data as a dict (without the indexes, which
+        are rebuilt on load).
+
+        :rtype: dict
+        """
+        return {
+            'users': self.users,
+            'groups': self.groups,
+            'roles': self.roles,
+            'instance_profiles': self.instance_profiles,
+            'user_groups': self.user_groups,
+            'user_policies': self.user_policies,
+            'group_policies': self.group_policies,
+            'role_policies': self.role_policies,
+            'access_keys': self.access_keys,
+            'taken_at': self.taken_at,
+        }
+
+    def save(self, path):
+        """
+        Writes the snapshot to a JSON file.
+
+        :param path: Where to write it
+        :type path: string
+        """
+        with open(path, 'w') as snapshot_file:
+            # Dates may come back from botocore as ``datetime`` objects.
+            json.dump(self.to_dict(), snapshot_file, default=str)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a snapshot written by ``save``.
+
+        :param path: Where to read it from
+        :type path: string
+
+        :rtype: <boto3.iam.utils.AccountSnapshot> instance
+        """
+        with open(path, 'r') as snapshot_file:
+            data = json.load(snapshot_file)
+
+        return cls(**dict([(str(key), value) for key, value in data.items()]))
+
+
+def _parse_policy(document):
+    # IAM hands policy documents back URL-encoded.
+    if isinstance(document, six.string_types):
+        if document.lstrip().startswith('%'):
+            document = six.moves.urllib.parse.unquote(document)
+
+        document = json.loads(document)
+
+    return document
+
+
+def apply_policy(iam_conn, policy_name, policy_document, users=(), groups=(),
+                 roles=(), max_workers=8, caller=None, dry_run=False):
+    """
+    Puts an inline policy on many users, groups & roles at once, only
+    writing it where it's missing or different.
+
+    The current policy of every target is fetched concurrently & compared
+    (as parsed JSON, so formatting doesn't matter) with the new one. Only
+    the ones that differ are written, again concurrently. Throttled calls
+    are retried with backoff (see ``ThrottledCaller``).
+
+    Usage::
+
+        >>> from boto3.iam.utils import apply_policy
+        >>> results = apply_policy(
+        ...     conn,
+        ...     'read-logs',
+        ...     {'Statement': [...]},
+        ...     users=['alice', 'bob'],
+        ...     roles=['web']
+        ... )
+        >>> results[('user', 'alice')]
+        'updated'
+
+    :param iam_conn: A ``Connection`` subclass for IAM
+    :type iam_conn: A <boto3.core.connection.Connection> subclass
+
+    :param policy_name: The name of the inline policy
+    :type policy_name: string
+
+    :param policy_document: The policy, either as a dict or a JSON string
+    :type policy_document: dict or string
+
+    :param users: (Optional) The names of the users to apply it to
+    :type users: list
+
+    :param groups: (Optional) The names of the groups to apply it to
+    :type groups: list
+
+    :param roles: (Optional) The names of the roles to apply it to
+    :type roles: list
+
+    :param max_workers: (Optional) How many calls to make at once. Default
+        is ``8``.
+    :type max_workers: integer
+
+    :param caller: (Optional) A ``ThrottledCaller`` to make the calls with
+    :type caller: <boto3.iam.utils.ThrottledCaller> instance
+
+    :param dry_run: (Optional) Work out what would change without writing
+        anything. Default is ``False``.
+    :type dry_run: boolean
+
+    :returns: The outcome for each ``(kind, name)`` target: ``unchanged``,
+        ``created``, ``updated`` or the exception that stopped it
+    :rtype: OrderedDict
+    """
+    if caller is None:
+        caller = ThrottledCaller()
+
+    # ``caller`` handles the throttling.
+    iam_conn = without_retries(iam_conn)
+    desired = _parse_policy(policy_document)
+    encoded = json.dumps(desired)
+    targets = OrderedDict()
+
+    for kind, names in (('user', users), ('group', groups), ('role', roles)):
+        for name in names:
+            targets[(kind, name)] = None
+
+    def _fetch(kind, name):
+        get_name, put_name, name_param = PRINCIPAL_KINDS[kind]
+        params = {name_param: name, 'policy_name': policy_name}
+
+        try:
+            resp = caller(getattr(iam_conn, get_name), **params)
+        except ServerError as err:
+            if err.code != 'NoSuchEntity':
+                raise
+
+            return CREATED
+
+        if _parse_policy(resp.get('PolicyDocument')) == desired:
+            return UNCHANGED
+
+        return UPDATED
+
+    def _write(kind, name):
+        get_name, put_name, name_param = PRINCIPAL_KINDS[kind]
+        params = {
+            name_param: name,
+            'policy_name': policy_name,
+            'policy_document': encoded,
+        }
+        caller(getattr(iam_conn, put_name), **params)
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        fetched = [
+            (target, executor.submit(_fetch, *target))
+            for target in targets
+        ]
+        writes = []
+
+        for target, future in fetched:
+            try:
+                targets[target] = future.result()
+            except Exception as err:
+                targets[target] = err
+                continue
+
+            if targets[target] != UNCHANGED and not dry_run:
+                writes.append((target, executor.submit(_write, *target)))
+
+        for target, future in writes:
+            try:
+                future.result()
+            except Exception as err:
+                targets[target] = err
+
+    return targets
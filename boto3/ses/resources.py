@@ -0,0 +1,16 @@
+import boto3
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+IdentityCollection = boto3.session.get_collection('ses', 'IdentityCollection')
+VerifiedEmailAddressCollection = boto3.session.get_collection(
+    'ses',
+    'VerifiedEmailAddressCollection'
+)
+EmailCollection = boto3.session.get_collection('ses', 'EmailCollection')
+Identity = boto3.session.get_resource('ses', 'Identity')
+VerifiedEmailAddress = boto3.session.get_resource(
+    'ses',
+    'VerifiedEmailAddress'
+)
@@ -0,0 +1,448 @@
+import re
+import threading
+import time
+from email.charset import Charset, QP
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from concurrent import futures
+
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import RetryPolicy, THROTTLING_CODES, without_retries
+from boto3.utils import six
+from boto3.utils.ratelimit import TokenBucket
+
+
+PLACEHOLDER = re.compile(r'\$\{(\w+)\}')
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised (per message) when sending would go over the 24-hour quota.
+    """
+    pass
+
+
+class MimeTemplate(object):
+    """
+    A pre-rendered MIME message, with ``${name}`` placeholders to fill in
+    per recipient.
+
+    Building a MIME message with the ``email`` package is slow compared to
+    sending it, so for bulk mail the message is built once & each copy is
+    just the template's pieces joined back together around the values.
+
+    Values are inserted as-is, so must be 7-bit ASCII (& already encoded if
+    they go in a header, i.e. a display name).
+
+    Usage::
+
+        >>> from boto3.ses.utils import MimeTemplate
+        >>> template = MimeTemplate.from_parts(
+        ...     source='news@example.com',
+        ...     subject='Hello ${name}',
+        ...     text='Hi ${name}, ...',
+        ...     html='<p>Hi ${name}, ...</p>'
+        ... )
+        >>> template.render(to='bob@example.com', name='Bob')
+        b'Content-Type: multipart/alternative; ...'
+
+    """
+    def __init__(self, raw):
+        """
+        Creates a new ``MimeTemplate`` instance.
+
+        :param raw: The whole MIME message, including headers
+        :type raw: string
+        """
+        super(MimeTemplate, self).__init__()
+
+        if isinstance(raw, six.binary_type):
+            raw = raw.decode('ascii')
+
+        self.raw = raw
+        # Alternating literal chunks (as bytes) & placeholder names.
+        self._pieces = []
+        self.names = set()
+        position = 0
+
+        for match in PLACEHOLDER.finditer(raw):
+            self._pieces.append(raw[position:match.start()].encode('ascii'))
+            self._pieces.append(match.group(1))
+            self.names.add(match.group(1))
+            position = match.end()
+
+        self._pieces.append(raw[position:].encode('ascii'))
+
+    @classmethod
+    def from_parts(cls, source, subject, text=None, html=None, to='${to}',
+                   headers=None):
+        """
+        Builds a template from its parts.
+
+        ASCII bodies are left unencoded, so placeholders can go anywhere.
+        Others are quoted-printable encoded; placeholders still work there,
+        but keep them off of long lines.
+
+        :param source: The sender's address
+        :type source: string
+
+        :param subject: The subject line
+        :type subject: string
+
+        :param text: (Optional) The plain text body
+        :type text: string
+
+        :param html: (Optional) The HTML body
+        :type html: string
+
+        :param to: (Optional) The ``To`` header. Default is the ``${to}``
+            placeholder.
+        :type to: string
+
+        :param headers: (Optional) Any other headers
+        :type headers: dict
+
+        :rtype: <boto3.ses.utils.MimeTemplate> instance
+        """
+        parts = []
+
+        for body, subtype in ((text, 'plain'), (html, 'html')):
+            if body is None:
+                continue
+
+            try:
+                body.encode('ascii')
+                charset = 'us-ascii'
+            except UnicodeError:
+                charset = Charset('utf-8')
+                charset.body_encoding = QP
+
+            parts.append(MIMEText(body, subtype, charset))
+
+        if not parts:
+            raise ValueError("A template needs a text or HTML body.")
+
+        if len(parts) == 1:
+            msg = parts[0]
+        else:
+            msg = MIMEMultipart('alternative')
+
+            for part in parts:
+                msg.attach(part)
+
+        msg['Subject'] = subject
+        msg['From'] = source
+        msg['To'] = to
+
+        for key, value in (headers or {}).items():
+            msg[key] = value
+
+        return cls(msg.as_string())
+
+    def render(self, **values):
+        """
+        Fills in the placeholders.
+
+        :returns: The MIME message
+        :rtype: bytes
+        """
+        pieces = list(self._pieces)
+
+        for i in range(1, len(pieces), 2):
+            value = values[pieces[i]]
+
+            if not isinstance(value, six.binary_type):
+                value = six.text_type(value).encode('ascii')
+
+            pieces[i] = value
+
+        return b''.join(pieces)
+
+
+def _recipient_count(message):
+    if 'destinations' in message:
+        return max(len(message['destinations']), 1)
+
+    destination = message.get('destination', {})
+    count = 0
+
+    for key in ('ToAddresses', 'CcAddresses', 'BccAddresses'):
+        count += len(destination.get(key, []))
+
+    return max(count, 1)
+
+
+class BulkSender(object):
+    """
+    Sends lots of email through SES concurrently, paced to just under the
+    account's sending limits.
+
+    The maximum send rate & what's left of the 24-hour quota come from
+    ``GetSendQuota`` (re-read every ``refresh_interval`` seconds). Calls are
+    paced by a token bucket running at ``headroom`` times the maximum rate,
+    with each message costing one token per recipient, as SES counts them.
+    Once the quota's used up, the remaining messages fail with
+    ``QuotaExceeded`` without being sent.
+
+    Each message is a dict of either:
+
+    * ``SendEmail`` parameters (``source``, ``destination``, ``message``)
+    * ``SendRawEmail`` parameters (``destinations``, ``raw_message`` &
+      optionally ``source``)
+    * ``destinations``, a ``template`` (a ``MimeTemplate``) & the ``values``
+      to render it with
+
+    Usage::
+
+        >>> from boto3.ses.connection import SesConnection
+        >>> from boto3.ses.utils import BulkSender
+        >>> sender = BulkSender(SesConnection())
+        >>> messages = (
+        ...     {
+        ...         'destinations': [user.email],
+        ...         'template': template,
+        ...         'values': {'to': user.email, 'name': user.name},
+        ...     }
+        ...     for user in users
+        ... )
+        >>> for message, message_id, error in sender.send(messages):
+        ...     if error is not None:
+        ...         log_failure(message, error)
+
+    """
+    def __init__(self, ses_conn, max_workers=8, headroom=0.9,
+                 refresh_interval=60, max_retries=3, clock=time.time,
+                 sleep=time.sleep):
+        """
+        Creates a new ``BulkSender`` instance.
+
+        :param ses_conn: A ``Connection`` subclass for SES
+        :type ses_conn: A <boto3.core.connection.Connection> subclass
+
+        :param max_workers: (Optional) How many messages to send at once.
+            Default is ``8``.
+        :type max_workers: integer
+
+        :param headroom: (Optional) The fraction of the maximum send rate to
+            use. Default is ``0.9``.
+        :type headroom: float
+
+        :param refresh_interval: (Optional) How often to re-read the quota,
+            in seconds. Default is ``60``.
+        :type refresh_interval: integer
+
+        :param max_retries: (Optional) How many times to retry a throttled
+            message. Default is ``3``.
+        :type max_retries: integer
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(BulkSender, self).__init__()
+        self.ses_conn = ses_conn
+        # Sends are paced & retried here, so only once per attempt there.
+        self._send_conn = without_retries(ses_conn)
+        self.max_workers = max_workers
+        self.headroom = headroom
+        self.refresh_interval = refresh_interval
+        self.max_retries = max_retries
+        self.clock = clock
+        self.bucket = None
+        self.remaining = None
+        self._refreshed = None
+        self._sleep = sleep
+        # No waiting between retries: the debt run up in the bucket (by
+        # ``_backing_off``) does the backing off.
+        self.policy = RetryPolicy(
+            max_attempts=max_retries + 1,
+            base_delay=0,
+            transient_codes=(),
+            on_retry=self._backing_off,
+            random=None,
+            sleep=sleep
+        )
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.throttled = 0
+
+    def refresh_quota(self):
+        """
+        Re-reads the sending limits with ``GetSendQuota`` & adjusts the pace
+        to match.
+
+        :returns: The ``GetSendQuota`` response
+        :rtype: dict
+        """
+        quota = self.ses_conn.get_send_quota()
+        rate = float(quota['MaxSendRate']) * self.headroom
+        remaining = float(quota['Max24HourSend'])
+        remaining -= float(quota['SentLast24Hours'])
+
+        with self._lock:
+            if self.bucket is None:
+                self.bucket = TokenBucket(
+                    rate,
+                    clock=self.clock,
+                    sleep=self._sleep
+                )
+            else:
+                self.bucket.rate = rate
+
+            self.remaining = remaining
+            self._refreshed = self.clock()
+
+        return quota
+
+    def _reserve(self, cost):
+        with self._lock:
+            stale = self.clock() - self._refreshed >= self.refresh_interval
+
+        if stale:
+            self.refresh_quota()
+
+        with self._lock:
+            if cost > self.remaining:
+                raise QuotaExceeded(
+                    "Sending to {0} recipient(s) would exceed the 24-hour "
+                    "quota ({1:.0f} left).".format(cost, self.remaining)
+                )
+
+            self.remaining -= cost
+
+    def _release(self, cost):
+        with self._lock:
+            self.remaining += cost
+
+    def _backing_off(self, method_name, err, attempt, delay):
+        # Back off by a second's worth of sends before trying again.
+        self.bucket.charge(self.bucket.rate)
+
+    def _send_one(self, message):
+        cost = _recipient_count(message)
+        self._reserve(cost)
+        kwargs = dict(message)
+
+        if 'template' in kwargs:
+            template = kwargs.pop('template')
+            kwargs['raw_message'] = {
+                'Data': template.render(**kwargs.pop('values', {})),
+            }
+
+        if 'raw_message' in kwargs:
+            method_name = 'send_raw_email'
+        else:
+            method_name = 'send_email'
+
+        def _attempt():
+            self.bucket.consume(cost)
+
+            if cost > self.bucket.capacity:
+                # ``consume`` caps big requests at the bucket's capacity. Run
+                # up a debt for the rest, so later sends wait it out.
+                self.bucket.charge(cost - self.bucket.capacity)
+
+            try:
+                return getattr(self._send_conn, method_name)(**kwargs)
+            except ServerError as err:
+                if err.code in THROTTLING_CODES:
+                    with self._lock:
+                        self.throttled += 1
+
+                raise
+
+        try:
+            resp = self.policy.call(method_name, _attempt)
+        except ServerError:
+            self._release(cost)
+            raise
+
+        return resp['MessageId']
+
+    def send(self, messages):
+        """
+        Sends messages, yielding the outcome of each as it finishes (so not
+        necessarily in order).
+
+        :param messages: The messages (see above). Read lazily, so this can
+            be a generator.
+        :type messages: iterable
+
+        :returns: A generator of ``(message, message_id, error)`` tuples.
+            Exactly one of ``message_id`` & ``error`` is ``None``.
+        """
+        if self.bucket is None:
+            self.refresh_quota()
+
+        pending = {}
+        messages = iter(messages)
+        exhausted = False
+        executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_workers * 2:
+                    try:
+                        message = next(messages)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    pending[executor.submit(self._send_one, message)] = message
+
+                if not pending:
+                    return
+
+                done = futures.wait(
+                    pending,
+                    return_when=futures.FIRST_COMPLETED
+                )[0]
+
+                for future in done:
+                    message = pending.pop(future)
+
+                    try:
+                        message_id = future.result()
+                    except Exception as err:
+                        with self._lock:
+                            self.failed += 1
+
+                        yield message, None, err
+                        continue
+
+                    with self._lock:
+                        self.sent += 1
+
+                    yield message, message_id, None
+        finally:
+            for future in pending:
+                future.cancel()
+
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Returns counters for everything sent so far, plus the current pace
+        & remaining quota.
+
+        :rtype: dict
+        """
+        with self._lock:
+            rate = None
+
+            if self.bucket is not None:
+                rate = self.bucket.rate
+
+            return {
+                'sent': self.sent,
+                'failed': self.failed,
+                'throttled': self.throttled,
+                'rate': rate,
+                'remaining': self.remaining,
+            }
@@ -1,6 +1,16 @@
+import collections
 import hashlib
+import threading
+import time
 
+from concurrent import futures
+
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import RetryPolicy, THROTTLING_CODES, without_retries
 from boto3.utils import json
+from boto3.utils import OrderedDict
+from boto3.utils import six
+from boto3.utils.ratelimit import TokenBucket
 
 
 def subscribe_sqs_queue(sns_conn, sqs_conn, topic_arn, queue_url, queue_arn):
@@ -32,9 +42,6 @@ def subscribe_sqs_queue(sns_conn, sqs_conn, topic_arn, queue_url, queue_arn):
     :param queue_arn: The ARN for the queue
     :type queue_arn: string
     """
-    to_md5 = topic_arn + queue_arn
-    sid = hashlib.md5(to_md5.encode('utf-8')).hexdigest()
-    sid_exists = False
     resp = sns_conn.subscribe(
         topic_arn=topic_arn,
         protocol='sqs',
@@ -44,6 +51,22 @@ def subscribe_sqs_queue(sns_conn, sqs_conn, topic_arn, queue_url, queue_arn):
         queue_url=queue_url,
         attribute_names=['Policy']
     )
+    policy = _allow_topics(attr, queue_arn, [topic_arn])[0]
+    sqs_conn.set_queue_attributes(
+        queue_url=queue_url,
+        attributes={
+            'Policy': json.dumps(policy)
+        }
+    )
+    return resp
+
+
+def _allow_topics(attr, queue_arn, topic_arns):
+    # Adds a statement allowing ``SendMessage`` from each topic to a queue's
+    # existing policy (if any). The ``Sid`` is derived from the topic/queue,
+    # so topics already allowed aren't added again. Returns the policy &
+    # whether anything was added.
+    changed = False
     policy = {}
 
     if 'Policy' in attr:
@@ -51,13 +74,15 @@ def subscribe_sqs_queue(sns_conn, sqs_conn, topic_arn, queue_url, queue_arn):
 
     policy.setdefault('Version', '2008-10-17')
     policy.setdefault('Statement', [])
+    existing = set([s.get('Sid') for s in policy['Statement']])
+
+    for topic_arn in topic_arns:
+        to_md5 = topic_arn + queue_arn
+        sid = hashlib.md5(to_md5.encode('utf-8')).hexdigest()
 
-    # See if a Statement with the Sid exists already.
-    for s in policy['Statement']:
-        if s['Sid'] == sid:
-            sid_exists = True
+        if sid in existing:
+            continue
 
-    if not sid_exists:
         statement = {
             'Action': 'SQS:SendMessage',
             'Effect': 'Allow',
@@ -73,11 +98,675 @@ def subscribe_sqs_queue(sns_conn, sqs_conn, topic_arn, queue_url, queue_arn):
             },
         }
         policy['Statement'].append(statement)
+        existing.add(sid)
+        changed = True
 
-    sqs_conn.set_queue_attributes(
-        queue_url=queue_url,
-        attributes={
-            'Policy': json.dumps(policy)
-        }
-    )
-    return resp
+    return policy, changed
+
+
+def subscribe_sqs_queues(sns_conn, sqs_conn, subscriptions, max_workers=8):
+    """
+    Hooks up many SNS topics to SQS queues at once.
+
+    Like ``subscribe_sqs_queue``, but each queue's policy is read & written
+    exactly once, with the statements for all of its topics merged in
+    (rather than once per topic, which races with itself when done in
+    parallel). The policy updates & then the subscriptions run concurrently.
+
+    Usage::
+
+        >>> from boto3.sns.utils import subscribe_sqs_queues
+        >>> subscribe_sqs_queues(sns_conn, sqs_conn, [
+        ...     (topic_arn, queue_url, queue_arn)
+        ...     for topic_arn in topic_arns
+        ... ])
+
+    :param sns_conn: A ``Connection`` subclass for SNS
+    :type sns_conn: A <boto3.core.connection.Connection> subclass
+
+    :param sqs_conn: A ``Connection`` subclass for SQS
+    :type sqs_conn: A <boto3.core.connection.Connection> subclass
+
+    :param subscriptions: The ``(topic_arn, queue_url, queue_arn)`` tuples to
+        hook up
+    :type subscriptions: iterable
+
+    :param max_workers: (Optional) How many calls to make at once. Default is
+        ``8``.
+    :type max_workers: integer
+
+    :returns: The ``Subscribe`` response for each ``(topic_arn, queue_arn)``
+    :rtype: dict
+    """
+    queues = OrderedDict()
+    pairs = []
+
+    for topic_arn, queue_url, queue_arn in subscriptions:
+        topics = queues.setdefault((queue_url, queue_arn), [])
+
+        if topic_arn not in topics:
+            topics.append(topic_arn)
+            pairs.append((topic_arn, queue_arn))
+
+    def _update_policy(queue_url, queue_arn, topic_arns):
+        attr = sqs_conn.get_queue_attributes(
+            queue_url=queue_url,
+            attribute_names=['Policy']
+        )
+        policy, changed = _allow_topics(attr, queue_arn, topic_arns)
+
+        if not changed:
+            return
+
+        sqs_conn.set_queue_attributes(
+            queue_url=queue_url,
+            attributes={
+                'Policy': json.dumps(policy)
+            }
+        )
+
+    def _subscribe(topic_arn, queue_arn):
+        return sns_conn.subscribe(
+            topic_arn=topic_arn,
+            protocol='sqs',
+            notification_endpoint=queue_arn
+        )
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # The policies go first, so nothing SNS delivers is turned away.
+        updates = [
+            executor.submit(_update_policy, queue_url, queue_arn, topic_arns)
+            for (queue_url, queue_arn), topic_arns in queues.items()
+        ]
+
+        for future in updates:
+            future.result()
+
+        subscribed = [
+            executor.submit(_subscribe, topic_arn, queue_arn)
+            for topic_arn, queue_arn in pairs
+        ]
+        return dict([
+            (pair, future.result())
+            for pair, future in zip(pairs, subscribed)
+        ])
+
+
+class TopicPublisher(object):
+    """
+    Publishes messages to any number of SNS topics on a bounded thread pool.
+
+    ``publish`` hands back a ``Future`` straight away, which resolves to the
+    new message's ID. When more than ``max_pending`` messages are waiting,
+    ``publish`` blocks until there's room, so a fast producer can't queue up
+    unbounded memory.
+
+    With ``ordered=True``, messages to the same topic are sent one at a
+    time, in the order they were published (different topics still go out
+    in parallel).
+
+    Usage::
+
+        >>> from boto3.sns.resources import Topic
+        >>> from boto3.sns.utils import TopicPublisher
+        >>> alerts = Topic(topic_arn='arn:aws:sns:us-east-1:...:alerts')
+        >>> with TopicPublisher(max_workers=16) as publisher:
+        ...     future = publisher.publish(alerts, 'Disk full', subject='db1')
+        >>> future.result()
+        '6a1ec9d1-4a5b-5c2c-8e4f-8b2c4c5e2d6a'
+        >>> publisher.stats()['published']
+        1
+
+    """
+    def __init__(self, max_workers=8, ordered=False, max_pending=None,
+                 executor=None, clock=time.time):
+        """
+        Creates a new ``TopicPublisher`` instance.
+
+        :param max_workers: (Optional) How many messages to publish at once.
+            Default is ``8``.
+        :type max_workers: integer
+
+        :param ordered: (Optional) Whether messages to the same topic must be
+            sent in order. Default is ``False``.
+        :type ordered: boolean
+
+        :param max_pending: (Optional) How many unfinished messages to allow
+            before ``publish`` blocks. Default is ``max_workers * 100``.
+        :type max_pending: integer
+
+        :param executor: (Optional) An existing thread pool to publish on
+        :type executor: <concurrent.futures.Executor> instance
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+        """
+        super(TopicPublisher, self).__init__()
+        self.max_workers = max_workers
+        self.ordered = ordered
+        self.max_pending = max_pending or max_workers * 100
+        self.clock = clock
+        self.executor = executor
+        self._own_executor = executor is None
+
+        if self._own_executor:
+            self.executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+
+        self._lock = threading.Lock()
+        self._room = threading.Semaphore(self.max_pending)
+        self._idle = threading.Condition(self._lock)
+        # Per-topic queues of messages waiting their turn (``ordered`` only).
+        self._lanes = {}
+        self._started = None
+        self.submitted = 0
+        self.published = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def _lane_key(self, topic):
+        topic_arn = getattr(topic, 'topic_arn', None)
+
+        if topic_arn is None:
+            return id(topic)
+
+        return topic_arn
+
+    def publish(self, topic, message, subject=None, **kwargs):
+        """
+        Queues up a message to publish to a topic.
+
+        :param topic: The topic to publish to
+        :type topic: A <boto3.sns.resources.Topic> instance
+
+        :param message: The message
+        :type message: string
+
+        :param subject: (Optional) The subject (for email endpoints)
+        :type subject: string
+
+        :param **kwargs: (Optional) Any other parameters ``Topic.publish``
+            accepts (i.e. ``message_structure``)
+
+        :returns: A future resolving to the ``MessageId``
+        :rtype: <concurrent.futures.Future> instance
+        """
+        if subject is not None:
+            kwargs['subject'] = subject
+
+        kwargs['message'] = message
+        future = futures.Future()
+        self._room.acquire()
+
+        with self._lock:
+            if self._started is None:
+                self._started = self.clock()
+
+            self.submitted += 1
+            job = (topic, kwargs, future)
+
+            if self.ordered:
+                key = self._lane_key(topic)
+                lane = self._lanes.get(key)
+
+                if lane is not None:
+                    # Something's already in flight for this topic. Wait our
+                    # turn.
+                    lane.append(job)
+                    return future
+
+                self._lanes[key] = collections.deque()
+
+        self.executor.submit(self._send, job)
+        return future
+
+    def _send(self, job):
+        topic, kwargs, future = job
+
+        if future.set_running_or_notify_cancel():
+            try:
+                resp = topic.publish(**kwargs)
+            except Exception as err:
+                future.set_exception(err)
+                self._finished(job, failed=True)
+            else:
+                if isinstance(resp, dict):
+                    resp = resp.get('MessageId', resp)
+
+                future.set_result(resp)
+                self._finished(job)
+        else:
+            self._finished(job, cancelled=True)
+
+    def _finished(self, job, failed=False, cancelled=False):
+        next_job = None
+
+        with self._lock:
+            if failed:
+                self.failed += 1
+            elif cancelled:
+                self.cancelled += 1
+            else:
+                self.published += 1
+
+            if self.ordered:
+                key = self._lane_key(job[0])
+                lane = self._lanes[key]
+
+                if lane:
+                    next_job = lane.popleft()
+                else:
+                    del self._lanes[key]
+
+            self._idle.notify_all()
+
+        self._room.release()
+
+        if next_job is not None:
+            self.executor.submit(self._send, next_job)
+
+    def _unfinished(self):
+        # Call with the lock held.
+        finished = self.published + self.failed + self.cancelled
+        return self.submitted - finished
+
+    @property
+    def pending(self):
+        """
+        How many messages have been queued up but not yet sent (or failed,
+        or been cancelled).
+
+        :rtype: integer
+        """
+        with self._lock:
+            return self._unfinished()
+
+    def stats(self):
+        """
+        Returns counters for everything published so far.
+
+        Includes ``submitted``, ``published``, ``failed``, ``cancelled`` &
+        ``pending`` counts, plus ``throughput`` (messages per second since
+        the first ``publish``) & ``error_rate`` (failures per finished
+        message).
+
+        :rtype: dict
+        """
+        with self._lock:
+            finished = self.published + self.failed
+            elapsed = 0
+
+            if self._started is not None:
+                elapsed = self.clock() - self._started
+
+            throughput = 0.0
+            error_rate = 0.0
+
+            if elapsed > 0:
+                throughput = self.published / float(elapsed)
+
+            if finished:
+                error_rate = self.failed / float(finished)
+
+            return {
+                'submitted': self.submitted,
+                'published': self.published,
+                'failed': self.failed,
+                'cancelled': self.cancelled,
+                'pending': self._unfinished(),
+                'throughput': throughput,
+                'error_rate': error_rate,
+            }
+
+    def flush(self, timeout=None):
+        """
+        Waits for every queued message to be sent (or fail, or be
+        cancelled).
+
+        :param timeout: (Optional) How long to wait, in seconds. Default is
+            forever.
+        :type timeout: float
+
+        :returns: Whether everything finished in time
+        :rtype: boolean
+        """
+        deadline = None
+
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        with self._idle:
+            while self._unfinished():
+                remaining = None
+
+                if deadline is not None:
+                    remaining = deadline - time.time()
+
+                    if remaining <= 0:
+                        return False
+
+                self._idle.wait(remaining)
+
+        return True
+
+    def shutdown(self, wait=True):
+        """
+        Waits for the queued messages (if ``wait``) & shuts down the thread
+        pool (if the publisher created it).
+
+        :param wait: (Optional) Whether to wait for queued messages. Default
+            is ``True``.
+        :type wait: boolean
+        """
+        if wait:
+            self.flush()
+
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+
+def iter_platform_endpoints(sns_conn, platform_application_arn):
+    """
+    Pages through every endpoint of a platform application.
+
+    :param sns_conn: A ``Connection`` subclass for SNS
+    :type sns_conn: A <boto3.core.connection.Connection> subclass
+
+    :param platform_application_arn: The ARN of the platform application
+    :type platform_application_arn: string
+
+    :returns: A generator of ``{'EndpointArn': ..., 'Attributes': {...}}``
+        dicts
+    """
+    kwargs = {}
+
+    while True:
+        resp = sns_conn.list_endpoints_by_platform_application(
+            platform_application_arn=platform_application_arn,
+            **kwargs
+        )
+
+        for endpoint in resp.get('Endpoints', []):
+            yield endpoint
+
+        next_token = resp.get('NextToken')
+
+        if not next_token:
+            return
+
+        kwargs['next_token'] = next_token
+
+
+def endpoints_by_token(sns_conn, platform_application_arn):
+    """
+    Maps the device token of each existing endpoint of a platform
+    application to its ARN, for reconciling against a list of devices.
+
+    Can be passed as ``known`` to ``EndpointRegistrar.register``.
+
+    :param sns_conn: A ``Connection`` subclass for SNS
+    :type sns_conn: A <boto3.core.connection.Connection> subclass
+
+    :param platform_application_arn: The ARN of the platform application
+    :type platform_application_arn: string
+
+    :rtype: dict
+    """
+    known = {}
+    endpoints = iter_platform_endpoints(sns_conn, platform_application_arn)
+
+    for endpoint in endpoints:
+        token = endpoint.get('Attributes', {}).get('Token')
+
+        if token is not None:
+            known[token] = endpoint['EndpointArn']
+
+    return known
+
+
+class EndpointRegistrar(object):
+    """
+    Registers device tokens with a platform application in bulk, several at
+    a time.
+
+    Tokens are deduplicated (only a 16-byte digest of each is kept, so
+    millions are fine) & the calls are paced by a token bucket that adapts
+    to SNS: each throttling error halves the rate (& the call is retried),
+    while successes nudge it back up.
+
+    Usage::
+
+        >>> from boto3.sns.utils import EndpointRegistrar, endpoints_by_token
+        >>> known = endpoints_by_token(sns_conn, app_arn)
+        >>> registrar = EndpointRegistrar(sns_conn, app_arn, max_workers=16)
+        >>> for token, endpoint_arn in registrar.register(tokens, known):
+        ...     save(token, endpoint_arn)
+        >>> registrar.failed
+        {}
+
+    """
+    def __init__(self, sns_conn, platform_application_arn, max_workers=8,
+                 rate=50, min_rate=1, max_rate=None, max_retries=5,
+                 attributes=None, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``EndpointRegistrar`` instance.
+
+        :param sns_conn: A ``Connection`` subclass for SNS
+        :type sns_conn: A <boto3.core.connection.Connection> subclass
+
+        :param platform_application_arn: The ARN of the platform application
+        :type platform_application_arn: string
+
+        :param max_workers: (Optional) How many calls to make at once.
+            Default is ``8``.
+        :type max_workers: integer
+
+        :param rate: (Optional) The starting number of calls per second.
+            Default is ``50``.
+        :type rate: float
+
+        :param min_rate: (Optional) The rate is never cut below this. Default
+            is ``1``.
+        :type min_rate: float
+
+        :param max_rate: (Optional) The rate is never raised above this.
+            Default is no limit.
+        :type max_rate: float
+
+        :param max_retries: (Optional) How many times to retry a throttled
+            call before giving up on that token. Default is ``5``.
+        :type max_retries: integer
+
+        :param attributes: (Optional) Attributes to set on every new endpoint
+        :type attributes: dict
+
+        :param clock: (Optional) Returns the current time in seconds. Default
+            is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) Sleeps for a number of seconds. Default is
+            ``time.sleep``.
+        :type sleep: callable
+        """
+        super(EndpointRegistrar, self).__init__()
+        # The registrar paces itself & retries throttled calls.
+        self.sns_conn = without_retries(sns_conn)
+        self.platform_application_arn = platform_application_arn
+        self.max_workers = max_workers
+        self.min_rate = float(min_rate)
+        self.max_rate = max_rate
+        self.max_retries = max_retries
+        self.attributes = attributes
+        self.bucket = TokenBucket(rate, clock=clock, sleep=sleep)
+        # No waiting between retries: the slowed bucket does the backing off.
+        self.policy = RetryPolicy(
+            max_attempts=max_retries + 1,
+            base_delay=0,
+            transient_codes=(),
+            random=None,
+            sleep=sleep
+        )
+        self._lock = threading.Lock()
+        self.created = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.throttled = 0
+        # Tokens that couldn't be registered, with the error.
+        self.failed = {}
+
+    def _succeeded(self):
+        with self._lock:
+            self.created += 1
+            # Additive increase: about one more call per second, per second.
+            rate = self.bucket.rate + 1.0 / self.bucket.rate
+
+            if self.max_rate is not None:
+                rate = min(rate, self.max_rate)
+
+            self.bucket.rate = rate
+
+    def _throttled(self):
+        with self._lock:
+            self.throttled += 1
+            # Multiplicative decrease.
+            self.bucket.rate = max(self.bucket.rate / 2.0, self.min_rate)
+
+    def _create(self, token, custom_user_data):
+        kwargs = {}
+
+        if custom_user_data is not None:
+            kwargs['custom_user_data'] = custom_user_data
+
+        if self.attributes:
+            kwargs['attributes'] = self.attributes
+
+        def _attempt():
+            self.bucket.consume()
+
+            try:
+                return self.sns_conn.create_platform_endpoint(
+                    platform_application_arn=self.platform_application_arn,
+                    token=token,
+                    **kwargs
+                )
+            except ServerError as err:
+                if err.code in THROTTLING_CODES:
+                    self._throttled()
+
+                raise
+
+        resp = self.policy.call('create_platform_endpoint', _attempt)
+        self._succeeded()
+        return resp['EndpointArn']
+
+    def register(self, tokens, known=None):
+        """
+        Registers device tokens, yielding each one's endpoint ARN as it's
+        created (so not necessarily in order).
+
+        Tokens that fail are left out & recorded (with the error) in
+        ``failed``.
+
+        :param tokens: The device tokens. Each is either a token or a
+            ``(token, custom_user_data)`` tuple. Read lazily, so this can be
+            a generator.
+        :type tokens: iterable
+
+        :param known: (Optional) Tokens already registered, mapped to their
+            endpoint ARN (i.e. from ``endpoints_by_token``). These are
+            yielded without calling SNS.
+        :type known: dict
+
+        :returns: A generator of ``(token, endpoint_arn)`` tuples
+        """
+        seen = set()
+        pending = {}
+        tokens = iter(tokens)
+        exhausted = False
+        executor = futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            while True:
+                while not exhausted and len(pending) < self.max_workers * 2:
+                    try:
+                        entry = next(tokens)
+                    except StopIteration:
+                        exhausted = True
+                        break
+
+                    custom_user_data = None
+
+                    if isinstance(entry, (list, tuple)):
+                        entry, custom_user_data = entry
+
+                    digest = entry
+
+                    if isinstance(digest, six.text_type):
+                        digest = digest.encode('utf-8')
+
+                    digest = hashlib.md5(digest).digest()
+
+                    if digest in seen:
+                        self.duplicates += 1
+                        continue
+
+                    seen.add(digest)
+
+                    if known and entry in known:
+                        self.skipped += 1
+                        yield entry, known[entry]
+                        continue
+
+                    future = executor.submit(
+                        self._create,
+                        entry,
+                        custom_user_data
+                    )
+                    pending[future] = entry
+
+                if not pending:
+                    return
+
+                done = futures.wait(
+                    pending,
+                    return_when=futures.FIRST_COMPLETED
+                )[0]
+
+                for future in done:
+                    token = pending.pop(future)
+
+                    try:
+                        endpoint_arn = future.result()
+                    except Exception as err:
+                        self.failed[token] = err
+                        continue
+
+                    yield token, endpoint_arn
+        finally:
+            for future in pending:
+                future.cancel()
+
+            executor.shutdown(wait=True)
+
+    def stats(self):
+        """
+        Returns counters for the registrations so far, plus the current
+        ``rate``.
+
+        :rtype: dict
+        """
+        with self._lock:
+            return {
+                'created': self.created,
+                'skipped': self.skipped,
+                'duplicates': self.duplicates,
+                'throttled': self.throttled,
+                'failed': len(self.failed),
+                'rate': self.bucket.rate,
+            }
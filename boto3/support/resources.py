@@ -0,0 +1,12 @@
+import boto3
+
+
+# FIXME: These should be just sane defaults, but they are configured at
+#        import-time. :/
+CaseCollection = boto3.session.get_collection('support', 'CaseCollection')
+CommunicationCollection = boto3.session.get_collection(
+    'support',
+    'CommunicationCollection'
+)
+Case = boto3.session.get_resource('support', 'Case')
+Communication = boto3.session.get_resource('support', 'Communication')
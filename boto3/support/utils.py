@@ -0,0 +1,244 @@
+import calendar
+import time
+
+from concurrent import futures
+
+from boto3.core.exceptions import ServerError
+from boto3.utils import OrderedDict
+
+
+# Refresh statuses that won't change again.
+REFRESH_DONE = ('success', 'abandoned')
+# How many checks to ask about per refresh status call.
+STATUS_BATCH_SIZE = 25
+
+
+def _parse_timestamp(timestamp):
+    # i.e. ``2013-11-04T08:22:12Z``, sometimes with fractional seconds.
+    if not timestamp:
+        return None
+
+    return calendar.timegm(time.strptime(timestamp[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+def _summarize(checks):
+    by_status = {}
+    by_category = {}
+    savings = 0.0
+
+    for check in checks.values():
+        result = check.get('result') or {}
+        status = result.get('status', 'unknown')
+        by_status[status] = by_status.get(status, 0) + 1
+        category = by_category.setdefault(check.get('category'), {})
+        category[status] = category.get(status, 0) + 1
+        cost = result.get('categorySpecificSummary', {}).get(
+            'costOptimizing',
+            {}
+        )
+        savings += cost.get('estimatedMonthlySavings', 0.0)
+
+    return {
+        'by_status': by_status,
+        'by_category': by_category,
+        'estimated_monthly_savings': savings,
+    }
+
+
+def trusted_advisor_report(conn, refresh=False, max_age=None, categories=None,
+                           language='en', max_workers=8, interval=5,
+                           timeout=300, clock=time.time, sleep=time.sleep):
+    """
+    Collects the results of every Trusted Advisor check into one report.
+
+    The checks are listed once, then all their results are fetched
+    concurrently (rather than one ``trusted_advisor_check_result`` call
+    after another).
+
+    With ``refresh``, checks whose results are older than ``max_age`` are
+    refreshed first. Their progress is polled for in batches (one
+    ``DescribeTrustedAdvisorCheckRefreshStatuses`` call per batch of checks)
+    every ``interval`` seconds, & the results of those that finish are
+    fetched again.
+
+    Usage::
+
+        >>> from boto3.support.connection import SupportConnection
+        >>> from boto3.support.utils import trusted_advisor_report
+        >>> report = trusted_advisor_report(
+        ...     SupportConnection(region_name='us-east-1'),
+        ...     refresh=True,
+        ...     max_age=24 * 60 * 60
+        ... )
+        >>> report['summary']['by_status']
+        {'ok': 31, 'warning': 8, 'error': 2, 'not_available': 4}
+
+    :param conn: A ``Connection`` subclass for Support
+    :type conn: A <boto3.core.connection.Connection> subclass
+
+    :param refresh: (Optional) Whether to refresh stale checks first.
+        Default is ``False``.
+    :type refresh: boolean
+
+    :param max_age: (Optional) How old a result can be (in seconds) before
+        it's refreshed. Default is to refresh them all.
+    :type max_age: float
+
+    :param categories: (Optional) Only these categories of check (i.e.
+        ``cost_optimizing``, ``security``). Default is every check.
+    :type categories: list
+
+    :param language: (Optional) The language to describe the checks in.
+        Default is ``en``.
+    :type language: string
+
+    :param max_workers: (Optional) How many calls to make at once. Default
+        is ``8``.
+    :type max_workers: integer
+
+    :param interval: (Optional) How long to wait between refresh status
+        polls, in seconds. Default is ``5``.
+    :type interval: float
+
+    :param timeout: (Optional) The longest to wait for refreshes, in
+        seconds. Checks still refreshing after that keep their old results.
+        Default is ``300``.
+    :type timeout: float
+
+    :param clock: (Optional) Returns the current time in seconds. Default
+        is ``time.time``.
+    :type clock: callable
+
+    :param sleep: (Optional) Sleeps for a number of seconds. Default is
+        ``time.sleep``.
+    :type sleep: callable
+
+    :returns: The report, with the ``checks`` (each check's description,
+        plus its ``result`` & whether it was ``refreshed``, by ID), a
+        ``summary`` (counts by status & category, plus the estimated monthly
+        savings) & any ``errors`` (by check ID)
+    :rtype: dict
+    """
+    checks = OrderedDict()
+    errors = {}
+
+    for check in conn.describe_trusted_advisor_checks(
+        language=language
+    ).get('checks', []):
+        if categories is None or check.get('category') in categories:
+            check = dict(check)
+            check['result'] = None
+            check['refreshed'] = False
+            checks[check['id']] = check
+
+    def _result(check_id):
+        return conn.describe_trusted_advisor_check_result(
+            check_id=check_id,
+            language=language
+        ).get('result')
+
+    def _fetch_results(executor, check_ids):
+        fetching = [
+            (check_id, executor.submit(_result, check_id))
+            for check_id in check_ids
+        ]
+
+        for check_id, future in fetching:
+            try:
+                checks[check_id]['result'] = future.result()
+                errors.pop(check_id, None)
+            except ServerError as err:
+                errors[check_id] = err
+
+    with futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        _fetch_results(executor, list(checks))
+
+        if refresh:
+            now = clock()
+            stale = []
+
+            for check_id, check in checks.items():
+                fetched_at = _parse_timestamp(
+                    (check['result'] or {}).get('timestamp')
+                )
+
+                if max_age is None or fetched_at is None or \
+                   now - fetched_at > max_age:
+                    stale.append(check_id)
+
+            refreshing = [
+                (check_id, executor.submit(
+                    conn.refresh_trusted_advisor_check,
+                    check_id=check_id
+                ))
+                for check_id in stale
+            ]
+            pending = []
+
+            for check_id, future in refreshing:
+                try:
+                    future.result()
+                except ServerError as err:
+                    # Some checks refresh themselves & can't be asked to.
+                    errors[check_id] = err
+                    continue
+
+                pending.append(check_id)
+
+            deadline = clock() + timeout
+            refreshed = []
+
+            while pending:
+                batches = [
+                    pending[start:start + STATUS_BATCH_SIZE]
+                    for start in range(0, len(pending), STATUS_BATCH_SIZE)
+                ]
+                polls = [
+                    (batch, executor.submit(
+                        conn.describe_trusted_advisor_check_refresh_statuses,
+                        check_ids=batch
+                    ))
+                    for batch in batches
+                ]
+                done = set()
+
+                for batch, future in polls:
+                    try:
+                        statuses = future.result().get('statuses', [])
+                    except ServerError as err:
+                        # Give up on this batch, but keep the other
+                        # batches' results.
+                        for check_id in batch:
+                            errors[check_id] = err
+                            done.add(check_id)
+
+                        continue
+
+                    for status in statuses:
+                        if status.get('status') not in REFRESH_DONE:
+                            continue
+
+                        done.add(status['checkId'])
+
+                        if status['status'] == 'success':
+                            refreshed.append(status['checkId'])
+
+                pending = [
+                    check_id for check_id in pending if check_id not in done
+                ]
+
+                if not pending or clock() + interval > deadline:
+                    break
+
+                sleep(interval)
+
+            for check_id in refreshed:
+                checks[check_id]['refreshed'] = True
+
+            _fetch_results(executor, refreshed)
+
+    return {
+        'checks': checks,
+        'summary': _summarize(checks),
+        'errors': errors,
+    }
@@ -0,0 +1,189 @@
+import threading
+import time
+
+
+# Float rounding can leave a refilled bucket a hair short of the tokens
+# asked for. Treat anything within this margin as enough.
+EPSILON = 1e-9
+# Never sleep for less than this. Shorter waits can round away to nothing
+# against a large clock value, which would spin forever.
+MIN_WAIT = 1e-6
+
+
+class TokenBucket(object):
+    """
+    A thread-safe token bucket, for pacing calls against a rate limit.
+
+    Tokens accrue at ``rate`` per second, up to ``capacity``. Callers either
+    block until enough tokens are available (``consume``) or deduct a cost
+    after the fact (``charge``), which may leave the bucket in debt. While in
+    debt, further ``consume`` calls wait until the debt has been repaid.
+
+    Usage::
+
+        >>> bucket = TokenBucket(rate=25)
+        # Wait for a token before making the call.
+        >>> bucket.consume(1)
+        # The call actually cost 4 units. Account for the difference.
+        >>> bucket.charge(3)
+
+    """
+    def __init__(self, rate, capacity=None, clock=time.time, sleep=time.sleep):
+        """
+        Creates a new ``TokenBucket`` instance.
+
+        :param rate: The number of tokens added to the bucket per second.
+        :type rate: float
+
+        :param capacity: (Optional) The most tokens the bucket can hold. By
+            default, this is one second's worth of tokens (``rate``).
+        :type capacity: float
+
+        :param clock: (Optional) A callable returning the current time in
+            seconds. By default, this is ``time.time``.
+        :type clock: callable
+
+        :param sleep: (Optional) A callable that sleeps for a given number of
+            seconds. By default, this is ``time.sleep``.
+        :type sleep: callable
+        """
+        super(TokenBucket, self).__init__()
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self._rate = float(rate)
+        self._capacity = capacity
+        self._tokens = self.capacity
+        self._last_refill = self._clock()
+
+    def __str__(self):
+        return 'TokenBucket: {0:.2f}/{1:.2f} @ {2:.2f}/s'.format(
+            self.tokens,
+            self.capacity,
+            self.rate
+        )
+
+    @property
+    def rate(self):
+        """
+        Returns the number of tokens added per second.
+
+        :rtype: float
+        """
+        return self._rate
+
+    @rate.setter
+    def rate(self, value):
+        with self._lock:
+            # Settle up at the old rate before switching to the new one.
+            self._refill()
+            self._rate = float(value)
+
+    @property
+    def capacity(self):
+        """
+        Returns the most tokens the bucket can hold.
+
+        :rtype: float
+        """
+        if self._capacity is None:
+            return self._rate
+
+        return float(self._capacity)
+
+    @capacity.setter
+    def capacity(self, value):
+        with self._lock:
+            self._refill()
+            self._capacity = value
+            self._tokens = min(self._tokens, self.capacity)
+
+    @property
+    def tokens(self):
+        """
+        Returns the number of tokens currently available. Negative if the
+        bucket is in debt.
+
+        :rtype: float
+        """
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self):
+        # Must be called with the lock held.
+        now = self._clock()
+        elapsed = max(now - self._last_refill, 0)
+        self._last_refill = now
+        self._tokens = min(self._tokens + elapsed * self._rate, self.capacity)
+
+    def try_consume(self, amount=1):
+        """
+        Deducts ``amount`` tokens if they're available, without blocking.
+
+        :param amount: (Optional) The number of tokens to take. Default is
+            ``1``.
+        :type amount: float
+
+        :returns: ``True`` if the tokens were taken, otherwise ``False``
+        :rtype: boolean
+        """
+        return self._wait_time(amount) == 0
+
+    def consume(self, amount=1):
+        """
+        Deducts ``amount`` tokens, blocking until they're available.
+
+        Requests for more than ``capacity`` tokens are capped at ``capacity``,
+        so that a single large request can't wait forever.
+
+        :param amount: (Optional) The number of tokens to take. Default is
+            ``1``.
+        :type amount: float
+
+        :returns: The number of seconds spent waiting
+        :rtype: float
+        """
+        waited = 0.0
+
+        while True:
+            wait = self._wait_time(amount)
+
+            if wait == 0:
+                return waited
+
+            self._sleep(wait)
+            waited += wait
+
+    def charge(self, amount):
+        """
+        Deducts ``amount`` tokens immediately, even if that leaves the bucket
+        in debt. A negative ``amount`` refunds tokens.
+
+        Useful when the true cost of a call is only known once the response
+        has been received.
+
+        :param amount: The number of tokens to deduct.
+        :type amount: float
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens - amount, self.capacity)
+
+    def _wait_time(self, amount):
+        # Either takes the tokens (returning ``0``) or returns how long until
+        # enough should be available.
+        with self._lock:
+            self._refill()
+            amount = min(amount, self.capacity)
+
+            if self._tokens + EPSILON >= amount:
+                self._tokens -= amount
+                return 0
+
+            if self._rate <= 0:
+                # Nothing will ever refill the bucket. Poll slowly rather than
+                # dividing by zero.
+                return 1.0
+
+            return max((amount - self._tokens) / self._rate, MIN_WAIT)
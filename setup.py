@@ -38,8 +38,18 @@ def find_version(*file_paths):
 
 packages = [
     'boto3',
+    'boto3.cloudsearch',
     'boto3.core',
+    'boto3.dynamodb',
+    'boto3.elasticache',
+    'boto3.elastictranscoder',
+    'boto3.glacier',
+    'boto3.iam',
+    'boto3.s3',
+    'boto3.ses',
+    'boto3.sns',
     'boto3.sqs',
+    'boto3.support',
     'boto3.utils',
 ]
 
@@ -51,6 +61,10 @@ requires = [
     'bcdoc==0.12.2'
 ]
 
+if sys.version_info[0] == 2:
+    # ``concurrent.futures`` is only in the standard library on Python 3.
+    requires.append('futures>=2.1.5')
+
 dependency_links = [
     'git+https://github.com/boto/bcdoc.git@develop#egg=bcdoc'
 ]
@@ -0,0 +1,114 @@
+import threading
+
+from boto3.cloudsearch.connection import CloudsearchConnection
+from boto3.cloudsearch.resources import Domain, DomainCollection
+from boto3.cloudsearch.utils import DomainConfig
+
+from tests import unittest
+
+
+class FakeCloudSearch(object):
+    """
+    Stands in for the service behind a real ``CloudsearchConnection``.
+    """
+    def __init__(self, conn, domain_names):
+        self.domain_names = domain_names
+        self.calls = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.release = threading.Event()
+        responses = {
+            'describe_index_fields': 'IndexFields',
+            'describe_rank_expressions': 'RankExpressions',
+            'describe_service_access_policies': 'AccessPolicies',
+            'describe_stemming_options': 'Stems',
+            'describe_stopword_options': 'Stopwords',
+            'describe_synonym_options': 'Synonyms',
+            'describe_default_search_field': 'DefaultSearchField',
+        }
+
+        for name, result_key in responses.items():
+            setattr(conn, name, self._describer(name, result_key))
+
+        conn.describe_domains = self.describe_domains
+
+    def describe_domains(self, **kwargs):
+        return {
+            'DomainStatusList': [
+                {'DomainName': name} for name in self.domain_names
+            ],
+        }
+
+    def _describer(self, name, result_key):
+        def _describe(domain_name, **kwargs):
+            with self.lock:
+                self.calls.append((name, domain_name))
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+            # Hold each call open a moment, so overlapping calls show up.
+            self.release.wait(0.01)
+
+            with self.lock:
+                self.in_flight -= 1
+
+            return {result_key: {'Options': '{0}:{1}'.format(
+                domain_name,
+                result_key
+            )}}
+
+        return _describe
+
+
+class DomainSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        super(DomainSnapshotTestCase, self).setUp()
+        self.conn = CloudsearchConnection()
+        self.service = FakeCloudSearch(self.conn, ['books', 'films'])
+
+    def test_domain(self):
+        domain = Domain(connection=self.conn, id='books')
+        config = domain.snapshot()
+
+        self.assertEqual(config.domain_name, 'books')
+        self.assertEqual(config.index_fields, {'Options': 'books:IndexFields'})
+        self.assertEqual(
+            config.default_search_field,
+            {'Options': 'books:DefaultSearchField'}
+        )
+        self.assertEqual(len(self.service.calls), 7)
+        self.assertTrue(self.service.max_in_flight > 1)
+
+    def test_domain_serial(self):
+        config = Domain(connection=self.conn, id='books').snapshot(
+            max_workers=1
+        )
+
+        self.assertEqual(config.domain_name, 'books')
+        self.assertEqual(len(self.service.calls), 7)
+        self.assertEqual(self.service.max_in_flight, 1)
+
+    def test_collection(self):
+        domains = DomainCollection(connection=self.conn)
+        snapshots = domains.snapshot(max_workers=14)
+
+        self.assertEqual(list(snapshots.keys()), ['books', 'films'])
+        self.assertEqual(
+            snapshots['films'].synonym_options,
+            {'Options': 'films:Synonyms'}
+        )
+        self.assertEqual(len(self.service.calls), 14)
+
+        only = domains.snapshot(domain_names=['films'])
+        self.assertEqual(list(only.keys()), ['films'])
+
+    def test_round_trip(self):
+        config = Domain(connection=self.conn, id='books').snapshot()
+        copy = DomainConfig.from_json(config.to_json())
+        self.assertEqual(copy, config)
+        self.assertEqual(copy.taken_at, config.taken_at)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+import threading
+
+from boto3.cloudsearch.utils import BatchBuilder, BatchError, DocumentTooLarge
+from boto3.cloudsearch.utils import DocumentUploader
+from boto3.utils import json
+
+from tests import unittest
+
+
+class BatchBuilderTestCase(unittest.TestCase):
+    def test_cuts_at_limit(self):
+        builder = BatchBuilder(max_batch_size=300, max_document_size=200)
+        batches = []
+
+        for i in range(20):
+            batches.extend(builder.add(
+                'doc-{0}'.format(i),
+                1,
+                {'title': 'Title {0}'.format(i)}
+            ))
+
+        batches.extend(builder.delete('doc-0', 2))
+        batches.extend(builder.flush())
+        self.assertEqual(builder.flush(), [])
+
+        operations = []
+
+        for batch in batches:
+            self.assertTrue(len(batch) <= 300)
+            operations.extend(json.loads(batch.decode('utf-8')))
+
+        self.assertTrue(len(batches) > 1)
+        self.assertEqual(builder.batches, len(batches))
+        self.assertEqual(len(operations), 21)
+        self.assertEqual(operations[3], {
+            'type': 'add',
+            'id': 'doc-3',
+            'version': 1,
+            'lang': 'en',
+            'fields': {'title': 'Title 3'},
+        })
+        self.assertEqual(operations[-1], {
+            'type': 'delete',
+            'id': 'doc-0',
+            'version': 2,
+        })
+
+        # Each batch was filled as far as it could be.
+        for first, second in zip(batches, batches[1:]):
+            next_operation = json.loads(second.decode('utf-8'))[0]
+            encoded = json.dumps(next_operation, separators=(',', ':'))
+            self.assertTrue(len(first) + len(encoded) + 1 > 300)
+
+    def test_exact_fit(self):
+        operation = {'type': 'delete', 'id': 'a', 'version': 1}
+        size = len(json.dumps(operation, separators=(',', ':')))
+        # Two operations, a comma & the brackets.
+        builder = BatchBuilder(max_batch_size=size * 2 + 3)
+        self.assertEqual(builder.append(operation), [])
+        self.assertEqual(builder.append(operation), [])
+        self.assertEqual(len(builder), size * 2 + 3)
+        self.assertEqual(len(builder.append(operation)), 1)
+
+    def test_too_large(self):
+        builder = BatchBuilder(max_document_size=50)
+        self.assertRaises(
+            DocumentTooLarge,
+            builder.add,
+            'big',
+            1,
+            {'body': 'x' * 100}
+        )
+
+
+class FakeDocumentService(object):
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def send(self, batch):
+        operations = json.loads(batch.decode('utf-8'))
+
+        with self.lock:
+            self.batches.append(operations)
+
+        if self.fail_on in [op['id'] for op in operations]:
+            return {'status': 'error', 'errors': [{'message': 'Bad field.'}]}
+
+        kinds = [op['type'] for op in operations]
+        return {
+            'status': 'success',
+            'adds': kinds.count('add'),
+            'deletes': kinds.count('delete'),
+        }
+
+
+class DocumentUploaderTestCase(unittest.TestCase):
+    def test_upload(self):
+        service = FakeDocumentService()
+        uploader = DocumentUploader(
+            service.send,
+            max_workers=3,
+            max_batch_size=1000
+        )
+
+        for i in range(100):
+            uploader.add('doc-{0}'.format(i), 1, {'n': i})
+
+        uploader.delete('doc-0', 2)
+        self.assertTrue(uploader.close())
+
+        self.assertEqual(
+            uploader.stats(),
+            {
+                'adds': 100,
+                'deletes': 1,
+                'batches': len(service.batches),
+                'errors': 0,
+            }
+        )
+        ids = sorted([op['id'] for ops in service.batches for op in ops])
+        self.assertEqual(len(ids), 101)
+
+    def test_errors(self):
+        service = FakeDocumentService(fail_on='doc-5')
+        uploader = DocumentUploader(service.send, max_batch_size=200)
+
+        for i in range(10):
+            uploader.add('doc-{0}'.format(i), 1, {'n': i})
+
+        self.assertFalse(uploader.close())
+        self.assertEqual(len(uploader.errors), 1)
+        self.assertTrue(isinstance(uploader.errors[0], BatchError))
+        self.assertEqual(uploader.errors[0].response['status'], 'error')
+        self.assertTrue(uploader.stats()['adds'] < 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from boto3.core.concurrency import ConcurrencyLimiter, FAILED, THROTTLED
+from boto3.core.exceptions import ServerError
+
+from tests import unittest
+
+
+class ConcurrencyLimiterTestCase(unittest.TestCase):
+    def test_increase(self):
+        limiter = ConcurrencyLimiter(initial=4, max_limit=5)
+
+        # About one more per limit's worth of successes.
+        for i in range(4):
+            limiter.release(limiter.acquire('sqs', 'send_message'))
+
+        self.assertTrue(4.9 < limiter.limit('sqs', 'send_message') < 5.0)
+
+        for i in range(20):
+            limiter.release(limiter.acquire('sqs', 'send_message'))
+
+        self.assertEqual(limiter.limit('sqs', 'send_message'), 5)
+        # Each operation has its own limit.
+        self.assertEqual(limiter.limit('sqs', 'delete_message'), 4)
+
+    def test_decrease(self):
+        limiter = ConcurrencyLimiter(initial=16, min_limit=3)
+        tokens = [limiter.acquire('dynamodb', 'put_item') for i in range(4)]
+
+        # Throttled together, so only halved once.
+        for token in tokens:
+            limiter.release(token, THROTTLED)
+
+        self.assertEqual(limiter.limit('dynamodb', 'put_item'), 8)
+
+        for i in range(3):
+            limiter.release(limiter.acquire('dynamodb', 'put_item'), THROTTLED)
+
+        self.assertEqual(limiter.limit('dynamodb', 'put_item'), 3)
+
+        limiter.release(limiter.acquire('dynamodb', 'put_item'), FAILED)
+        self.assertEqual(limiter.limit('dynamodb', 'put_item'), 3)
+        self.assertEqual(limiter.stats(), {
+            ('dynamodb', 'put_item'): {
+                'limit': 3,
+                'in_flight': 0,
+                'waiting': 0,
+                'throttled': 7,
+            },
+        })
+
+    def test_call(self):
+        limiter = ConcurrencyLimiter(initial=2)
+
+        def throttled():
+            raise ServerError(code='ThrottlingException')
+
+        def broken():
+            raise ValueError('Oops.')
+
+        self.assertEqual(limiter.call('sns', 'publish', lambda: 'ok'), 'ok')
+        self.assertRaises(ServerError, limiter.call, 'sns', 'publish',
+                          throttled)
+        self.assertRaises(ValueError, limiter.call, 'sns', 'publish', broken)
+        stats = limiter.stats()[('sns', 'publish')]
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['limit'], 1.25)
+
+    def test_waits(self):
+        limiter = ConcurrencyLimiter(initial=2, max_limit=2)
+        lock = threading.Lock()
+        state = {'running': 0, 'most': 0}
+
+        def work():
+            with lock:
+                state['running'] += 1
+                state['most'] = max(state['most'], state['running'])
+
+            time.sleep(0.01)
+
+            with lock:
+                state['running'] -= 1
+
+        threads = [
+            threading.Thread(
+                target=limiter.call,
+                args=('s3', 'put_object', work)
+            )
+            for i in range(8)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(state['most'], 2)
+        self.assertEqual(limiter.stats()[('s3', 'put_object')]['waiting'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
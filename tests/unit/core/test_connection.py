@@ -1,5 +1,6 @@
 from boto3.core.connection import ConnectionDetails, ConnectionFactory
 from boto3.core.exceptions import ServerError
+from boto3.core.retries import RetryPolicy, without_retries
 from boto3.core.session import Session
 
 from tests import unittest
@@ -52,6 +53,38 @@ class ChangedTestCoreService(TestCoreService):
     operations = TestCoreService.operations[1:2]
 
 
+class ThrottledOperation(FakeOperation):
+    def __init__(self, *args, **kwargs):
+        self.throttle = kwargs.pop('throttle', 0)
+        super(ThrottledOperation, self).__init__(*args, **kwargs)
+        self.calls = 0
+
+    def call(self, endpoint, **kwargs):
+        self.calls += 1
+
+        if self.calls <= self.throttle:
+            return (None, {'Errors': [{
+                'Code': 'Throttling',
+                'Message': 'Rate exceeded',
+            }]})
+
+        return self.result
+
+
+class ThrottledTestCoreService(TestCoreService):
+    operations = [
+        ThrottledOperation(
+            'DeleteQueue',
+            params=[
+                FakeParam('QueueName', required=True, ptype='string'),
+            ],
+            output=True,
+            result=(None, {'success': True}),
+            throttle=2
+        ),
+    ]
+
+
 class ConnectionDetailsTestCase(unittest.TestCase):
     def setUp(self):
         super(ConnectionDetailsTestCase, self).setUp()
@@ -297,5 +330,58 @@ class ConnectionFactoryTestCase(unittest.TestCase):
         self.assertRaises(TypeError, ts, 'create_queue')
 
 
+class ConnectionRetriesTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ConnectionRetriesTestCase, self).setUp()
+        self.service = ThrottledTestCoreService()
+        # The operations are shared between tests.
+        self.service.operations[0].calls = 0
+        self.session = Session(FakeSession(self.service))
+        self.factory = ConnectionFactory(session=self.session)
+        self.test_service_class = self.factory.construct_for('test')
+        self.slept = []
+
+    def policy(self, **kwargs):
+        return RetryPolicy(
+            random=lambda: 1.0,
+            sleep=self.slept.append,
+            **kwargs
+        )
+
+    def test_retried(self):
+        policy = self.policy(base_delay=0.1)
+        ts = self.test_service_class(retry_policy=policy)
+
+        self.assertEqual(ts.delete_queue(queue_name='boo'), {'success': True})
+        self.assertEqual(self.service.operations[0].calls, 3)
+        self.assertEqual(self.slept, [0.1, 0.2])
+        self.assertEqual(policy.stats()['retries'], 2)
+        # Every attempt passed through the session's limiter.
+        stats = self.session.concurrency_limiter.stats()
+        self.assertEqual(stats[('test', 'delete_queue')]['throttled'], 2)
+        self.assertEqual(stats[('test', 'delete_queue')]['in_flight'], 0)
+
+    def test_without_retries(self):
+        ts = without_retries(self.test_service_class(
+            retry_policy=self.policy()
+        ))
+
+        self.assertRaises(ServerError, ts.delete_queue, queue_name='boo')
+        self.assertEqual(self.service.operations[0].calls, 1)
+        self.assertEqual(self.slept, [])
+
+    def test_per_service_and_operation(self):
+        self.test_service_class.retry_policy = self.policy(
+            operations={'delete_queue': self.policy(max_attempts=1)}
+        )
+        ts = self.test_service_class()
+
+        with self.assertRaises(ServerError) as cm:
+            ts.delete_queue(queue_name='boo')
+
+        self.assertEqual(cm.exception.code, 'Throttling')
+        self.assertEqual(self.slept, [])
+
+
 if __name__ == "__main__":
     unittest.main()
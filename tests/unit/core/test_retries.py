@@ -0,0 +1,137 @@
+from boto3.core.exceptions import ServerError
+from boto3.core.retries import NO_RETRIES, RetryPolicy, backoff_delay
+from boto3.core.retries import without_retries
+
+from tests import unittest
+
+
+class FakeSleep(object):
+    def __init__(self):
+        self.slept = []
+
+    def __call__(self, seconds):
+        self.slept.append(seconds)
+
+
+class Flaky(object):
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+
+        if self.errors:
+            raise self.errors.pop(0)
+
+        return 'ok'
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        super(RetryPolicyTestCase, self).setUp()
+        self.sleep = FakeSleep()
+
+    def policy(self, **kwargs):
+        kwargs.setdefault('random', lambda: 0.5)
+        return RetryPolicy(sleep=self.sleep, **kwargs)
+
+    def test_throttled(self):
+        policy = self.policy(base_delay=1, max_delay=3)
+        func = Flaky(*[ServerError(code='Throttling')] * 3)
+
+        self.assertEqual(policy.call('create_queue', func), 'ok')
+        self.assertEqual(func.calls, 4)
+        # Half (the jitter) of 1, 2 & then 3 (capped) seconds.
+        self.assertEqual(self.sleep.slept, [0.5, 1.0, 1.5])
+        self.assertEqual(policy.stats(), {
+            'calls': 1,
+            'attempts': 4,
+            'retries': 3,
+            'retry_delay': 3.0,
+        })
+
+    def test_gives_up(self):
+        policy = self.policy(max_attempts=3)
+        func = Flaky(*[ServerError(code='SlowDown')] * 5)
+
+        self.assertRaises(ServerError, policy.call, 'put_object', func)
+        self.assertEqual(func.calls, 3)
+
+    def test_not_retryable(self):
+        policy = self.policy()
+        func = Flaky(ServerError(code='AccessDenied', status_code=403))
+
+        self.assertRaises(ServerError, policy.call, 'get_object', func)
+        self.assertEqual(func.calls, 1)
+
+    def test_idempotency(self):
+        policy = self.policy(idempotent=['delete_queue'])
+        unavailable = ServerError(code='Unknown', status_code=503)
+
+        self.assertEqual(
+            policy.call('describe_table', Flaky(unavailable)),
+            'ok'
+        )
+        self.assertEqual(policy.call('delete_queue', Flaky(unavailable)), 'ok')
+        # It may have gone through, so don't send it twice.
+        func = Flaky(ServerError(code='InternalError'))
+        self.assertRaises(ServerError, policy.call, 'send_message', func)
+        self.assertEqual(func.calls, 1)
+
+    def test_per_operation(self):
+        strict = self.policy(max_attempts=1)
+        policy = self.policy(operations={'send_message': strict})
+
+        self.assertTrue(policy.for_operation('send_message') is strict)
+        self.assertTrue(policy.for_operation('receive_message') is policy)
+
+    def test_full_jitter(self):
+        policy = RetryPolicy(base_delay=1, max_delay=8)
+
+        for attempt in range(1, 10):
+            delay = policy.delay(attempt)
+            self.assertTrue(0 <= delay <= min(2 ** (attempt - 1), 8))
+
+    def test_on_retry(self):
+        retried = []
+        policy = self.policy(
+            base_delay=1,
+            on_retry=lambda *args: retried.append(args)
+        )
+        err = ServerError(code='Throttling')
+        policy.call('list_users', Flaky(err))
+        self.assertEqual(retried, [('list_users', err, 1, 0.5)])
+
+    def test_backoff_delay(self):
+        self.assertEqual(
+            [backoff_delay(attempt, 1, 5) for attempt in range(1, 6)],
+            [1, 2, 4, 5, 5]
+        )
+        self.assertEqual(backoff_delay(3, 1, 5, random=lambda: 0.25), 1.0)
+
+
+class FakeConnection(object):
+    retry_policy = RetryPolicy()
+
+    def __init__(self):
+        self.region_name = 'us-west-2'
+
+
+class WithoutRetriesTestCase(unittest.TestCase):
+    def test_copy(self):
+        conn = FakeConnection()
+        once = without_retries(conn)
+
+        self.assertTrue(once is not conn)
+        self.assertTrue(once.retry_policy is NO_RETRIES)
+        self.assertEqual(once.region_name, 'us-west-2')
+        self.assertTrue(conn.retry_policy is FakeConnection.retry_policy)
+
+    def test_not_a_connection(self):
+        thing = object()
+        self.assertTrue(without_retries(thing) is thing)
+
+
+if __name__ == "__main__":
+    unittest.main()
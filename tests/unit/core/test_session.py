@@ -1,5 +1,6 @@
 from botocore.service import Service as BotocoreService
 
+from boto3.core.concurrency import ConcurrencyLimiter
 from boto3.core.session import Session
 
 from tests import unittest
@@ -13,6 +14,15 @@ class SessionTestCase(unittest.TestCase):
         super(SessionTestCase, self).setUp()
         self.session = Session()
 
+    def test_concurrency_limiter(self):
+        self.assertTrue(
+            isinstance(self.session.concurrency_limiter, ConcurrencyLimiter)
+        )
+
+        limiter = ConcurrencyLimiter(initial=4)
+        session = Session(concurrency_limiter=limiter)
+        self.assertTrue(session.concurrency_limiter is limiter)
+
     def test_get_core_service(self):
         client = self.session.get_core_service('sqs')
         self.assertTrue(isinstance(client, BotocoreService))
@@ -0,0 +1,253 @@
+import boto3
+from boto3.dynamodb.cache import ItemCache, disable_item_cache
+from boto3.dynamodb.cache import enable_item_cache, get_item_cache
+from boto3.dynamodb.connection import DynamodbConnection
+from boto3.dynamodb.resources import Item, ItemCollection, Table
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def raw_item(user_id, name='someone'):
+    return {'id': {'S': user_id}, 'name': {'S': name}}
+
+
+class ItemCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ItemCacheTestCase, self).setUp()
+        self.clock = FakeClock()
+        self.cache = ItemCache(max_items=2, ttl=10, clock=self.clock.time)
+        self.cache.set_key_names('us-east-1', 'users', ['id'])
+
+    def test_put_get(self):
+        self.assertTrue(self.cache.put('us-east-1', 'users', raw_item('a')))
+        self.assertEqual(
+            self.cache.get('us-east-1', 'users', {'id': {'S': 'a'}}),
+            raw_item('a')
+        )
+        # Other regions have their own tables.
+        self.assertEqual(
+            self.cache.get('us-west-2', 'users', {'id': {'S': 'a'}}),
+            None
+        )
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_unknown_key_names(self):
+        # Can't tell what the key is, so can't cache it.
+        self.assertFalse(self.cache.put('us-east-1', 'other', raw_item('a')))
+        self.assertTrue(self.cache.put(
+            'us-east-1',
+            'other',
+            raw_item('a'),
+            key={'id': {'S': 'a'}}
+        ))
+
+    def test_ttl(self):
+        self.cache.put('us-east-1', 'users', raw_item('a'))
+        self.clock.now += 11
+        self.assertEqual(
+            self.cache.get('us-east-1', 'users', {'id': {'S': 'a'}}),
+            None
+        )
+        self.assertEqual(len(self.cache), 0)
+
+    def test_lru(self):
+        self.cache.put('us-east-1', 'users', raw_item('a'))
+        self.cache.put('us-east-1', 'users', raw_item('b'))
+        # Touch ``a``, so ``b`` is the least recently used.
+        self.cache.get('us-east-1', 'users', {'id': {'S': 'a'}})
+        self.cache.put('us-east-1', 'users', raw_item('c'))
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(
+            self.cache.get('us-east-1', 'users', {'id': {'S': 'b'}}),
+            None
+        )
+        self.assertTrue(
+            self.cache.get('us-east-1', 'users', {'id': {'S': 'a'}})
+        )
+
+    def test_invalidate(self):
+        self.cache.put('us-east-1', 'users', raw_item('a'))
+        self.cache.put('us-east-1', 'users', raw_item('b'))
+        self.cache.invalidate('us-east-1', 'users', {'id': {'S': 'a'}})
+        self.assertEqual(len(self.cache), 1)
+
+        # No key means the whole table.
+        self.cache.invalidate('us-east-1', 'users')
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['invalidations'], 2)
+
+    def test_stale_read_not_cached(self):
+        generation = self.cache.generation('us-east-1', 'users')
+        # A write lands while the read is in flight.
+        self.cache.invalidate('us-east-1', 'users', {'id': {'S': 'a'}})
+        self.assertFalse(self.cache.put(
+            'us-east-1',
+            'users',
+            raw_item('a'),
+            generation=generation
+        ))
+
+
+class FakeDynamoDB(object):
+    """
+    Stands in for the service behind a real ``DynamodbConnection``.
+    """
+    def __init__(self, conn):
+        self.calls = []
+        self.items = {}
+
+        for name in ('get_item', 'query', 'batch_get_item', 'update_item',
+                     'delete_item', 'put_item', 'describe_table'):
+            setattr(conn, name, self._recorder(name))
+
+    def _recorder(self, name):
+        method = getattr(self, name)
+
+        def _record(**kwargs):
+            self.calls.append(name)
+            return method(**kwargs)
+
+        return _record
+
+    def get_item(self, table_name, key, **kwargs):
+        item = self.items.get(key['id']['S'])
+
+        if item is None:
+            return {}
+
+        return {'Item': item}
+
+    def query(self, table_name, **kwargs):
+        return {'Items': list(self.items.values()), 'Count': len(self.items)}
+
+    def batch_get_item(self, request_items, **kwargs):
+        return {
+            'Responses': {
+                'users': [
+                    self.items[key['id']['S']]
+                    for key in request_items['users']['Keys']
+                ],
+            },
+        }
+
+    def update_item(self, table_name, key, **kwargs):
+        return {}
+
+    def delete_item(self, table_name, key, **kwargs):
+        return {}
+
+    def put_item(self, table_name, item, **kwargs):
+        self.items[item['id']['S']] = item
+        # ``ItemCollection.create`` builds the new ``Item`` from these.
+        return {'Attributes': item}
+
+    def describe_table(self, table_name, **kwargs):
+        return {
+            'Table': {
+                'TableName': table_name,
+                'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            },
+        }
+
+
+class ResourceCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ResourceCacheTestCase, self).setUp()
+        self.conn = DynamodbConnection()
+        self.service = FakeDynamoDB(self.conn)
+        self.service.items['a'] = raw_item('a')
+        self.service.items['b'] = raw_item('b')
+        self.cache = enable_item_cache(boto3.session)
+
+    def tearDown(self):
+        disable_item_cache(boto3.session)
+        super(ResourceCacheTestCase, self).tearDown()
+
+    def get(self, user_id, **kwargs):
+        item = Item(connection=self.conn)
+        return item.get(table_name='users', key={'id': user_id}, **kwargs)
+
+    def test_enable_disable(self):
+        self.assertTrue(get_item_cache() is self.cache)
+        disable_item_cache()
+        self.assertEqual(get_item_cache(), None)
+
+    def test_read_through(self):
+        self.assertEqual(self.get('a'), {'Item': raw_item('a')})
+        self.assertEqual(self.get('a'), {'Item': raw_item('a')})
+        self.assertEqual(self.service.calls, ['get_item'])
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+        # Strongly-consistent & partial reads go to DynamoDB.
+        self.get('a', consistent_read=True)
+        self.get('a', attributes_to_get=['name'])
+        self.assertEqual(self.service.calls.count('get_item'), 3)
+
+    def test_misses_not_cached(self):
+        self.assertEqual(self.get('nope'), {})
+        self.assertEqual(self.get('nope'), {})
+        self.assertEqual(self.service.calls, ['get_item', 'get_item'])
+
+    def test_filled_by_query(self):
+        table = Table(connection=self.conn, table_name='users')
+        # Teaches the cache the table's key.
+        table.get()
+        table.query(key_conditions={})
+        self.get('a')
+        self.get('b')
+        self.assertEqual(self.service.calls, ['describe_table', 'query'])
+
+    def test_filled_by_batch_get(self):
+        items = ItemCollection(connection=self.conn)
+        items.get_batch(request_items={
+            'users': {'Keys': [{'id': 'a'}, {'id': 'b'}]},
+        })
+        self.get('b')
+        self.assertEqual(self.service.calls, ['batch_get_item'])
+
+    def test_invalidated_by_writes(self):
+        self.get('a')
+        Item(connection=self.conn).update(
+            table_name='users',
+            key={'id': 'a'},
+            attribute_updates={'name': {'Value': 'new', 'Action': 'PUT'}}
+        )
+        self.get('a')
+        self.assertEqual(
+            self.service.calls,
+            ['get_item', 'update_item', 'get_item']
+        )
+
+        Item(connection=self.conn).delete(table_name='users', key={'id': 'a'})
+        self.get('a')
+        self.assertEqual(self.service.calls.count('get_item'), 3)
+
+        # The key attributes are known by now, so a put evicts just its own
+        # item.
+        self.get('b')
+        ItemCollection(connection=self.conn).create(
+            table_name='users',
+            item={'id': 'b', 'name': 'changed'}
+        )
+        self.assertEqual(self.get('b'), {'Item': {
+            'id': {'S': 'b'},
+            'name': {'S': 'changed'},
+        }})
+        self.assertEqual(self.service.calls.count('get_item'), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
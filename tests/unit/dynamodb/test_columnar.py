@@ -0,0 +1,153 @@
+import base64
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from boto3.dynamodb.columnar import BINARY, FLOAT, INT, OBJECT, STRING
+from boto3.dynamodb.columnar import Column, ColumnarExport, export_columns
+from boto3.dynamodb.columnar import load_columns, read_chunks
+from boto3.dynamodb.columnar import numpy
+
+from tests import unittest
+
+
+def build_items(count):
+    items = []
+
+    for i in range(count):
+        item = {
+            'id': {'S': 'user-{0}'.format(i)},
+            'logins': {'N': str(i)},
+        }
+
+        if i % 2:
+            item['score'] = {'N': '{0}.5'.format(i)}
+
+        items.append(item)
+
+    return items
+
+
+class ColumnTestCase(unittest.TestCase):
+    def test_kinds(self):
+        column = Column('n')
+        column.append_raw({'N': '1'})
+        column.append_raw({'N': '2'})
+        self.assertEqual(column.kind, INT)
+        self.assertEqual(list(column.values), [1, 2])
+
+        # A fraction turns the whole column into floats.
+        column.append_raw({'N': '2.5'})
+        self.assertEqual(column.kind, FLOAT)
+        self.assertEqual(list(column.values), [1.0, 2.0, 2.5])
+
+        column = Column('b')
+        column.append_raw({'B': base64.b64encode(b'\x00\x01').decode('ascii')})
+        self.assertEqual(column.kind, BINARY)
+        self.assertEqual(column.values, [b'\x00\x01'])
+
+    def test_mixed_becomes_object(self):
+        column = Column('v')
+        column.append_raw({'S': 'a'})
+        column.append_null()
+        column.append_raw({'N': '3'})
+        column.append_raw({'SS': ['x']})
+        self.assertEqual(column.kind, OBJECT)
+        self.assertEqual(column.values, ['a', None, Decimal('3'), set(['x'])])
+        self.assertEqual(list(column.nulls), [0, 1, 0, 0])
+
+    def test_overflow_keeps_exact_value(self):
+        column = Column('big')
+        column.append_raw({'N': '1'})
+        column.append_raw({'N': '123456789012345678901234567890'})
+        self.assertEqual(column.kind, OBJECT)
+        self.assertEqual(
+            column.values[1],
+            Decimal('123456789012345678901234567890')
+        )
+
+    def test_late_attribute(self):
+        column = Column('late', null_rows=2)
+        self.assertEqual(len(column), 2)
+        column.append_raw({'S': 'here'})
+        self.assertEqual(column.values, [None, None, 'here'])
+        self.assertEqual(list(column.nulls), [1, 1, 0])
+
+
+class ColumnarExportTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ColumnarExportTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'export.col')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(ColumnarExportTestCase, self).tearDown()
+
+    def test_in_memory(self):
+        export = export_columns([
+            {'Items': build_items(3)},
+            {'Items': []},
+        ])
+        self.assertEqual(export.rows, 3)
+        columns = export.columns
+        self.assertEqual(list(columns.keys()), ['id', 'logins', 'score'])
+        self.assertEqual(columns['id'].kind, STRING)
+        self.assertEqual(columns['id'].values, ['user-0', 'user-1', 'user-2'])
+        self.assertEqual(list(columns['logins'].values), [0, 1, 2])
+        self.assertEqual(list(columns['score'].values), [0.0, 1.5, 0.0])
+        self.assertEqual(list(columns['score'].nulls), [1, 0, 1])
+
+    def test_spill_round_trip(self):
+        items = build_items(10)
+        items[7]['tags'] = {'SS': ['a', 'b']}
+
+        with ColumnarExport(path=self.path, chunk_rows=4) as export:
+            export.add_page({'Items': items[:5]})
+            export.add_page({'Items': items[5:]})
+            # Never more than a chunk held in memory.
+            self.assertTrue(len(export.columns['id']) <= 4)
+
+        self.assertEqual(export.rows, 10)
+        self.assertEqual(export.chunks_written, 3)
+
+        chunks = list(read_chunks(self.path))
+        self.assertEqual(
+            [len(chunk['id']) for chunk in chunks],
+            [4, 4, 2]
+        )
+
+        columns = load_columns(self.path)
+        self.assertEqual(
+            columns['id'].values,
+            ['user-{0}'.format(i) for i in range(10)]
+        )
+        self.assertEqual(list(columns['logins'].values), list(range(10)))
+        self.assertEqual(columns['logins'].kind, INT)
+        self.assertEqual(list(columns['score'].nulls), [1, 0] * 5)
+        # Only turned up in the second chunk.
+        self.assertEqual(columns['tags'].kind, OBJECT)
+        self.assertEqual(columns['tags'].values[7], set(['a', 'b']))
+        self.assertEqual(list(columns['tags'].nulls), [1] * 7 + [0, 1, 1])
+
+    def test_not_an_export(self):
+        with open(self.path, 'wb') as handle:
+            handle.write(b'nope')
+
+        self.assertRaises(ValueError, list, read_chunks(self.path))
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_to_numpy(self):
+        export = export_columns([{'Items': build_items(4)}])
+        logins = export.columns['logins'].to_numpy()
+        self.assertEqual(logins.dtype, numpy.int64)
+        self.assertEqual(logins.sum(), 6)
+        self.assertEqual(
+            list(export.columns['score'].null_mask()),
+            [True, False, True, False]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+from boto3.dynamodb.connection import DynamodbConnection
+from boto3.dynamodb.resources import Table
+
+from tests import unittest
+
+
+def raw_item(user_id):
+    return {'id': {'S': user_id}, 'visits': {'N': '1'}}
+
+
+class FakePagedDynamoDB(object):
+    """
+    Serves ``Query`` & ``Scan`` results a page at a time, behind a real
+    ``DynamodbConnection``.
+    """
+    def __init__(self, conn, count=5, page_size=2):
+        self.items = [raw_item('user-{0}'.format(i)) for i in range(count)]
+        self.page_size = page_size
+        self.calls = []
+
+        for name in ('query', 'scan', 'describe_table'):
+            setattr(conn, name, getattr(self, name))
+
+    def _page(self, name, kwargs):
+        self.calls.append((name, kwargs))
+        start = 0
+
+        if kwargs.get('exclusive_start_key'):
+            start = int(kwargs['exclusive_start_key']['id']['S'][5:]) + 1
+
+        page = self.items[start:start + self.page_size]
+        resp = {'Items': page, 'Count': len(page)}
+
+        if start + self.page_size < len(self.items):
+            resp['LastEvaluatedKey'] = {'id': page[-1]['id']}
+
+        return resp
+
+    def query(self, **kwargs):
+        return self._page('query', kwargs)
+
+    def scan(self, **kwargs):
+        return self._page('scan', kwargs)
+
+    def describe_table(self, table_name, **kwargs):
+        return {
+            'Table': {
+                'TableName': table_name,
+                'KeySchema': [{'AttributeName': 'id', 'KeyType': 'HASH'}],
+            },
+        }
+
+
+class TableTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TableTestCase, self).setUp()
+        self.conn = DynamodbConnection()
+        self.service = FakePagedDynamoDB(self.conn)
+        self.table = Table(connection=self.conn, table_name='users')
+
+    def test_iter_query(self):
+        results = self.table.iter_query(key_conditions={})
+        self.assertEqual(
+            [item['id']['S'] for item in results],
+            ['user-{0}'.format(i) for i in range(5)]
+        )
+        self.assertEqual(len(self.service.calls), 3)
+        name, kwargs = self.service.calls[0]
+        self.assertEqual(name, 'query')
+        self.assertEqual(kwargs['table_name'], 'users')
+        self.assertTrue('key_conditions' in kwargs)
+
+    def test_iter_scan(self):
+        results = self.table.iter_scan(max_items=3)
+        self.assertEqual(
+            [item['id']['S'] for item in results],
+            ['user-0', 'user-1', 'user-2']
+        )
+        self.assertEqual(
+            [name for name, kwargs in self.service.calls],
+            ['scan', 'scan']
+        )
+
+    def test_iter_scan_decoded(self):
+        results = list(self.table.iter_scan(decode=True))
+        self.assertEqual(results[0], {'id': 'user-0', 'visits': 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
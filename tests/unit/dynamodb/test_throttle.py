@@ -0,0 +1,241 @@
+import boto3
+from boto3.dynamodb.connection import DynamodbConnection
+from boto3.dynamodb.resources import Item, Table
+from boto3.dynamodb.throttle import READ, WRITE, CapacityLimiter
+from boto3.dynamodb.throttle import TableCapacity, disable_capacity_limits
+from boto3.dynamodb.throttle import enable_capacity_limits
+from boto3.dynamodb.throttle import get_capacity_limiter
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class FakeConnection(object):
+    region_name = 'us-east-1'
+
+    def __init__(self, read_units=10, write_units=5):
+        self.read_units = read_units
+        self.write_units = write_units
+        self.calls = []
+
+    def describe_table(self, table_name):
+        self.calls.append(('describe_table', table_name))
+        return {
+            'Table': {
+                'TableName': table_name,
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': self.read_units,
+                    'WriteCapacityUnits': self.write_units,
+                },
+            },
+        }
+
+
+class TableCapacityTestCase(unittest.TestCase):
+    def test_set_provisioned(self):
+        capacity = TableCapacity('users', 10, 4, utilization=0.5)
+        self.assertEqual(capacity.read.rate, 5.0)
+        self.assertEqual(capacity.write.rate, 2.0)
+        self.assertEqual(capacity.bucket(READ), capacity.read)
+        self.assertEqual(capacity.bucket(WRITE), capacity.write)
+
+        capacity.set_provisioned(20, 20)
+        self.assertEqual(capacity.read.rate, 10.0)
+        self.assertEqual(capacity.read.capacity, 10.0)
+
+    def test_observe(self):
+        capacity = TableCapacity('users', 10, 10)
+        self.assertEqual(capacity.estimate(READ), 1.0)
+        capacity.observe(READ, 11.0)
+        self.assertEqual(capacity.estimate(READ), 3.0)
+        # Never estimates less than the cheapest possible read.
+        for i in range(20):
+            capacity.observe(READ, 0)
+
+        self.assertEqual(capacity.estimate(READ), 0.5)
+
+
+class CapacityLimiterTestCase(unittest.TestCase):
+    def setUp(self):
+        super(CapacityLimiterTestCase, self).setUp()
+        self.clock = FakeClock()
+        self.limiter = CapacityLimiter(
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+        self.conn = FakeConnection()
+
+    def test_table_described_once(self):
+        capacity = self.limiter.table('users', self.conn)
+        self.assertEqual(capacity.read.rate, 10.0)
+        self.assertEqual(capacity.write.rate, 5.0)
+        self.assertTrue(self.limiter.table('users', self.conn) is capacity)
+        self.assertEqual(len(self.conn.calls), 1)
+
+        # Unknown & no way to look it up.
+        self.assertRaises(KeyError, self.limiter.table, 'other')
+
+    def test_table_refreshed(self):
+        self.limiter.table('users', self.conn)
+        self.conn.read_units = 50
+        self.clock.now += 301
+        capacity = self.limiter.table('users', self.conn)
+        self.assertEqual(capacity.read.rate, 50.0)
+        self.assertEqual(len(self.conn.calls), 2)
+
+    def test_writers_paced(self):
+        # Provisioned for 5 writes/sec, so 15 writes take ~2 seconds once the
+        # initial burst is spent.
+        self.limiter.set_capacity('users', 10, 5)
+
+        for i in range(15):
+            params = self.limiter.acquire(WRITE, {'table_name': 'users'})
+            self.limiter.settle({
+                'ConsumedCapacity': {
+                    'TableName': 'users',
+                    'CapacityUnits': 1.0,
+                },
+            })
+
+        self.assertEqual(params['return_consumed_capacity'], 'TOTAL')
+        self.assertAlmostEqual(sum(self.clock.slept), 2.0)
+
+    def test_settle_charges_difference(self):
+        capacity = self.limiter.set_capacity('users', 10, 5)
+        self.limiter.acquire(READ, {'table_name': 'users'})
+        self.assertEqual(capacity.read.tokens, 9.0)
+
+        # The query actually cost 6 units.
+        self.limiter.settle({
+            'Items': [],
+            'ConsumedCapacity': {'TableName': 'users', 'CapacityUnits': 6.0},
+        })
+        self.assertEqual(capacity.read.tokens, 4.0)
+        self.assertEqual(capacity.estimate(READ), 2.0)
+
+        # A second settle (with nothing pending) changes nothing.
+        self.limiter.settle({
+            'ConsumedCapacity': {'TableName': 'users', 'CapacityUnits': 6.0},
+        })
+        self.assertEqual(capacity.read.tokens, 4.0)
+
+    def test_batch(self):
+        users = self.limiter.set_capacity('users', 10, 10)
+        posts = self.limiter.set_capacity('posts', 10, 10)
+        self.limiter.acquire(WRITE, {
+            'request_items': {
+                'users': [{'PutRequest': {}}, {'PutRequest': {}}],
+                'posts': [{'DeleteRequest': {}}],
+            },
+        })
+        self.assertEqual(users.write.tokens, 8.0)
+        self.assertEqual(posts.write.tokens, 9.0)
+
+        self.limiter.settle({
+            'UnprocessedItems': {},
+            'ConsumedCapacity': [
+                {'TableName': 'users', 'CapacityUnits': 4.0},
+                {'TableName': 'posts', 'CapacityUnits': 1.0},
+            ],
+        })
+        self.assertEqual(users.write.tokens, 6.0)
+        self.assertEqual(posts.write.tokens, 9.0)
+        # Batch costs don't skew the single-item estimate.
+        self.assertEqual(users.estimate(WRITE), 1.0)
+
+        # Batch reads count the keys.
+        self.limiter.acquire(READ, {
+            'request_items': {
+                'users': {'Keys': [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]},
+            },
+        })
+        self.assertEqual(users.read.tokens, 7.0)
+
+
+class SessionRegistryTestCase(unittest.TestCase):
+    def test_enable_disable(self):
+        session = FakeSession()
+        self.assertEqual(get_capacity_limiter(session), None)
+
+        limiter = enable_capacity_limits(session, utilization=0.5)
+        self.assertTrue(get_capacity_limiter(session) is limiter)
+        self.assertEqual(limiter.utilization, 0.5)
+
+        disable_capacity_limits(session)
+        self.assertEqual(get_capacity_limiter(session), None)
+        # Disabling twice is harmless.
+        disable_capacity_limits(session)
+
+
+class FakeSession(object):
+    pass
+
+
+class ResourceHooksTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ResourceHooksTestCase, self).setUp()
+        self.calls = []
+        self.conn = DynamodbConnection()
+        self.conn.update_item = self.fake_update_item
+        self.conn.describe_table = self.fake_describe_table
+        self.limiter = enable_capacity_limits(boto3.session)
+
+    def tearDown(self):
+        disable_capacity_limits(boto3.session)
+        super(ResourceHooksTestCase, self).tearDown()
+
+    def fake_update_item(self, **kwargs):
+        self.calls.append(('update_item', kwargs))
+        return {
+            'ConsumedCapacity': {
+                'TableName': kwargs['table_name'],
+                'CapacityUnits': 2.0,
+            },
+        }
+
+    def fake_describe_table(self, table_name, **kwargs):
+        self.calls.append(('describe_table', table_name))
+        return {
+            'Table': {
+                'TableName': table_name,
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits': 8,
+                    'WriteCapacityUnits': 4,
+                },
+            },
+        }
+
+    def test_item_update_paced(self):
+        item = Item(connection=self.conn)
+        item.update(table_name='throttled', key={'id': 'a'})
+
+        self.assertEqual(self.calls[0], ('describe_table', 'throttled'))
+        name, params = self.calls[1]
+        self.assertEqual(params['return_consumed_capacity'], 'TOTAL')
+        # Started with 4 writes & paid for 2.
+        capacity = self.limiter.table('throttled')
+        self.assertTrue(1.9 < capacity.write.tokens < 2.1)
+        self.assertEqual(capacity.estimate(WRITE), 1.2)
+
+    def test_table_get_refreshes(self):
+        table = Table(connection=self.conn, table_name='described')
+        table.get()
+        capacity = self.limiter.table('described')
+        self.assertEqual(capacity.read.rate, 8.0)
+        self.assertEqual(capacity.write.rate, 4.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,224 @@
+import base64
+from decimal import Decimal
+
+from boto3.core.session import Session
+from boto3.dynamodb.connection import DynamodbConnection
+from boto3.dynamodb.types import Binary, ItemSchema, decode_item
+from boto3.dynamodb.types import decode_value, encode_item, encode_params
+from boto3.dynamodb.types import encode_value, get_schema
+
+from tests import unittest
+
+
+class EncodeDecodeTestCase(unittest.TestCase):
+    def test_encode_value(self):
+        self.assertEqual(encode_value('hello'), {'S': 'hello'})
+        self.assertEqual(encode_value(42), {'N': '42'})
+        self.assertEqual(encode_value(1.5), {'N': '1.5'})
+        self.assertEqual(encode_value(Decimal('3.14')), {'N': '3.14'})
+        self.assertEqual(encode_value(True), {'N': '1'})
+        self.assertEqual(encode_value(Binary(b'\x00\x01')), {'B': b'\x00\x01'})
+        self.assertEqual(
+            sorted(encode_value(set(['a', 'b']))['SS']),
+            ['a', 'b']
+        )
+        self.assertEqual(
+            sorted(encode_value(set([1, 2]))['NS']),
+            ['1', '2']
+        )
+        self.assertEqual(encode_value(set([Binary(b'x')])), {'BS': [b'x']})
+
+        # Already encoded.
+        self.assertEqual(encode_value({'S': 'hi'}), {'S': 'hi'})
+
+    def test_encode_value_errors(self):
+        self.assertRaises(ValueError, encode_value, set())
+        self.assertRaises(TypeError, encode_value, None)
+        self.assertRaises(TypeError, encode_value, [1, 2])
+        self.assertRaises(TypeError, encode_value, set(['a', 1]))
+
+    def test_decode_value(self):
+        self.assertEqual(decode_value({'S': 'hello'}), 'hello')
+        self.assertEqual(decode_value({'N': '42'}), Decimal('42'))
+        self.assertTrue(isinstance(decode_value({'N': '42'}), Decimal))
+        self.assertEqual(decode_value({'N': '1.5'}), Decimal('1.5'))
+        self.assertEqual(decode_value({'N': '1E+3'}), Decimal('1E+3'))
+        self.assertEqual(
+            decode_value({'B': base64.b64encode(b'\x00\x01').decode('ascii')}),
+            Binary(b'\x00\x01')
+        )
+        self.assertEqual(decode_value({'SS': ['a', 'b']}), set(['a', 'b']))
+        # Whole & fractional numbers come back as the same type.
+        decoded = decode_value({'NS': ['1', '2.5']})
+        self.assertEqual(decoded, set([Decimal('1'), Decimal('2.5')]))
+        self.assertEqual(set([type(n) for n in decoded]), set([Decimal]))
+        self.assertRaises(TypeError, decode_value, {'Q': 'nope'})
+        self.assertRaises(ValueError, decode_value, {})
+
+    def test_round_trip(self):
+        item = {
+            'id': 'abc',
+            'count': 3,
+            'tags': set(['x', 'y']),
+        }
+        self.assertEqual(decode_item(encode_item(item)), item)
+
+    def test_binary(self):
+        self.assertRaises(TypeError, Binary, u'text')
+        self.assertEqual(Binary(b'a'), Binary(b'a'))
+        self.assertNotEqual(Binary(b'a'), Binary(b'b'))
+        self.assertEqual(len(set([Binary(b'a'), Binary(b'a')])), 1)
+
+
+class ItemSchemaTestCase(unittest.TestCase):
+    def test_from_table_description(self):
+        schema = ItemSchema.from_table_description({
+            'Table': {
+                'TableName': 'users',
+                'AttributeDefinitions': [
+                    {'AttributeName': 'username', 'AttributeType': 'S'},
+                    {'AttributeName': 'joined', 'AttributeType': 'N'},
+                ],
+            },
+        })
+        self.assertEqual(schema.attribute_types, {
+            'username': 'S',
+            'joined': 'N',
+        })
+
+        # Snake-cased, as found on a ``Table`` instance.
+        schema = ItemSchema.from_table_description({
+            'table_name': 'users',
+            'attribute_definitions': [
+                {'AttributeName': 'username', 'AttributeType': 'S'},
+            ],
+        })
+        self.assertTrue('username' in schema)
+
+    def test_declare_unknown(self):
+        self.assertRaises(TypeError, ItemSchema, {'a': 'Q'})
+
+    def test_decode_page_learns(self):
+        schema = ItemSchema(attribute_types={'id': 'S'})
+        page = [
+            {'id': {'S': 'a'}, 'n': {'N': '1'}},
+            {'id': {'S': 'b'}, 'n': {'N': '2'}, 'extra': {'SS': ['q']}},
+        ]
+        self.assertEqual(schema.decode_page(page), [
+            {'id': 'a', 'n': Decimal('1')},
+            {'id': 'b', 'n': Decimal('2'), 'extra': set(['q'])},
+        ])
+        self.assertEqual(schema.attribute_types, {
+            'id': 'S',
+            'n': 'N',
+            'extra': 'SS',
+        })
+
+    def test_decode_type_changed(self):
+        # An attribute stored as a different type than last time is still
+        # decoded correctly.
+        schema = ItemSchema(attribute_types={'value': 'S'})
+        self.assertEqual(schema.decode_item({'value': {'N': '7'}}), {
+            'value': Decimal('7'),
+        })
+        self.assertEqual(schema.attribute_types['value'], 'N')
+
+    def test_encode_page(self):
+        schema = ItemSchema()
+        self.assertEqual(schema.encode_page([{'id': 'a', 'n': 2}]), [
+            {'id': {'S': 'a'}, 'n': {'N': '2'}},
+        ])
+        self.assertEqual(schema.attribute_types, {'id': 'S', 'n': 'N'})
+
+    def test_get_schema_shared(self):
+        conn = DynamodbConnection()
+        schema = get_schema('test_types_shared', connection=conn)
+        self.assertTrue(
+            get_schema('test_types_shared', connection=conn) is schema
+        )
+        # Another connection to the same region shares it.
+        self.assertTrue(
+            get_schema('test_types_shared', connection=DynamodbConnection())
+            is schema
+        )
+        # Nothing to share under.
+        self.assertFalse(get_schema(None) is get_schema(None))
+        self.assertFalse(
+            get_schema('test_types_shared') is get_schema('test_types_shared')
+        )
+
+    def test_get_schema_per_region(self):
+        east = DynamodbConnection(region_name='us-east-1')
+        west = DynamodbConnection(region_name='us-west-2')
+        self.assertFalse(
+            get_schema('test_types_region', connection=east)
+            is get_schema('test_types_region', connection=west)
+        )
+
+    def test_get_schema_per_session(self):
+        other = Session()
+        conn = DynamodbConnection()
+        other_conn = other.connect_to('dynamodb')
+        self.assertFalse(
+            get_schema('test_types_session', connection=conn)
+            is get_schema('test_types_session', connection=other_conn)
+        )
+
+
+class EncodeParamsTestCase(unittest.TestCase):
+    def test_item_and_key(self):
+        conn = DynamodbConnection()
+        params = encode_params({
+            'table_name': 'test_encode_params',
+            'key': {'id': 'abc'},
+            'item': {'id': 'abc', 'n': 5},
+        }, connection=conn)
+        self.assertEqual(params['table_name'], 'test_encode_params')
+        self.assertEqual(params['key'], {'id': {'S': 'abc'}})
+        self.assertEqual(params['item'], {'id': {'S': 'abc'}, 'n': {'N': '5'}})
+        # The types seen were recorded on the table's shared schema.
+        schema = get_schema('test_encode_params', connection=conn)
+        self.assertEqual(schema.attribute_types, {'id': 'S', 'n': 'N'})
+
+    def test_conditions(self):
+        original = {'n': {'Value': 5, 'Action': 'PUT'}}
+        params = encode_params({
+            'attribute_updates': original,
+            'key_conditions': {
+                'id': {
+                    'AttributeValueList': ['abc'],
+                    'ComparisonOperator': 'EQ',
+                },
+            },
+        })
+        self.assertEqual(params['attribute_updates'], {
+            'n': {'Value': {'N': '5'}, 'Action': 'PUT'},
+        })
+        self.assertEqual(
+            params['key_conditions']['id']['AttributeValueList'],
+            [{'S': 'abc'}]
+        )
+        # The caller's data was left alone.
+        self.assertEqual(original['n']['Value'], 5)
+
+    def test_request_items(self):
+        params = encode_params({
+            'request_items': {
+                'reads': {'Keys': [{'id': 'a'}, {'id': {'S': 'b'}}]},
+                'writes': [
+                    {'PutRequest': {'Item': {'id': 'c'}}},
+                    {'DeleteRequest': {'Key': {'id': 'd'}}},
+                ],
+            },
+        })
+        self.assertEqual(params['request_items'], {
+            'reads': {'Keys': [{'id': {'S': 'a'}}, {'id': {'S': 'b'}}]},
+            'writes': [
+                {'PutRequest': {'Item': {'id': {'S': 'c'}}}},
+                {'DeleteRequest': {'Key': {'id': {'S': 'd'}}}},
+            ],
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,309 @@
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.dynamodb.utils import PagedResults, consumed_capacity_units
+from boto3.dynamodb.utils import parallel_scan
+
+from boto3.utils.ratelimit import TokenBucket
+
+from tests import unittest
+
+
+class FakeTable(object):
+    """
+    Pretends to be a ``Table``, serving up canned pages per segment.
+    """
+    def __init__(self, pages_per_segment, items_per_page=3, fail_on=None,
+                 units=0.5):
+        self.pages_per_segment = pages_per_segment
+        self.items_per_page = items_per_page
+        self.fail_on = fail_on
+        self.units = units
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def scan(self, **kwargs):
+        with self.lock:
+            self.calls.append(kwargs)
+
+        segment = kwargs['segment']
+        page = kwargs.get('exclusive_start_key', {}).get('page', 0)
+
+        if (segment, page) == self.fail_on:
+            raise ServerError(code='InternalServerError')
+
+        items = [
+            {'id': {'S': '{0}-{1}-{2}'.format(segment, page, offset)}}
+            for offset in range(self.items_per_page)
+        ]
+        result = {
+            'Items': items,
+            'Count': len(items),
+            'ConsumedCapacity': {
+                'TableName': kwargs['table_name'],
+                'CapacityUnits': self.units,
+            },
+        }
+
+        if page + 1 < self.pages_per_segment:
+            result['LastEvaluatedKey'] = {'page': page + 1}
+
+        return result
+
+
+class FakeQuery(object):
+    """
+    Pretends to be ``Table.query`` over ``total`` sequential items.
+    """
+    def __init__(self, total, page_max=4, honour_limit=True):
+        self.total = total
+        self.page_max = page_max
+        self.honour_limit = honour_limit
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        start = 0
+
+        if 'exclusive_start_key' in kwargs:
+            # Like the real thing, the key is that of the last item returned.
+            start = int(kwargs['exclusive_start_key']['n']['N']) + 1
+
+        count = self.page_max
+
+        if self.honour_limit and 'limit' in kwargs:
+            count = min(count, kwargs['limit'])
+
+        end = min(start + count, self.total)
+        result = {
+            'Items': [{'n': {'N': str(n)}} for n in range(start, end)],
+            'ConsumedCapacity': {
+                'TableName': kwargs['table_name'],
+                'CapacityUnits': float(end - start),
+            },
+        }
+
+        if end < self.total:
+            result['LastEvaluatedKey'] = {'n': {'N': str(end - 1)}}
+
+        return result
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+class ConsumedCapacityUnitsTestCase(unittest.TestCase):
+    def test_missing(self):
+        self.assertEqual(consumed_capacity_units({'Items': []}), 0.0)
+
+    def test_single(self):
+        self.assertEqual(consumed_capacity_units({
+            'ConsumedCapacity': {'TableName': 'x', 'CapacityUnits': 2.5},
+        }), 2.5)
+
+    def test_batch(self):
+        self.assertEqual(consumed_capacity_units({
+            'ConsumedCapacity': [
+                {'TableName': 'x', 'CapacityUnits': 2},
+                {'TableName': 'y', 'CapacityUnits': 3},
+            ],
+        }), 5.0)
+
+
+class PagedResultsTestCase(unittest.TestCase):
+    def test_all_items(self):
+        query = FakeQuery(10)
+        results = PagedResults(query, table_name='t')
+        items = [int(item['n']['N']) for item in results]
+        self.assertEqual(items, list(range(10)))
+        self.assertEqual(len(query.calls), 3)
+        self.assertEqual(results.consumed_capacity, [4.0, 4.0, 2.0])
+        self.assertEqual(results.last_evaluated_key, None)
+
+        self.assertFalse('exclusive_start_key' in query.calls[0])
+        self.assertEqual(
+            query.calls[1]['exclusive_start_key'],
+            {'n': {'N': '3'}}
+        )
+        self.assertEqual(
+            query.calls[2]['exclusive_start_key'],
+            {'n': {'N': '7'}}
+        )
+
+        for call in query.calls:
+            self.assertEqual(call['return_consumed_capacity'], 'TOTAL')
+
+    def test_max_items(self):
+        query = FakeQuery(100)
+        results = PagedResults(query, max_items=10, table_name='t')
+        items = list(results)
+        self.assertEqual(len(items), 10)
+        # Only asks for what's left on the final page.
+        self.assertEqual(
+            [call.get('limit') for call in query.calls],
+            [10, 6, 2]
+        )
+        self.assertEqual(results.last_evaluated_key, {'n': {'N': '9'}})
+
+    def test_page_size(self):
+        query = FakeQuery(7, page_max=100)
+        results = PagedResults(query, page_size=5, table_name='t')
+        pages = list(results.each_page())
+        self.assertEqual([len(page['Items']) for page in pages], [5, 2])
+        self.assertEqual([call['limit'] for call in query.calls], [5, 5])
+
+    def test_trims_overshoot(self):
+        # The service hands back more than asked for. Never return more than
+        # ``max_items``.
+        query = FakeQuery(20, page_max=8, honour_limit=False)
+        results = PagedResults(query, max_items=5, table_name='t')
+        self.assertEqual(len(list(results)), 5)
+        self.assertEqual(len(query.calls), 1)
+
+        # Resuming carries on right after the last item returned, rather
+        # than skipping the ones trimmed off.
+        self.assertEqual(results.last_evaluated_key, {'n': {'N': '4'}})
+        resumed = PagedResults(
+            query,
+            table_name='t',
+            exclusive_start_key=results.last_evaluated_key
+        )
+        items = [int(item['n']['N']) for item in resumed]
+        self.assertEqual(items, list(range(5, 20)))
+
+    def test_trims_final_page(self):
+        # The trimmed page was the last one, but an earlier page's key says
+        # which attributes make up the key.
+        query = FakeQuery(6, page_max=4, honour_limit=False)
+        results = PagedResults(query, max_items=5, table_name='t')
+        self.assertEqual(len(list(results)), 5)
+        self.assertEqual(results.last_evaluated_key, {'n': {'N': '4'}})
+
+    def test_trims_without_key(self):
+        # No key attribute names to go on. Better no key than a wrong one.
+        query = FakeQuery(3, page_max=8, honour_limit=False)
+        results = PagedResults(query, max_items=2, table_name='t')
+        pages = list(results.each_page())
+        self.assertEqual(len(pages[0]['Items']), 2)
+        self.assertFalse('LastEvaluatedKey' in pages[0])
+        self.assertEqual(results.last_evaluated_key, None)
+
+    def test_prefetch(self):
+        query = FakeQuery(10)
+        results = PagedResults(query, prefetch=True, table_name='t')
+        pages = results.each_page()
+        first = next(pages)
+        self.assertEqual(len(first['Items']), 4)
+        # The second page was requested before the first was consumed.
+        self.assertEqual(len(query.calls), 2)
+
+        rest = list(pages)
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(len(query.calls), 3)
+
+
+class ParallelScanTestCase(unittest.TestCase):
+    def test_all_segments_all_pages(self):
+        table = FakeTable(pages_per_segment=3)
+        items = list(parallel_scan(table, total_segments=4, table_name='t'))
+        self.assertEqual(len(items), 4 * 3 * 3)
+        ids = set([item['id']['S'] for item in items])
+        self.assertEqual(len(ids), 36)
+        self.assertTrue('3-2-0' in ids)
+
+        # Every segment was asked for by number & followed its start keys.
+        self.assertEqual(len(table.calls), 12)
+
+        for call in table.calls:
+            self.assertEqual(call['total_segments'], 4)
+            self.assertEqual(call['table_name'], 't')
+            self.assertFalse('return_consumed_capacity' in call)
+
+        pages_seen = sorted([
+            (
+                call['segment'],
+                call.get('exclusive_start_key', {}).get('page', 0)
+            )
+            for call in table.calls
+        ])
+        self.assertEqual(pages_seen[:3], [(0, 0), (0, 1), (0, 2)])
+
+    def test_rate_limited(self):
+        table = FakeTable(pages_per_segment=2)
+        items = list(parallel_scan(
+            table,
+            total_segments=2,
+            max_read_capacity=1000,
+            table_name='t'
+        ))
+        self.assertEqual(len(items), 12)
+
+        for call in table.calls:
+            self.assertEqual(call['return_consumed_capacity'], 'TOTAL')
+
+    def test_segments_share_budget(self):
+        # 2 segments x 3 pages x 5 units is 30 units. The bucket starts with
+        # 10 & refills at 10/sec, so the last page can't be asked for until
+        # at least 2 seconds in, however the segments interleave.
+        clock = FakeClock()
+        limiter = TokenBucket(rate=10, clock=clock.time, sleep=clock.sleep)
+        table = FakeTable(pages_per_segment=3, units=5.0)
+        items = list(parallel_scan(
+            table,
+            total_segments=2,
+            read_limiter=limiter,
+            table_name='t'
+        ))
+        self.assertEqual(len(items), 18)
+        self.assertTrue(clock.now - 1000.0 >= 2.0 - 1e-6)
+
+        for call in table.calls:
+            self.assertEqual(call['return_consumed_capacity'], 'TOTAL')
+
+    def test_scans_share_budget(self):
+        # One budget across two scans. Run one segment at a time, so the
+        # waits are exact.
+        clock = FakeClock()
+        limiter = TokenBucket(rate=10, clock=clock.time, sleep=clock.sleep)
+
+        for i in range(2):
+            table = FakeTable(pages_per_segment=2, units=5.0)
+            list(parallel_scan(
+                table,
+                total_segments=1,
+                read_limiter=limiter,
+                table_name='t'
+            ))
+
+        # 20 units used, 10 of them on credit.
+        self.assertAlmostEqual(clock.now - 1000.0, 1.0)
+
+    def test_error_propagates(self):
+        table = FakeTable(pages_per_segment=3, fail_on=(1, 1))
+
+        with self.assertRaises(ServerError):
+            list(parallel_scan(table, total_segments=2, table_name='t'))
+
+    def test_early_close(self):
+        table = FakeTable(pages_per_segment=1000, items_per_page=1)
+        scan = parallel_scan(table, total_segments=2, table_name='t')
+        first = next(scan)
+        self.assertTrue('id' in first)
+        scan.close()
+
+        # The workers stopped well short of the whole table.
+        self.assertTrue(len(table.calls) < 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+import datetime
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.elasticache.utils import EventFollower, apply_parameters
+from boto3.elasticache.utils import describe_parameters, diff_parameters
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeElastiCache(object):
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        self.events = []
+        self.calls = []
+
+    def add(self, date, source, message):
+        self.events.append({
+            'SourceType': 'cache-cluster',
+            'SourceIdentifier': source,
+            'Date': date,
+            'Message': message,
+        })
+
+    def describe_events(self, max_records=100, start_time=None, marker=None,
+                        **kwargs):
+        self.calls.append((start_time, marker, kwargs))
+        # Only string dates are filtered here. The follower has to skip
+        # anything older itself anyway.
+        events = [
+            event for event in self.events
+            if not isinstance(start_time, str) or
+            event['Date'] >= start_time
+        ]
+        start = int(marker or 0)
+        size = min(max_records, self.page_size)
+        resp = {'Events': [dict(event) for event in
+                           events[start:start + size]]}
+
+        if start + size < len(events):
+            resp['Marker'] = str(start + size)
+
+        return resp
+
+
+class EventFollowerTestCase(unittest.TestCase):
+    def setUp(self):
+        super(EventFollowerTestCase, self).setUp()
+        self.clock = FakeClock()
+        self.conn = FakeElastiCache()
+        self.follower = EventFollower(
+            self.conn,
+            source_type='cache-cluster',
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+
+    def messages(self, events):
+        return [event['Message'] for event in events]
+
+    def test_poll(self):
+        self.conn.add('2013-11-01T10:00:00Z', 'a', 'one')
+        self.conn.add('2013-11-01T10:00:05Z', 'b', 'two')
+        self.conn.add('2013-11-01T10:00:05Z', 'a', 'three')
+
+        self.assertEqual(
+            self.messages(self.follower.poll()),
+            ['one', 'two', 'three']
+        )
+        # Two pages, across every cluster.
+        self.assertEqual(len(self.conn.calls), 2)
+        self.assertEqual(self.conn.calls[0][2], {
+            'source_type': 'cache-cluster',
+        })
+        self.assertEqual(self.follower.cursor, '2013-11-01T10:00:05Z')
+
+        # Same-second events that turn up late still come through, once.
+        self.conn.add('2013-11-01T10:00:05Z', 'c', 'four')
+        self.conn.add('2013-11-01T10:01:00Z', 'a', 'five')
+        self.assertEqual(self.messages(self.follower.poll()), ['four', 'five'])
+        self.assertEqual(self.conn.calls[-1][0], '2013-11-01T10:00:05Z')
+
+        self.assertEqual(self.follower.poll(), [])
+        self.assertEqual(self.follower.events, 5)
+
+    def test_mixed_dates(self):
+        follower = EventFollower(
+            self.conn,
+            start_time=datetime.datetime(2013, 11, 1, 10, 0, 5)
+        )
+        self.conn.add('2013-11-01T10:00:00Z', 'a', 'one')
+        self.conn.add('2013-11-01T10:00:05.500Z', 'b', 'two')
+        self.conn.add(datetime.datetime(2013, 11, 1, 10, 0, 7), 'a', 'three')
+        self.assertEqual(self.messages(follower.poll()), ['two', 'three'])
+        self.assertEqual(
+            follower.cursor,
+            datetime.datetime(2013, 11, 1, 10, 0, 7)
+        )
+
+        self.conn.add('2013-11-01T10:00:07Z', 'b', 'four')
+        self.conn.add('2013-11-01T10:00:06Z', 'c', 'late')
+        self.assertEqual(self.messages(follower.poll()), ['four'])
+
+    def test_follow(self):
+        self.conn.add('2013-11-01T10:00:00Z', 'a', 'one')
+        polls = []
+
+        def until():
+            polls.append(self.clock.now)
+
+            if len(polls) == 2:
+                self.conn.add('2013-11-01T10:02:00Z', 'a', 'two')
+
+            return len(polls) > 3
+
+        events = list(self.follower.follow(interval=30, until=until))
+        self.assertEqual(self.messages(events), ['one', 'two'])
+        self.assertEqual(polls, [1000.0, 1030.0, 1060.0, 1090.0])
+
+
+class FakeParameterGroups(object):
+    def __init__(self, page_size=3):
+        self.page_size = page_size
+        self.groups = {}
+        self.modified = []
+        self.describe_calls = 0
+        self.lock = threading.Lock()
+
+    def add(self, group_name, **values):
+        params = [
+            {
+                'ParameterName': 'param-{0:02d}'.format(i),
+                'ParameterValue': '0',
+                'IsModifiable': True,
+            }
+            for i in range(50)
+        ]
+        params.append({
+            'ParameterName': 'locked',
+            'ParameterValue': 'yes',
+            'IsModifiable': False,
+        })
+
+        for param in params:
+            if param['ParameterName'] in values:
+                param['ParameterValue'] = values[param['ParameterName']]
+
+        self.groups[group_name] = params
+
+    def describe_cache_parameters(self, cache_parameter_group_name,
+                                  marker=None):
+        with self.lock:
+            self.describe_calls += 1
+
+        if not cache_parameter_group_name in self.groups:
+            raise ServerError(
+                code='CacheParameterGroupNotFound',
+                message='Not found.'
+            )
+
+        params = self.groups[cache_parameter_group_name]
+        start = int(marker or 0)
+        resp = {'Parameters': params[start:start + self.page_size]}
+
+        if start + self.page_size < len(params):
+            resp['Marker'] = str(start + self.page_size)
+
+        return resp
+
+    def modify_cache_parameter_group(self, cache_parameter_group_name,
+                                     parameter_name_values):
+        assert len(parameter_name_values) <= 20
+
+        with self.lock:
+            self.modified.append(
+                (cache_parameter_group_name, parameter_name_values)
+            )
+
+        return {'CacheParameterGroupName': cache_parameter_group_name}
+
+
+class ParametersTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ParametersTestCase, self).setUp()
+        self.conn = FakeParameterGroups()
+        self.conn.add('sessions', **{'param-01': '5'})
+        self.conn.add('pages')
+
+    def test_describe(self):
+        params = describe_parameters(self.conn, 'sessions')
+        self.assertEqual(len(params), 51)
+        self.assertEqual(params['param-01']['ParameterValue'], '5')
+        self.assertEqual(self.conn.describe_calls, 17)
+
+    def test_diff(self):
+        params = describe_parameters(self.conn, 'sessions')
+        changes = diff_parameters(params, {
+            'param-01': 5,
+            'param-02': True,
+            'locked': 'yes',
+        })
+        self.assertEqual(list(changes.items()), [
+            ('param-02', ('0', 'true')),
+        ])
+        self.assertRaises(ValueError, diff_parameters, params, {'nope': 1})
+        self.assertRaises(ValueError, diff_parameters, params, {'locked': 1})
+
+    def test_apply(self):
+        wanted = dict([('param-{0:02d}'.format(i), 7) for i in range(45)])
+        results = apply_parameters(self.conn, {
+            'sessions': {'param-01': 5},
+            'pages': wanted,
+            'missing': {'param-01': 1},
+        })
+
+        self.assertEqual(list(results), ['missing', 'pages', 'sessions'])
+        self.assertEqual(results['missing'].code,
+                         'CacheParameterGroupNotFound')
+        self.assertEqual(len(results['pages']), 45)
+        self.assertEqual(len(results['sessions']), 0)
+        # 45 changes, in chunks of 20.
+        sizes = sorted([len(values) for name, values in self.conn.modified])
+        self.assertEqual(sizes, [5, 20, 20])
+        changed = set()
+
+        for name, values in self.conn.modified:
+            for value in values:
+                self.assertEqual(value['ParameterValue'], '7')
+                changed.add(value['ParameterName'])
+
+        self.assertEqual(changed, set(wanted))
+
+    def test_dry_run(self):
+        results = apply_parameters(
+            self.conn,
+            {'pages': {'param-03': 1}},
+            dry_run=True
+        )
+        self.assertEqual(dict(results['pages']), {'param-03': ('0', '1')})
+        self.assertEqual(self.conn.modified, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.elastictranscoder.utils import JobScheduler, JobTracker
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeTranscoder(object):
+    def __init__(self, page_size=2):
+        self.page_size = page_size
+        # Oldest first, like the service's own ordering.
+        self.jobs = []
+        self.calls = []
+
+    def add(self, job_id, pipeline_id, status='Submitted'):
+        self.jobs.append({
+            'Id': job_id,
+            'PipelineId': pipeline_id,
+            'Status': status,
+        })
+
+    def set_status(self, job_id, status):
+        for job in self.jobs:
+            if job['Id'] == job_id:
+                job['Status'] = status
+
+    def _page(self, jobs, ascending, page_token):
+        if ascending == 'false':
+            jobs = list(reversed(jobs))
+
+        start = int(page_token or 0)
+        resp = {'Jobs': [dict(job) for job in
+                         jobs[start:start + self.page_size]]}
+
+        if start + self.page_size < len(jobs):
+            resp['NextPageToken'] = str(start + self.page_size)
+
+        return resp
+
+    def list_jobs_by_pipeline(self, pipeline_id, ascending='true',
+                              page_token=None):
+        self.calls.append(('pipeline', pipeline_id, page_token))
+        jobs = [job for job in self.jobs if job['PipelineId'] == pipeline_id]
+        return self._page(jobs, ascending, page_token)
+
+    def list_jobs_by_status(self, status, ascending='true', page_token=None):
+        self.calls.append(('status', status, page_token))
+        jobs = [job for job in self.jobs if job['Status'] == status]
+        return self._page(jobs, ascending, page_token)
+
+    def read_job(self, id):
+        self.calls.append(('read', id, None))
+
+        for job in self.jobs:
+            if job['Id'] == id:
+                return {'Job': dict(job)}
+
+
+class JobTrackerTestCase(unittest.TestCase):
+    def setUp(self):
+        super(JobTrackerTestCase, self).setUp()
+        self.clock = FakeClock()
+        self.conn = FakeTranscoder()
+        self.changes = []
+        self.tracker = JobTracker(
+            self.conn,
+            on_change=lambda job, old: self.changes.append(
+                (job['Id'], old, job['Status'])
+            ),
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+
+    def test_by_pipeline(self):
+        for i in range(10):
+            self.conn.add('old-{0}'.format(i), 'p1', 'Complete')
+
+        for i in range(3):
+            self.conn.add('job-{0}'.format(i), 'p1')
+            self.tracker.track('job-{0}'.format(i), 'p1')
+
+        done = []
+        self.tracker.track('job-0', callback=done.append)
+        self.assertEqual(self.tracker.poll(), [])
+        # Newest first, so the older jobs are never paged through.
+        self.assertEqual(len(self.conn.calls), 2)
+        self.assertEqual(self.changes, [])
+
+        self.conn.set_status('job-0', 'Progressing')
+        self.conn.set_status('job-1', 'Complete')
+        finished = self.tracker.poll()
+        self.assertEqual([job['Id'] for job in finished], ['job-1'])
+        self.assertEqual(sorted(self.changes), [
+            ('job-0', 'Submitted', 'Progressing'),
+            ('job-1', 'Submitted', 'Complete'),
+        ])
+        self.assertEqual(len(self.tracker), 2)
+        self.assertFalse('job-1' in self.tracker)
+
+        self.conn.set_status('job-0', 'Error')
+        self.tracker.poll()
+        self.assertEqual([job['Status'] for job in done], ['Error'])
+        self.assertEqual(self.tracker.read_calls, 0)
+
+    def test_without_pipeline(self):
+        self.conn.add('a', 'p1')
+        self.conn.add('b', 'p2', 'Progressing')
+        self.conn.add('c', 'p2')
+        self.tracker.track('a')
+        self.tracker.track('b')
+        self.tracker.track_job({'Id': 'c', 'PipelineId': 'p2'})
+
+        self.tracker.poll()
+        self.assertEqual(self.changes, [('b', 'Submitted', 'Progressing')])
+        self.assertEqual(self.tracker.read_calls, 0)
+
+        # Its pipeline is known now, so it's found by listing that.
+        self.conn.set_status('a', 'Canceled')
+        finished = self.tracker.poll()
+        self.assertEqual([job['Id'] for job in finished], ['a'])
+        self.assertEqual(self.tracker.read_calls, 0)
+
+        # Finished jobs aren't in the active lists, so are read once.
+        self.conn.add('d', 'p3', 'Complete')
+        self.tracker.track('d')
+        finished = self.tracker.poll()
+        self.assertEqual([job['Id'] for job in finished], ['d'])
+        self.assertEqual(self.tracker.read_calls, 1)
+
+    def test_wait(self):
+        completed = []
+        tracker = JobTracker(
+            self.conn,
+            on_complete=completed.append,
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+        self.conn.add('a', 'p1')
+        tracker.track('a', 'p1')
+
+        self.assertFalse(tracker.wait(interval=10, timeout=25))
+        self.assertEqual(self.clock.now, 1020.0)
+
+        self.conn.set_status('a', 'Complete')
+        self.assertTrue(tracker.wait(interval=10))
+        self.assertEqual([job['Id'] for job in completed], ['a'])
+        self.assertTrue(tracker.wait())
+
+
+class FakeSubmissions(FakeTranscoder):
+    # Jobs finish whenever time passes.
+    def __init__(self, clock, throttle=0, reject=()):
+        super(FakeSubmissions, self).__init__(page_size=3)
+        self.clock = clock
+        self.throttle = throttle
+        self.reject = reject
+        self.most_in_flight = {}
+        self.lock = threading.Lock()
+
+    def sleep(self, seconds):
+        self.clock.sleep(seconds)
+
+        for job in self.jobs:
+            job['Status'] = 'Complete'
+
+    def create_job(self, pipeline_id, input, output):
+        with self.lock:
+            if self.throttle:
+                self.throttle -= 1
+                raise ServerError(code='ThrottlingException', message='Slow')
+
+            if input['Key'] in self.reject:
+                raise ServerError(code='ValidationException', message='Bad')
+
+            job_id = 'job-{0}'.format(len(self.jobs))
+            self.add(job_id, pipeline_id)
+            busy = len([
+                job for job in self.jobs
+                if job['PipelineId'] == pipeline_id and
+                job['Status'] == 'Submitted'
+            ])
+            self.most_in_flight[pipeline_id] = max(
+                busy,
+                self.most_in_flight.get(pipeline_id, 0)
+            )
+            return {'Job': dict(self.jobs[-1])}
+
+
+def backlog(count):
+    for i in range(count):
+        yield {
+            'input': {'Key': 'in-{0}.mov'.format(i)},
+            'output': {'Key': 'out-{0}.mp4'.format(i)},
+        }
+
+
+class JobSchedulerTestCase(unittest.TestCase):
+    def setUp(self):
+        super(JobSchedulerTestCase, self).setUp()
+        self.clock = FakeClock()
+
+    def scheduler(self, conn, **kwargs):
+        return JobScheduler(
+            conn,
+            clock=self.clock.time,
+            sleep=conn.sleep,
+            **kwargs
+        )
+
+    def test_spread(self):
+        conn = FakeSubmissions(self.clock)
+        scheduler = self.scheduler(conn, pipeline_ids=['p1', 'p2'], depth=2)
+        results = list(scheduler.run(backlog(10)))
+
+        self.assertEqual(len(results), 10)
+        self.assertEqual(
+            set([job['Status'] for params, job, error in results]),
+            set(['Complete'])
+        )
+        self.assertEqual(conn.most_in_flight, {'p1': 2, 'p2': 2})
+        per_pipeline = [job['PipelineId'] for job in conn.jobs]
+        self.assertEqual(per_pipeline.count('p1'), 5)
+        stats = scheduler.stats()
+        self.assertEqual(stats['submitted'], 10)
+        self.assertEqual(stats['completed'], 10)
+        self.assertEqual(stats['in_flight'], {'p1': 0, 'p2': 0})
+
+    def test_throttled(self):
+        conn = FakeSubmissions(self.clock, throttle=2)
+        scheduler = self.scheduler(conn, pipeline_ids=['p1'], max_workers=1)
+        results = list(scheduler.run(backlog(3)))
+
+        self.assertEqual([error for params, job, error in results],
+                         [None] * 3)
+        self.assertEqual(scheduler.stats()['throttled'], 2)
+        # Backed off for 1 & then 2 seconds.
+        self.assertTrue(self.clock.now >= 1003.0)
+
+    def test_failed(self):
+        conn = FakeSubmissions(self.clock, reject=('in-1.mov',))
+        scheduler = self.scheduler(conn, pipeline_ids=['p1'])
+        results = list(scheduler.run(backlog(3)))
+        errors = [
+            (params['input']['Key'], error.code)
+            for params, job, error in results if error
+        ]
+
+        self.assertEqual(errors, [('in-1.mov', 'ValidationException')])
+        self.assertEqual(scheduler.stats()['failed'], 1)
+        self.assertEqual(scheduler.stats()['completed'], 2)
+
+    def test_no_pipelines(self):
+        self.assertRaises(ValueError, JobScheduler, FakeTranscoder(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
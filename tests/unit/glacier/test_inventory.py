@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+import io
+
+from boto3.glacier.inventory import iter_archives, iter_inventory
+from boto3.utils import json
+
+from tests import unittest
+
+
+class FakeArchive(object):
+    def __init__(self, connection=None, **kwargs):
+        self.connection = connection
+        self.__dict__.update(kwargs)
+
+
+def build_inventory(count):
+    return {
+        'VaultARN': 'arn:aws:glacier:us-east-1:012345678901:vaults/backups',
+        'InventoryDate': '2013-11-02T09:20:10Z',
+        'ArchiveList': [
+            {
+                'ArchiveId': 'archive-{0}'.format(i),
+                'ArchiveDescription': u'número {0}'.format(i),
+                'CreationDate': '2013-11-01T06:00:52Z',
+                'Size': 1024 * i + 1,
+                'SHA256TreeHash': '{0:064x}'.format(i),
+            }
+            for i in range(count)
+        ],
+    }
+
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super(CountingStream, self).__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super(CountingStream, self).read(size)
+
+
+class InventoryTestCase(unittest.TestCase):
+    def test_iter_inventory(self):
+        inventory = build_inventory(500)
+        raw = json.dumps(
+            inventory,
+            indent=2,
+            ensure_ascii=False
+        ).encode('utf-8')
+        metadata = {}
+        # Tiny chunks, so values (& multi-byte characters) straddle reads.
+        entries = list(iter_inventory(io.BytesIO(raw), metadata, chunk_size=7))
+        self.assertEqual(entries, inventory['ArchiveList'])
+        self.assertEqual(metadata['InventoryDate'], '2013-11-02T09:20:10Z')
+
+    def test_lazy(self):
+        raw = json.dumps(build_inventory(5000)).encode('utf-8')
+        stream = CountingStream(raw)
+        entries = iter_inventory(stream, chunk_size=1024)
+        next(entries)
+        # Only read as far as the first archive.
+        self.assertTrue(stream.reads < 3)
+
+    def test_empty(self):
+        raw = b'{"VaultARN": "arn", "ArchiveList": [], "InventoryDate": "x"}'
+        metadata = {}
+        self.assertEqual(list(iter_inventory(io.BytesIO(raw), metadata)), [])
+        self.assertEqual(metadata, {'VaultARN': 'arn', 'InventoryDate': 'x'})
+        self.assertEqual(list(iter_inventory(io.BytesIO(b'{}'))), [])
+
+    def test_malformed(self):
+        raw = b'{"ArchiveList": [{"ArchiveId": "a"}, {"Archi'
+        self.assertRaises(ValueError, list, iter_inventory(io.BytesIO(raw)))
+        self.assertRaises(ValueError, list, iter_inventory(io.BytesIO(b'[]')))
+
+    def test_iter_archives(self):
+        raw = json.dumps(build_inventory(3)).encode('utf-8')
+        archives = list(iter_archives(
+            {'body': io.BytesIO(raw)},
+            connection='conn',
+            vault_name='backups',
+            resource_class=FakeArchive
+        ))
+        self.assertEqual(len(archives), 3)
+        archive = archives[2]
+        self.assertEqual(archive.id, 'archive-2')
+        self.assertEqual(archive.size, 2049)
+        self.assertEqual(archive.description, u'número 2')
+        self.assertEqual(archive.creation_date, '2013-11-01T06:00:52Z')
+        self.assertEqual(archive.sha256_tree_hash, '{0:064x}'.format(2))
+        self.assertEqual(archive.vault_name, 'backups')
+        self.assertEqual(archive.connection, 'conn')
+
+
+if __name__ == "__main__":
+    unittest.main()
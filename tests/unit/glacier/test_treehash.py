@@ -0,0 +1,138 @@
+import binascii
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+
+from boto3.glacier.treehash import MB, TreeHash, leaf_digests, tree_hash
+from boto3.glacier.treehash import parallel_leaf_digests, tree_hash_file
+
+from tests import unittest
+
+
+def naive_tree_hash(data):
+    # Straight from the Glacier docs: hash the leaves, then pair them up
+    # level by level.
+    hashes = [
+        hashlib.sha256(data[offset:offset + MB]).digest()
+        for offset in range(0, len(data), MB)
+    ] or [hashlib.sha256(b'').digest()]
+
+    while len(hashes) > 1:
+        paired = []
+
+        for i in range(0, len(hashes), 2):
+            if i + 1 < len(hashes):
+                paired.append(
+                    hashlib.sha256(hashes[i] + hashes[i + 1]).digest()
+                )
+            else:
+                paired.append(hashes[i])
+
+        hashes = paired
+
+    return binascii.hexlify(hashes[0]).decode('ascii')
+
+
+class TreeHashTestCase(unittest.TestCase):
+    def test_small(self):
+        self.assertEqual(
+            tree_hash(b'hello world'),
+            hashlib.sha256(b'hello world').hexdigest()
+        )
+        self.assertEqual(tree_hash(b''), hashlib.sha256(b'').hexdigest())
+
+    def test_matches_naive(self):
+        for size in (MB, MB + 1, 3 * MB, 5 * MB + 17, 8 * MB):
+            data = b'x' * size
+            self.assertEqual(tree_hash(data), naive_tree_hash(data))
+
+    def test_incremental(self):
+        data = bytes(bytearray(range(256))) * (3 * 4096 + 7)
+        tree = TreeHash()
+
+        # Uneven chunks that straddle leaf boundaries.
+        for offset in range(0, len(data), 300001):
+            tree.update(data[offset:offset + 300001])
+
+        self.assertEqual(tree.size, len(data))
+        self.assertEqual(tree.hexdigest(), naive_tree_hash(data))
+
+    def test_add_digest(self):
+        data = b'y' * (5 * MB + 3)
+        tree = TreeHash()
+
+        for digest, size in leaf_digests(data):
+            tree.add_digest(digest, size=size)
+
+        self.assertEqual(tree.size, len(data))
+        self.assertEqual(tree.hexdigest(), naive_tree_hash(data))
+
+        # Whole subtrees, largest first.
+        first = TreeHash(data[:4 * MB]).digest()
+        tree = TreeHash()
+        tree.add_digest(first, level=2)
+        tree.update(data[4 * MB:])
+        self.assertEqual(tree.hexdigest(), naive_tree_hash(data))
+
+    def test_add_digest_mid_leaf(self):
+        tree = TreeHash(b'partial')
+        self.assertRaises(ValueError, tree.add_digest, b'0' * 32)
+
+
+class UnevenReader(object):
+    # Hands back data in odd-sized dribs & drabs, like a socket.
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+
+    def read(self, size):
+        return self.data.read(min(size, 70001))
+
+
+class TreeHashFileTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TreeHashFileTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'archive')
+        self.data = bytes(bytearray(range(256))) * (4096 * 37 + 11)
+
+        with open(self.path, 'wb') as fileobj:
+            fileobj.write(self.data)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(TreeHashFileTestCase, self).tearDown()
+
+    def test_parallel_leaf_digests(self):
+        self.assertEqual(
+            parallel_leaf_digests(self.data, max_workers=3),
+            leaf_digests(self.data)
+        )
+
+    def test_path(self):
+        expected = naive_tree_hash(self.data)
+        self.assertEqual(tree_hash_file(self.path), expected)
+        self.assertEqual(tree_hash_file(self.path, max_workers=1), expected)
+
+    def test_streams(self):
+        expected = naive_tree_hash(self.data)
+        self.assertEqual(tree_hash_file(io.BytesIO(self.data)), expected)
+        self.assertEqual(tree_hash_file(UnevenReader(self.data)), expected)
+
+        with open(self.path, 'rb') as fileobj:
+            # Not at the start, so it's streamed from where it is.
+            fileobj.read(MB)
+            self.assertEqual(
+                tree_hash_file(fileobj),
+                naive_tree_hash(self.data[MB:])
+            )
+
+    def test_empty(self):
+        open(self.path, 'wb').close()
+        self.assertEqual(tree_hash_file(self.path), tree_hash(b''))
+        self.assertEqual(tree_hash_file(io.BytesIO()), tree_hash(b''))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,294 @@
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from boto3.core.exceptions import TreeHashValidationError
+from boto3.glacier.treehash import MB, tree_hash
+from boto3.glacier.utils import ArchiveUploader, JobOutputDownloader
+from boto3.glacier.utils import download_job_output, part_size_for
+from boto3.glacier.utils import upload_archive
+
+from tests import unittest
+
+
+class FakeGlacier(object):
+    def __init__(self, corrupt=None):
+        self.lock = threading.Lock()
+        self.parts = {}
+        self.initiated = []
+        self.completed = []
+        self.corrupt = corrupt
+        self.listed_part_size = None
+
+    def initiate_multipart_upload(self, **kwargs):
+        self.initiated.append(kwargs)
+        return {'uploadId': 'upload-1'}
+
+    def upload_multipart_part(self, vault_name, account_id, upload_id, range,
+                              checksum, body):
+        start = range.split(' ')[1].split('-')[0]
+        received = tree_hash(body)
+
+        if self.corrupt == int(start):
+            received = '0' * 64
+
+        with self.lock:
+            self.parts[int(start)] = (received, body)
+
+        return {'checksum': received}
+
+    def list_parts(self, vault_name, account_id, upload_id, marker=None):
+        starts = sorted(self.parts)
+        # One part per page, to exercise the pagination.
+        index = 0 if marker is None else int(marker)
+        parts = []
+
+        if index < len(starts):
+            start = starts[index]
+            checksum, body = self.parts[start]
+            parts.append({
+                'RangeInBytes': '{0}-{1}'.format(start, start + len(body) - 1),
+                'SHA256TreeHash': checksum,
+            })
+
+        resp = {
+            'Parts': parts,
+            'PartSizeInBytes': self.listed_part_size,
+        }
+
+        if index + 1 < len(starts):
+            resp['Marker'] = str(index + 1)
+
+        return resp
+
+    def complete_multipart_upload(self, **kwargs):
+        self.completed.append(kwargs)
+        return {'archiveId': 'archive-1', 'checksum': kwargs['checksum']}
+
+
+class ChunkedReader(object):
+    # Like a pipe, hands back at most ``chunk`` bytes per read.
+    def __init__(self, data, chunk):
+        self.stream = io.BytesIO(data)
+        self.chunk = chunk
+
+    def read(self, size):
+        return self.stream.read(min(size, self.chunk))
+
+
+class PartSizeTestCase(unittest.TestCase):
+    def test_part_size_for(self):
+        self.assertEqual(part_size_for(10 * MB), 8 * MB)
+        self.assertEqual(part_size_for(10 * MB, minimum=MB), MB)
+        self.assertEqual(part_size_for(100000 * MB), 16 * MB)
+        self.assertRaises(ValueError, part_size_for, 4096 * MB * 10001)
+
+    def test_invalid(self):
+        conn = FakeGlacier()
+        self.assertRaises(ValueError, ArchiveUploader, conn, 'v', 3 * MB)
+        self.assertRaises(ValueError, ArchiveUploader, conn, 'v', MB + 1)
+        self.assertRaises(ValueError, ArchiveUploader, conn, 'v', MB // 2)
+
+
+class ArchiveUploaderTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ArchiveUploaderTestCase, self).setUp()
+        self.data = bytes(bytearray(range(256))) * (4096 * 5 + 100)
+
+    def test_upload(self):
+        conn = FakeGlacier()
+        resp = upload_archive(
+            conn,
+            'backups',
+            io.BytesIO(self.data),
+            description='test',
+            part_size=MB,
+            max_workers=3
+        )
+        self.assertEqual(resp['archiveId'], 'archive-1')
+        self.assertEqual(conn.initiated[0]['part_size'], str(MB))
+        self.assertEqual(conn.initiated[0]['archive_description'], 'test')
+        self.assertEqual(sorted(conn.parts), [i * MB for i in range(6)])
+        self.assertEqual(
+            b''.join([conn.parts[start][1] for start in sorted(conn.parts)]),
+            self.data
+        )
+
+        completed = conn.completed[0]
+        self.assertEqual(completed['archive_size'], str(len(self.data)))
+        self.assertEqual(completed['checksum'], tree_hash(self.data))
+
+    def test_short_reads(self):
+        conn = FakeGlacier()
+        upload_archive(
+            conn,
+            'backups',
+            ChunkedReader(self.data, 10000),
+            part_size=MB
+        )
+        self.assertEqual(sorted(conn.parts), [i * MB for i in range(6)])
+        self.assertEqual(
+            b''.join([conn.parts[start][1] for start in sorted(conn.parts)]),
+            self.data
+        )
+        self.assertEqual(conn.completed[0]['checksum'], tree_hash(self.data))
+
+    def test_empty(self):
+        conn = FakeGlacier()
+        self.assertRaises(
+            ValueError,
+            upload_archive,
+            conn,
+            'backups',
+            io.BytesIO(b'')
+        )
+        self.assertEqual(conn.initiated, [])
+        self.assertEqual(conn.completed, [])
+
+    def test_bad_checksum(self):
+        conn = FakeGlacier(corrupt=2 * MB)
+        uploader = ArchiveUploader(conn, 'backups', part_size=MB)
+        self.assertRaises(
+            TreeHashValidationError,
+            uploader.upload,
+            io.BytesIO(self.data)
+        )
+        self.assertEqual(uploader.upload_id, 'upload-1')
+        self.assertEqual(conn.completed, [])
+
+    def test_resume(self):
+        conn = FakeGlacier(corrupt=2 * MB)
+        uploader = ArchiveUploader(conn, 'backups', part_size=MB)
+
+        try:
+            uploader.upload(io.BytesIO(self.data))
+        except TreeHashValidationError:
+            pass
+
+        # Fix the flaky part, then pick up where it left off.
+        conn.corrupt = None
+        conn.listed_part_size = MB
+        uploader = ArchiveUploader(conn, 'backups', part_size=4 * MB)
+        resp = uploader.upload(
+            io.BytesIO(self.data),
+            upload_id='upload-1'
+        )
+        self.assertEqual(uploader.part_size, MB)
+        # Whatever made it up the first time (bar the bad part) is skipped.
+        self.assertTrue(uploader.parts_skipped >= 2)
+        self.assertEqual(uploader.parts_skipped + uploader.parts_uploaded, 6)
+        self.assertEqual(conn.parts[2 * MB][0], tree_hash(
+            self.data[2 * MB:3 * MB]
+        ))
+        self.assertEqual(len(conn.initiated), 1)
+        self.assertEqual(resp['checksum'], tree_hash(self.data))
+
+
+class FakeJobOutput(object):
+    def __init__(self, data, fail_at=None):
+        self.data = data
+        self.fail_at = fail_at
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def describe_job(self, vault_name, account_id, job_id):
+        return {
+            'Action': 'ArchiveRetrieval',
+            'ArchiveSizeInBytes': len(self.data),
+            'SHA256TreeHash': tree_hash(self.data),
+        }
+
+    def get_job_output(self, vault_name, account_id, job_id, range):
+        start, end = [int(i) for i in range.split('=')[1].split('-')]
+
+        with self.lock:
+            self.fetched.append(start)
+
+        if start == self.fail_at:
+            raise IOError("Connection reset.")
+
+        body = self.data[start:end + 1]
+        return {'body': io.BytesIO(body), 'checksum': tree_hash(body)}
+
+
+class JobOutputDownloaderTestCase(unittest.TestCase):
+    def setUp(self):
+        super(JobOutputDownloaderTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'restored')
+        self.data = bytes(bytearray(range(256))) * (4096 * 7 + 300)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        super(JobOutputDownloaderTestCase, self).tearDown()
+
+    def read(self):
+        with open(self.path, 'rb') as fileobj:
+            return fileobj.read()
+
+    def test_download(self):
+        conn = FakeJobOutput(self.data)
+        result = download_job_output(
+            conn,
+            'backups',
+            'job-1',
+            self.path,
+            chunk_size=2 * MB,
+            max_workers=3
+        )
+        self.assertEqual(result, tree_hash(self.data))
+        self.assertEqual(self.read(), self.data)
+        self.assertEqual(sorted(conn.fetched), [0, 2 * MB, 4 * MB, 6 * MB])
+        self.assertFalse(os.path.exists(self.path + '.state'))
+
+    def test_bad_range(self):
+        conn = FakeJobOutput(self.data)
+        original = conn.get_job_output
+
+        def corrupt(**kwargs):
+            resp = original(**kwargs)
+            resp['checksum'] = '0' * 64
+            return resp
+
+        conn.get_job_output = corrupt
+        downloader = JobOutputDownloader(conn, 'backups', 'job-1', MB)
+        self.assertRaises(
+            TreeHashValidationError,
+            downloader.download,
+            self.path
+        )
+
+    def test_resume(self):
+        conn = FakeJobOutput(self.data, fail_at=4 * MB)
+        downloader = JobOutputDownloader(
+            conn,
+            'backups',
+            'job-1',
+            chunk_size=MB,
+            max_workers=1
+        )
+        self.assertRaises(IOError, downloader.download, self.path)
+        self.assertTrue(os.path.exists(self.path + '.state'))
+        first_try = set(conn.fetched)
+
+        conn.fail_at = None
+        conn.fetched = []
+        self.assertEqual(downloader.download(self.path), tree_hash(self.data))
+        self.assertEqual(self.read(), self.data)
+        # Nothing that made it the first time was fetched again.
+        self.assertEqual(
+            set(conn.fetched) & (first_try - set([4 * MB])),
+            set()
+        )
+        self.assertTrue(4 * MB in conn.fetched)
+        self.assertEqual(
+            downloader.ranges_skipped + downloader.ranges_fetched,
+            8
+        )
+        self.assertTrue(downloader.ranges_skipped >= 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,334 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.iam.utils import AccountSnapshot, ThrottledCaller, apply_policy
+from boto3.utils import json
+from boto3.utils import six
+
+from tests import unittest
+
+
+class FakeIAM(object):
+    def __init__(self, throttle=0, page_size=2):
+        self.throttle = throttle
+        self.page_size = page_size
+        self.calls = []
+        self.lock = threading.Lock()
+        self.users = ['alice', 'bob', 'carol']
+        self.memberships = {
+            'alice': ['admins', 'developers'],
+            'bob': ['admins'],
+            'carol': [],
+        }
+        self.profiles = {
+            'web-profile': ['web'],
+            'shared-profile': ['web', 'worker'],
+        }
+
+    def _page(self, name, result_key, items, marker=None, **kwargs):
+        with self.lock:
+            self.calls.append(name)
+
+            if self.throttle:
+                self.throttle -= 1
+                raise ServerError(code='Throttling', message='Rate exceeded')
+
+        start = int(marker or 0)
+        end = start + self.page_size
+        resp = {result_key: items[start:end], 'IsTruncated': False}
+
+        if end < len(items):
+            resp['IsTruncated'] = True
+            resp['Marker'] = str(end)
+
+        return resp
+
+    def list_users(self, **kwargs):
+        return self._page('list_users', 'Users', [
+            {'UserName': name, 'Arn': 'arn:user/' + name}
+            for name in self.users
+        ], **kwargs)
+
+    def list_groups(self, **kwargs):
+        return self._page('list_groups', 'Groups', [
+            {'GroupName': 'admins'},
+            {'GroupName': 'developers'},
+            {'GroupName': 'empty'},
+        ], **kwargs)
+
+    def list_roles(self, **kwargs):
+        return self._page('list_roles', 'Roles', [
+            {'RoleName': 'web'},
+            {'RoleName': 'worker'},
+            {'RoleName': 'lonely'},
+        ], **kwargs)
+
+    def list_instance_profiles(self, **kwargs):
+        return self._page('list_instance_profiles', 'InstanceProfiles', [
+            {
+                'InstanceProfileName': name,
+                'Roles': [{'RoleName': role} for role in roles],
+            }
+            for name, roles in sorted(self.profiles.items())
+        ], **kwargs)
+
+    def list_groups_for_user(self, user_name, **kwargs):
+        return self._page('list_groups_for_user', 'Groups', [
+            {'GroupName': name} for name in self.memberships[user_name]
+        ], **kwargs)
+
+    def list_user_policies(self, user_name, **kwargs):
+        return self._page('list_user_policies', 'PolicyNames', [
+            '{0}-{1}'.format(user_name, i) for i in range(3)
+        ], **kwargs)
+
+    def list_access_keys(self, user_name, **kwargs):
+        return self._page('list_access_keys', 'AccessKeyMetadata', [
+            {'AccessKeyId': 'AKIA' + user_name.upper(), 'Status': 'Active'},
+        ], **kwargs)
+
+    def list_group_policies(self, group_name, **kwargs):
+        return self._page('list_group_policies', 'PolicyNames', [
+            group_name + '-policy',
+        ], **kwargs)
+
+    def list_role_policies(self, role_name, **kwargs):
+        return self._page('list_role_policies', 'PolicyNames', [], **kwargs)
+
+
+class ThrottledCallerTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ThrottledCallerTestCase, self).setUp()
+        self.slept = []
+
+    def test_backoff(self):
+        conn = FakeIAM(throttle=3)
+        caller = ThrottledCaller(sleep=self.slept.append, base_delay=1)
+        users = caller.pages(conn.list_users, 'Users')
+
+        self.assertEqual(len(users), 3)
+        self.assertEqual(self.slept, [1, 2, 4])
+        self.assertEqual(caller.throttled, 3)
+        # Three throttled, then two pages.
+        self.assertEqual(caller.calls, 5)
+
+    def test_gives_up(self):
+        conn = FakeIAM(throttle=10)
+        caller = ThrottledCaller(sleep=self.slept.append, max_retries=2)
+        self.assertRaises(ServerError, caller, conn.list_users)
+        self.assertEqual(len(self.slept), 2)
+
+    def test_other_errors(self):
+        def broken(**kwargs):
+            raise ServerError(code='NoSuchEntity', message='Gone')
+
+        caller = ThrottledCaller(sleep=self.slept.append)
+        self.assertRaises(ServerError, caller, broken)
+        self.assertEqual(self.slept, [])
+
+
+class AccountSnapshotTestCase(unittest.TestCase):
+    def setUp(self):
+        super(AccountSnapshotTestCase, self).setUp()
+        self.conn = FakeIAM(throttle=2)
+        self.caller = ThrottledCaller(sleep=lambda seconds: None)
+        self.snapshot = AccountSnapshot.take(
+            self.conn,
+            max_workers=4,
+            caller=self.caller
+        )
+
+    def test_take(self):
+        snapshot = self.snapshot
+        self.assertEqual(sorted(snapshot.users), ['alice', 'bob', 'carol'])
+        self.assertEqual(snapshot.users['bob']['Arn'], 'arn:user/bob')
+        self.assertEqual(len(snapshot.instance_profiles), 2)
+        # Paged past the first two.
+        self.assertEqual(
+            snapshot.user_policies['alice'],
+            ['alice-0', 'alice-1', 'alice-2']
+        )
+        self.assertEqual(snapshot.group_policies['empty'], ['empty-policy'])
+        self.assertEqual(snapshot.role_policies['web'], [])
+        self.assertEqual(
+            snapshot.access_keys['carol'][0]['AccessKeyId'],
+            'AKIACAROL'
+        )
+        self.assertEqual(self.caller.throttled, 2)
+
+    def test_indexes(self):
+        snapshot = self.snapshot
+        self.assertEqual(
+            snapshot.groups_for_user('alice'),
+            ['admins', 'developers']
+        )
+        self.assertEqual(snapshot.groups_for_user('carol'), [])
+        self.assertEqual(snapshot.users_in_group('admins'), ['alice', 'bob'])
+        self.assertEqual(snapshot.users_in_group('empty'), [])
+        self.assertEqual(
+            snapshot.instance_profiles_for_role('web'),
+            ['shared-profile', 'web-profile']
+        )
+        self.assertEqual(snapshot.instance_profiles_for_role('lonely'), [])
+        self.assertEqual(
+            snapshot.roles_for_instance_profile('shared-profile'),
+            ['web', 'worker']
+        )
+
+        # No further calls needed.
+        calls = len(self.conn.calls)
+        snapshot.users_in_group('developers')
+        self.assertEqual(len(self.conn.calls), calls)
+
+    def test_save_load(self):
+        tmpdir = tempfile.mkdtemp()
+
+        try:
+            path = os.path.join(tmpdir, 'iam.json')
+            self.snapshot.save(path)
+            loaded = AccountSnapshot.load(path)
+        finally:
+            shutil.rmtree(tmpdir)
+
+        self.assertEqual(loaded.to_dict(), self.snapshot.to_dict())
+        self.assertEqual(loaded.users_in_group('admins'), ['alice', 'bob'])
+        self.assertEqual(
+            loaded.instance_profiles_for_role('worker'),
+            ['shared-profile']
+        )
+
+
+POLICY = {
+    'Statement': [{
+        'Effect': 'Allow',
+        'Action': ['logs:Get*'],
+        'Resource': '*',
+    }],
+}
+
+
+class FakePolicies(object):
+    def __init__(self, throttle_puts=0):
+        self.policies = {}
+        self.puts = []
+        self.throttle_puts = throttle_puts
+        self.lock = threading.Lock()
+
+        for kind in ('user', 'group', 'role'):
+            setattr(self, 'get_{0}_policy'.format(kind), self._getter(kind))
+            setattr(self, 'put_{0}_policy'.format(kind), self._putter(kind))
+
+    def _getter(self, kind):
+        def _get(policy_name, **kwargs):
+            name = kwargs[kind + '_name']
+
+            if name == 'broken':
+                raise ServerError(code='ServiceFailure', message='Oops')
+
+            if (kind, name, policy_name) not in self.policies:
+                raise ServerError(code='NoSuchEntity', message='Not found')
+
+            # URL-encoded, like the real thing.
+            return {
+                'PolicyDocument': six.moves.urllib.parse.quote(
+                    self.policies[(kind, name, policy_name)]
+                ),
+            }
+
+        return _get
+
+    def _putter(self, kind):
+        def _put(policy_name, policy_document, **kwargs):
+            name = kwargs[kind + '_name']
+
+            with self.lock:
+                if self.throttle_puts:
+                    self.throttle_puts -= 1
+                    raise ServerError(code='Throttling', message='Slow down')
+
+                self.puts.append((kind, name))
+                self.policies[(kind, name, policy_name)] = policy_document
+
+        return _put
+
+
+class ApplyPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        super(ApplyPolicyTestCase, self).setUp()
+        self.conn = FakePolicies(throttle_puts=1)
+        self.caller = ThrottledCaller(sleep=lambda seconds: None)
+        # Same policy, formatted differently.
+        self.conn.policies[('user', 'alice', 'logs')] = json.dumps(
+            POLICY,
+            indent=4
+        )
+        self.conn.policies[('role', 'web', 'logs')] = json.dumps({
+            'Statement': [],
+        })
+
+    def test_apply(self):
+        results = apply_policy(
+            self.conn,
+            'logs',
+            POLICY,
+            users=['alice', 'bob'],
+            groups=['admins', 'broken'],
+            roles=['web'],
+            caller=self.caller
+        )
+
+        self.assertEqual(list(results.keys()), [
+            ('user', 'alice'),
+            ('user', 'bob'),
+            ('group', 'admins'),
+            ('group', 'broken'),
+            ('role', 'web'),
+        ])
+        self.assertEqual(results[('user', 'alice')], 'unchanged')
+        self.assertEqual(results[('user', 'bob')], 'created')
+        self.assertEqual(results[('group', 'admins')], 'created')
+        self.assertEqual(results[('role', 'web')], 'updated')
+        self.assertEqual(results[('group', 'broken')].code, 'ServiceFailure')
+
+        self.assertEqual(sorted(self.conn.puts), [
+            ('group', 'admins'),
+            ('role', 'web'),
+            ('user', 'bob'),
+        ])
+        self.assertEqual(
+            json.loads(self.conn.policies[('role', 'web', 'logs')]),
+            POLICY
+        )
+        self.assertEqual(self.caller.throttled, 1)
+
+        # Running it again changes nothing.
+        self.conn.puts = []
+        results = apply_policy(
+            self.conn,
+            'logs',
+            json.dumps(POLICY),
+            users=['alice', 'bob'],
+            roles=['web'],
+            caller=self.caller
+        )
+        self.assertEqual(set(results.values()), set(['unchanged']))
+        self.assertEqual(self.conn.puts, [])
+
+    def test_dry_run(self):
+        results = apply_policy(
+            self.conn,
+            'logs',
+            POLICY,
+            users=['alice', 'bob'],
+            dry_run=True,
+            caller=self.caller
+        )
+        self.assertEqual(results[('user', 'bob')], 'created')
+        self.assertEqual(self.conn.puts, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
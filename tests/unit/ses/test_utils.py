@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+import email
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.ses.utils import BulkSender, MimeTemplate, QuotaExceeded
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+class FakeSES(object):
+    def __init__(self, clock, max_rate=10, max_24=1000, sent=0, throttle=0):
+        self.clock = clock
+        self.max_rate = max_rate
+        self.max_24 = max_24
+        self.sent_24 = sent
+        self.throttle = throttle
+        self.quota_calls = 0
+        self.sent = []
+        self.lock = threading.Lock()
+
+    def get_send_quota(self):
+        self.quota_calls += 1
+        return {
+            'MaxSendRate': self.max_rate,
+            'Max24HourSend': self.max_24,
+            'SentLast24Hours': self.sent_24,
+        }
+
+    def _record(self, kind, kwargs):
+        with self.lock:
+            if self.throttle:
+                self.throttle -= 1
+                raise ServerError(
+                    code='Throttling',
+                    message='Maximum sending rate exceeded.'
+                )
+
+            self.sent.append((kind, self.clock.time(), kwargs))
+            return {'MessageId': 'msg-{0}'.format(len(self.sent))}
+
+    def send_email(self, **kwargs):
+        return self._record('formatted', kwargs)
+
+    def send_raw_email(self, **kwargs):
+        return self._record('raw', kwargs)
+
+
+def formatted(address):
+    return {
+        'source': 'news@example.com',
+        'destination': {'ToAddresses': [address]},
+        'message': {
+            'Subject': {'Data': 'Hi'},
+            'Body': {'Text': {'Data': 'Hello.'}},
+        },
+    }
+
+
+class MimeTemplateTestCase(unittest.TestCase):
+    def test_render(self):
+        template = MimeTemplate.from_parts(
+            source='news@example.com',
+            subject='Hello ${name}',
+            text='Hi ${name}, welcome.',
+            html=u'<p>Hi ${name}, ça va?</p>'
+        )
+        self.assertEqual(template.names, set(['to', 'name']))
+
+        raw = template.render(to='bob@example.com', name='Bob')
+        msg = email.message_from_string(raw.decode('ascii'))
+        self.assertEqual(msg['To'], 'bob@example.com')
+        self.assertEqual(msg['Subject'], 'Hello Bob')
+        text, html = msg.get_payload()
+        self.assertEqual(text.get_payload(), 'Hi Bob, welcome.')
+        self.assertEqual(
+            html.get_payload(decode=True).decode('utf-8'),
+            u'<p>Hi Bob, ça va?</p>'
+        )
+
+    def test_missing_value(self):
+        template = MimeTemplate('To: ${to}\n\nHi')
+        self.assertRaises(KeyError, template.render)
+        self.assertEqual(template.render(to='a@b.c'), b'To: a@b.c\n\nHi')
+
+    def test_no_body(self):
+        self.assertRaises(ValueError, MimeTemplate.from_parts, 'a', 'b')
+
+
+class BulkSenderTestCase(unittest.TestCase):
+    def setUp(self):
+        super(BulkSenderTestCase, self).setUp()
+        self.clock = FakeClock()
+
+    def sender(self, conn, **kwargs):
+        return BulkSender(
+            conn,
+            clock=self.clock.time,
+            sleep=self.clock.sleep,
+            **kwargs
+        )
+
+    def test_paced(self):
+        conn = FakeSES(self.clock, max_rate=10)
+        sender = self.sender(conn, max_workers=4, headroom=0.5)
+        results = list(sender.send([
+            formatted('user-{0}@example.com'.format(i)) for i in range(25)
+        ]))
+
+        self.assertEqual(len(results), 25)
+        errors = [error for msg, msg_id, error in results]
+        self.assertEqual(errors, [None] * 25)
+        self.assertEqual(sender.stats()['rate'], 5.0)
+        # 5 go out straight away, then 5 a second.
+        times = sorted([sent_at for kind, sent_at, kwargs in conn.sent])
+        self.assertTrue(times[-1] - times[0] >= 3.9)
+
+    def test_templates(self):
+        conn = FakeSES(self.clock, max_rate=100)
+        sender = self.sender(conn)
+        template = MimeTemplate('To: ${to}\nSubject: Hi\n\nHello.')
+        messages = [
+            {
+                'destinations': ['user-{0}@example.com'.format(i)],
+                'template': template,
+                'values': {'to': 'user-{0}@example.com'.format(i)},
+            }
+            for i in range(3)
+        ] + [{'raw_message': {'Data': b'raw'}, 'destinations': ['x@y.z']}]
+        results = list(sender.send(messages))
+
+        self.assertEqual(len(results), 4)
+        raws = sorted([sent[2]['raw_message']['Data'] for sent in conn.sent])
+        self.assertEqual(
+            raws[0],
+            b'To: user-0@example.com\nSubject: Hi\n\nHello.'
+        )
+        self.assertEqual(raws[-1], b'raw')
+        self.assertEqual(set([sent[0] for sent in conn.sent]), set(['raw']))
+
+    def test_quota(self):
+        conn = FakeSES(self.clock, max_rate=100, max_24=100, sent=97)
+        sender = self.sender(conn, max_workers=1)
+        results = list(sender.send([
+            formatted('user-{0}@example.com'.format(i)) for i in range(5)
+        ]))
+        errors = [error for msg, msg_id, error in results if error]
+
+        self.assertEqual(len(conn.sent), 3)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(isinstance(errors[0], QuotaExceeded))
+        self.assertEqual(sender.stats()['remaining'], 0)
+
+    def test_throttled(self):
+        conn = FakeSES(self.clock, max_rate=100, throttle=2)
+        sender = self.sender(conn, max_workers=1)
+        results = list(sender.send([formatted('a@example.com')]))
+
+        self.assertEqual(results[0][1], 'msg-1')
+        self.assertEqual(sender.stats()['throttled'], 2)
+
+    def test_refresh(self):
+        conn = FakeSES(self.clock, max_rate=100)
+        sender = self.sender(conn, refresh_interval=60)
+        list(sender.send([formatted('a@example.com')]))
+        self.assertEqual(conn.quota_calls, 1)
+
+        conn.max_rate = 20
+        self.clock.sleep(61)
+        list(sender.send([formatted('b@example.com')]))
+        self.assertEqual(conn.quota_calls, 2)
+        self.assertEqual(sender.stats()['rate'], 18.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
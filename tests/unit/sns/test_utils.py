@@ -0,0 +1,350 @@
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.sns.utils import EndpointRegistrar, TopicPublisher
+from boto3.sns.utils import endpoints_by_token, iter_platform_endpoints
+from boto3.sns.utils import subscribe_sqs_queue, subscribe_sqs_queues
+from boto3.utils import json
+
+from tests import unittest
+
+
+class FakeTopic(object):
+    def __init__(self, topic_arn, fail_on=None):
+        self.topic_arn = topic_arn
+        self.fail_on = fail_on
+        self.received = []
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def publish(self, message, **kwargs):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            if message == self.fail_on:
+                raise ValueError("Nope.")
+
+            with self.lock:
+                self.received.append(message)
+
+            return {'MessageId': '{0}/{1}'.format(self.topic_arn, message)}
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+class TopicPublisherTestCase(unittest.TestCase):
+    def test_publish(self):
+        topics = [FakeTopic('arn:{0}'.format(i)) for i in range(3)]
+        clock = FakeClock()
+
+        with TopicPublisher(max_workers=4, clock=clock.time) as publisher:
+            results = []
+
+            for i in range(30):
+                topic = topics[i % 3]
+                results.append(publisher.publish(topic, str(i), subject='s'))
+
+            clock.now += 2
+
+        self.assertEqual(results[4].result(), 'arn:1/4')
+        self.assertEqual(
+            sorted([len(topic.received) for topic in topics]),
+            [10, 10, 10]
+        )
+        stats = publisher.stats()
+        self.assertEqual(stats['published'], 30)
+        self.assertEqual(stats['pending'], 0)
+        self.assertEqual(stats['throughput'], 15.0)
+        self.assertEqual(stats['error_rate'], 0.0)
+
+    def test_failures(self):
+        topic = FakeTopic('arn:1', fail_on='2')
+        publisher = TopicPublisher(max_workers=2)
+        results = [publisher.publish(topic, str(i)) for i in range(4)]
+        self.assertTrue(publisher.flush(timeout=5))
+        publisher.shutdown()
+
+        self.assertRaises(ValueError, results[2].result)
+        self.assertEqual(results[3].result(), 'arn:1/3')
+        stats = publisher.stats()
+        self.assertEqual(stats['failed'], 1)
+        self.assertEqual(stats['error_rate'], 0.25)
+
+    def test_ordered(self):
+        topics = [FakeTopic('arn:{0}'.format(i)) for i in range(2)]
+
+        with TopicPublisher(max_workers=8, ordered=True) as publisher:
+            for i in range(200):
+                publisher.publish(topics[i % 2], i)
+
+        for topic in topics:
+            self.assertEqual(topic.received, sorted(topic.received))
+            self.assertEqual(len(topic.received), 100)
+            self.assertEqual(topic.max_in_flight, 1)
+
+    def test_bounded(self):
+        gate = threading.Event()
+        topic = FakeTopic('arn:1')
+        original = topic.publish
+
+        def slow(**kwargs):
+            gate.wait(5)
+            return original(**kwargs)
+
+        topic.publish = slow
+        publisher = TopicPublisher(max_workers=1, max_pending=2)
+        publisher.publish(topic, 'a')
+        publisher.publish(topic, 'b')
+        blocked = threading.Thread(
+            target=publisher.publish,
+            args=(topic, 'c')
+        )
+        blocked.start()
+        blocked.join(0.1)
+        # No room for a third until something finishes.
+        self.assertTrue(blocked.is_alive())
+        self.assertEqual(publisher.pending, 2)
+
+        gate.set()
+        blocked.join(5)
+        publisher.shutdown()
+        self.assertEqual(topic.received, ['a', 'b', 'c'])
+
+    def test_cancelled(self):
+        gate = threading.Event()
+        topic = FakeTopic('arn:1')
+        original = topic.publish
+
+        def slow(**kwargs):
+            gate.wait(5)
+            return original(**kwargs)
+
+        topic.publish = slow
+        publisher = TopicPublisher(max_workers=1)
+        first = publisher.publish(topic, 'a')
+        second = publisher.publish(topic, 'b')
+        # Still waiting for the only worker, so it can be cancelled.
+        self.assertTrue(second.cancel())
+
+        gate.set()
+        self.assertTrue(publisher.flush(timeout=5))
+        publisher.shutdown()
+
+        self.assertEqual(first.result(), 'arn:1/a')
+        self.assertEqual(topic.received, ['a'])
+        stats = publisher.stats()
+        self.assertEqual(stats['cancelled'], 1)
+        self.assertEqual(stats['pending'], 0)
+
+
+class FakeSNS(object):
+    def __init__(self):
+        self.subscribed = []
+        self.lock = threading.Lock()
+
+    def subscribe(self, topic_arn, protocol, notification_endpoint):
+        with self.lock:
+            self.subscribed.append((topic_arn, notification_endpoint))
+
+        return {'SubscriptionArn': topic_arn + ':sub'}
+
+
+class FakeSQS(object):
+    def __init__(self):
+        self.policies = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def get_queue_attributes(self, queue_url, attribute_names):
+        with self.lock:
+            self.calls.append(('get', queue_url))
+
+        if queue_url in self.policies:
+            return {'Policy': self.policies[queue_url]}
+
+        return {}
+
+    def set_queue_attributes(self, queue_url, attributes):
+        with self.lock:
+            self.calls.append(('set', queue_url))
+            self.policies[queue_url] = attributes['Policy']
+
+
+class SubscribeSQSQueuesTestCase(unittest.TestCase):
+    def setUp(self):
+        super(SubscribeSQSQueuesTestCase, self).setUp()
+        self.sns = FakeSNS()
+        self.sqs = FakeSQS()
+
+    def statements(self, queue_url):
+        return json.loads(self.sqs.policies[queue_url])['Statement']
+
+    def test_single(self):
+        resp = subscribe_sqs_queue(self.sns, self.sqs, 'topic', 'url', 'arn')
+        self.assertEqual(resp, {'SubscriptionArn': 'topic:sub'})
+        self.assertEqual(len(self.statements('url')), 1)
+
+        # Doing it again doesn't duplicate the statement.
+        subscribe_sqs_queue(self.sns, self.sqs, 'topic', 'url', 'arn')
+        self.assertEqual(len(self.statements('url')), 1)
+
+    def test_bulk(self):
+        # One topic already allowed on the first queue.
+        subscribe_sqs_queue(self.sns, self.sqs, 'topic-0', 'url-1', 'arn-1')
+        self.sqs.calls = []
+        self.sns.subscribed = []
+
+        wanted = [
+            ('topic-{0}'.format(i), 'url-1', 'arn-1') for i in range(200)
+        ] + [
+            ('topic-{0}'.format(i), 'url-2', 'arn-2') for i in range(3)
+        ] + [
+            ('topic-1', 'url-2', 'arn-2'),
+        ]
+        results = subscribe_sqs_queues(self.sns, self.sqs, wanted)
+
+        self.assertEqual(len(results), 203)
+        self.assertEqual(
+            results[('topic-5', 'arn-1')],
+            {'SubscriptionArn': 'topic-5:sub'}
+        )
+        self.assertEqual(len(self.sns.subscribed), 203)
+        # One read & one write per queue.
+        self.assertEqual(sorted(self.sqs.calls), [
+            ('get', 'url-1'),
+            ('get', 'url-2'),
+            ('set', 'url-1'),
+            ('set', 'url-2'),
+        ])
+        self.assertEqual(len(self.statements('url-1')), 200)
+        self.assertEqual(len(self.statements('url-2')), 3)
+        sources = set([
+            statement['Condition']['StringLike']['aws:SourceArn']
+            for statement in self.statements('url-2')
+        ])
+        self.assertEqual(sources, set(['topic-0', 'topic-1', 'topic-2']))
+
+    def test_bulk_nothing_new(self):
+        subscribe_sqs_queue(self.sns, self.sqs, 'topic', 'url', 'arn')
+        self.sqs.calls = []
+        subscribe_sqs_queues(self.sns, self.sqs, [('topic', 'url', 'arn')])
+        # Already allowed, so the policy isn't rewritten.
+        self.assertEqual(self.sqs.calls, [('get', 'url')])
+
+
+class FakePush(object):
+    def __init__(self, throttle=0, reject=()):
+        self.throttle = throttle
+        self.reject = reject
+        self.created = []
+        self.lock = threading.Lock()
+
+    def create_platform_endpoint(self, platform_application_arn, token,
+                                 **kwargs):
+        with self.lock:
+            if self.throttle:
+                self.throttle -= 1
+                raise ServerError(code='Throttling', message='Slow down.')
+
+            if token in self.reject:
+                raise ServerError(code='InvalidParameter', message='Bad.')
+
+            self.created.append((token, kwargs.get('custom_user_data')))
+
+        return {'EndpointArn': 'arn:endpoint/' + token}
+
+    def list_endpoints_by_platform_application(self,
+                                               platform_application_arn,
+                                               next_token=None):
+        start = int(next_token or 0)
+        resp = {
+            'Endpoints': [
+                {
+                    'EndpointArn': 'arn:endpoint/old-{0}'.format(i),
+                    'Attributes': {'Token': 'old-{0}'.format(i)},
+                }
+                for i in range(start, min(start + 2, 5))
+            ],
+        }
+
+        if start + 2 < 5:
+            resp['NextToken'] = str(start + 2)
+
+        return resp
+
+
+class EndpointRegistrarTestCase(unittest.TestCase):
+    def test_pager(self):
+        conn = FakePush()
+        self.assertEqual(len(list(iter_platform_endpoints(conn, 'app'))), 5)
+        known = endpoints_by_token(conn, 'app')
+        self.assertEqual(known['old-4'], 'arn:endpoint/old-4')
+
+    def test_register(self):
+        conn = FakePush(reject=('bad',))
+        registrar = EndpointRegistrar(conn, 'app', max_workers=4, rate=1000)
+        tokens = (
+            ['tok-{0}'.format(i) for i in range(20)] +
+            ['tok-3', ('tok-20', 'user-20'), 'bad', 'old-1']
+        )
+        results = dict(registrar.register(
+            iter(tokens),
+            known={'old-1': 'arn:endpoint/old-1'}
+        ))
+
+        self.assertEqual(len(results), 22)
+        self.assertEqual(results['tok-7'], 'arn:endpoint/tok-7')
+        self.assertEqual(results['old-1'], 'arn:endpoint/old-1')
+        self.assertTrue(('tok-20', 'user-20') in conn.created)
+        self.assertEqual(len(conn.created), 21)
+        self.assertEqual(list(registrar.failed.keys()), ['bad'])
+
+        stats = registrar.stats()
+        self.assertEqual(stats['created'], 21)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(stats['skipped'], 1)
+        self.assertEqual(stats['failed'], 1)
+
+    def test_adapts_to_throttling(self):
+        conn = FakePush(throttle=3)
+        registrar = EndpointRegistrar(
+            conn,
+            'app',
+            max_workers=1,
+            rate=800,
+            min_rate=150
+        )
+        results = dict(registrar.register(['a', 'b']))
+
+        self.assertEqual(sorted(results), ['a', 'b'])
+        self.assertEqual(registrar.throttled, 3)
+        # Halved three times, but not below the floor (then nudged up by the
+        # two successes).
+        self.assertTrue(150 < registrar.bucket.rate < 151)
+
+    def test_gives_up(self):
+        conn = FakePush(throttle=10)
+        registrar = EndpointRegistrar(
+            conn,
+            'app',
+            rate=1000,
+            max_retries=2
+        )
+        self.assertEqual(list(registrar.register(['a'])), [])
+        self.assertEqual(registrar.failed['a'].code, 'Throttling')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,191 @@
+import threading
+
+from boto3.core.exceptions import ServerError
+from boto3.support.utils import trusted_advisor_report
+
+from tests import unittest
+
+
+# 2013-11-04T08:00:00Z
+NOW = 1383552000.0
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = NOW
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeSupport(object):
+    def __init__(self, clock, count=30, refresh_polls=2, broken=None):
+        self.clock = clock
+        self.refresh_polls = refresh_polls
+        # Status polls for batches including this check fail.
+        self.broken = broken
+        self.checks = []
+        self.results = {}
+        self.refreshing = {}
+        self.calls = []
+        self.lock = threading.Lock()
+
+        for i in range(count):
+            check_id = 'check-{0}'.format(i)
+            self.checks.append({
+                'id': check_id,
+                'name': 'Check {0}'.format(i),
+                'category': i % 3 and 'security' or 'cost_optimizing',
+                'metadata': [],
+            })
+            self.results[check_id] = {
+                'checkId': check_id,
+                # Even ones are a day old, odd ones a minute.
+                'timestamp': i % 2 and '2013-11-04T07:59:00Z' or
+                '2013-11-03T08:00:00.123Z',
+                'status': i % 5 and 'ok' or 'warning',
+                'categorySpecificSummary': {
+                    'costOptimizing': {'estimatedMonthlySavings': 10.0},
+                },
+            }
+
+    def _record(self, name):
+        with self.lock:
+            self.calls.append(name)
+
+    def describe_trusted_advisor_checks(self, language):
+        self._record('checks')
+        return {'checks': [dict(check) for check in self.checks]}
+
+    def describe_trusted_advisor_check_result(self, check_id, language):
+        self._record('result')
+        return {'result': dict(self.results[check_id])}
+
+    def refresh_trusted_advisor_check(self, check_id):
+        self._record('refresh')
+
+        if check_id == 'check-0':
+            raise ServerError(
+                code='InvalidParameterValueException',
+                message='Refreshed automatically.'
+            )
+
+        with self.lock:
+            self.refreshing[check_id] = self.refresh_polls
+
+        return {'status': {'checkId': check_id, 'status': 'enqueued'}}
+
+    def describe_trusted_advisor_check_refresh_statuses(self, check_ids):
+        self._record('statuses')
+        assert len(check_ids) <= 25
+
+        if self.broken in check_ids:
+            raise ServerError(code='Throttling', message='Rate exceeded.')
+        statuses = []
+
+        with self.lock:
+            for check_id in check_ids:
+                self.refreshing[check_id] -= 1
+                status = 'processing'
+
+                if self.refreshing[check_id] <= 0:
+                    status = 'success'
+                    self.results[check_id]['timestamp'] = \
+                        '2013-11-04T08:00:10Z'
+
+                statuses.append({'checkId': check_id, 'status': status})
+
+        return {'statuses': statuses}
+
+
+class TrustedAdvisorReportTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TrustedAdvisorReportTestCase, self).setUp()
+        self.clock = FakeClock()
+
+    def report(self, conn, **kwargs):
+        return trusted_advisor_report(
+            conn,
+            clock=self.clock.time,
+            sleep=self.clock.sleep,
+            **kwargs
+        )
+
+    def test_report(self):
+        conn = FakeSupport(self.clock)
+        report = self.report(conn)
+
+        self.assertEqual(len(report['checks']), 30)
+        self.assertEqual(conn.calls.count('result'), 30)
+        self.assertEqual(report['checks']['check-5']['result']['status'],
+                         'warning')
+        summary = report['summary']
+        self.assertEqual(summary['by_status'], {'ok': 24, 'warning': 6})
+        self.assertEqual(
+            sum(summary['by_category']['cost_optimizing'].values()),
+            10
+        )
+        self.assertEqual(summary['estimated_monthly_savings'], 300.0)
+        self.assertEqual(report['errors'], {})
+
+    def test_categories(self):
+        conn = FakeSupport(self.clock)
+        report = self.report(conn, categories=['cost_optimizing'])
+        self.assertEqual(len(report['checks']), 10)
+
+    def test_refresh_stale(self):
+        conn = FakeSupport(self.clock, count=60)
+        report = self.report(conn, refresh=True, max_age=3600, interval=5)
+
+        # 30 stale, one of which can't be refreshed.
+        self.assertEqual(conn.calls.count('refresh'), 30)
+        self.assertEqual(list(report['errors']), ['check-0'])
+        # Two rounds of two batches.
+        self.assertEqual(conn.calls.count('statuses'), 4)
+        self.assertEqual(self.clock.now, NOW + 5)
+        refreshed = [
+            check_id for check_id, check in report['checks'].items()
+            if check['refreshed']
+        ]
+        self.assertEqual(len(refreshed), 29)
+        self.assertEqual(
+            report['checks']['check-2']['result']['timestamp'],
+            '2013-11-04T08:00:10Z'
+        )
+        self.assertEqual(conn.calls.count('result'), 60 + 29)
+
+    def test_refresh_status_errors(self):
+        conn = FakeSupport(self.clock, count=60, broken='check-58')
+        report = self.report(conn, refresh=True, max_age=3600, interval=5)
+
+        # The second batch of 4 fails & isn't polled again.
+        failed = ['check-52', 'check-54', 'check-56', 'check-58']
+        self.assertEqual(sorted(report['errors']), ['check-0'] + failed)
+        self.assertEqual(
+            report['errors']['check-58'].code,
+            'Throttling'
+        )
+        self.assertEqual(conn.calls.count('statuses'), 3)
+        refreshed = [
+            check_id for check_id, check in report['checks'].items()
+            if check['refreshed']
+        ]
+        self.assertEqual(len(refreshed), 25)
+        self.assertFalse(report['checks']['check-58']['refreshed'])
+
+    def test_refresh_timeout(self):
+        conn = FakeSupport(self.clock, count=4, refresh_polls=100)
+        report = self.report(conn, refresh=True, interval=5, timeout=12)
+
+        self.assertEqual(conn.calls.count('statuses'), 3)
+        self.assertEqual(
+            [check['refreshed'] for check in report['checks'].values()],
+            [False] * 4
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
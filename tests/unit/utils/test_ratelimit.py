@@ -0,0 +1,115 @@
+from boto3.utils.ratelimit import TokenBucket
+
+from tests import unittest
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTestCase(unittest.TestCase):
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(
+            rate=10,
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+
+    def test_init(self):
+        self.assertEqual(self.bucket.rate, 10.0)
+        self.assertEqual(self.bucket.capacity, 10.0)
+        # Starts full.
+        self.assertEqual(self.bucket.tokens, 10.0)
+
+    def test_try_consume(self):
+        self.assertTrue(self.bucket.try_consume(6))
+        self.assertFalse(self.bucket.try_consume(6))
+        self.assertEqual(self.bucket.tokens, 4.0)
+
+        # Half a second later, there's enough.
+        self.clock.now += 0.5
+        self.assertTrue(self.bucket.try_consume(6))
+
+    def test_refill_capped(self):
+        self.bucket.try_consume(10)
+        self.clock.now += 60
+        self.assertEqual(self.bucket.tokens, 10.0)
+
+    def test_consume_blocks(self):
+        self.assertEqual(self.bucket.consume(10), 0.0)
+        waited = self.bucket.consume(5)
+        self.assertAlmostEqual(waited, 0.5)
+        self.assertEqual(self.clock.slept, [0.5])
+
+    def test_consume_capped_at_capacity(self):
+        # A request for more than the bucket can hold only waits for a full
+        # bucket.
+        self.bucket.try_consume(10)
+        waited = self.bucket.consume(50)
+        self.assertAlmostEqual(waited, 1.0)
+
+    def test_charge_debt(self):
+        self.bucket.charge(15)
+        self.assertEqual(self.bucket.tokens, -5.0)
+
+        # Has to repay the debt first.
+        waited = self.bucket.consume(1)
+        self.assertAlmostEqual(waited, 0.6)
+
+    def test_charge_refund(self):
+        self.bucket.try_consume(5)
+        self.bucket.charge(-2)
+        self.assertEqual(self.bucket.tokens, 7.0)
+
+        # Never beyond capacity.
+        self.bucket.charge(-20)
+        self.assertEqual(self.bucket.tokens, 10.0)
+
+    def test_set_rate(self):
+        self.bucket.try_consume(10)
+        self.clock.now += 0.5
+        self.bucket.rate = 2
+        self.assertEqual(self.bucket.rate, 2.0)
+        # The half second at the old rate was kept & capacity follows rate.
+        self.assertEqual(self.bucket.tokens, 2.0)
+
+    def test_set_capacity(self):
+        self.bucket.capacity = 4
+        self.assertEqual(self.bucket.capacity, 4.0)
+        # Shrinking the bucket spills the excess.
+        self.assertEqual(self.bucket.tokens, 4.0)
+
+    def test_consume_rounding(self):
+        # Odd rates leave the refilled total a hair short of a whole token.
+        # That mustn't turn into an endless run of tiny sleeps.
+        bucket = TokenBucket(
+            rate=4.9,
+            clock=self.clock.time,
+            sleep=self.clock.sleep
+        )
+
+        for i in range(50):
+            bucket.consume(1.0)
+
+        self.assertTrue(len(self.clock.slept) < 100)
+        self.assertAlmostEqual(sum(self.clock.slept), 45.1 / 4.9, places=4)
+
+    def test_fixed_capacity(self):
+        bucket = TokenBucket(rate=1, capacity=5, clock=self.clock.time)
+        self.assertEqual(bucket.capacity, 5.0)
+        self.assertEqual(bucket.tokens, 5.0)
+
+
+if __name__ == "__main__":
+    unittest.main()